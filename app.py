@@ -1,36 +1,58 @@
 from heuristics import Heuristic, SimpleHeuristic
-from players import PlayerController, HumanPlayer, MinMaxPlayer, AlphaBetaPlayer
+from players import PlayerController, SearchPlayer, HumanPlayer, MinMaxPlayer, AlphaBetaPlayer
 from board import Board
-from typing import List
+from records import GameWriter
+from transposition import TranspositionTable
+from time import perf_counter
+from typing import List, Optional
 import numpy as np
 from numba import jit
 
 
-def start_game(game_n: int, board: Board, players: List[PlayerController]) -> int:
+def start_game(game_n: int, board: Board, players: List[PlayerController], recorder: Optional[GameWriter] = None) -> int:
     """Starting a game and handling the game logic
 
     Args:
         game_n (int): n in a row required to win
         board (Board): board to play on
         players (List[PlayerController]): players of the game
+        recorder (Optional[GameWriter]): writer to record the game with, None to not record it
 
     Returns:
         int: id of the winning player, or -1 if the game ends in a draw
     """
     print('Start game!')
+    allocations: int = Board.allocation_count # board arrays allocated before the game
+    if recorder is not None:
+        descriptions: List[str] = [f'{type(p).__name__} {p.heuristic}' if p.heuristic is not None else type(p).__name__
+                                   for p in sorted(players, key=lambda p: p.player_id)]
+        recorder.begin_game(board.width, board.height, game_n, descriptions, players[0].player_id)
     current_player_index: int = 0 # index of the current player in the players list
     winner: int = 0
 
     # Main game loop
     while winner == 0:
         current_player: PlayerController = players[current_player_index]
+        nodes: int = current_player.get_node_count() if isinstance(current_player, SearchPlayer) else 0
+        start: float = perf_counter()
         move: int = current_player.make_move(board)
 
         while not board.play(move, current_player.player_id):
             move = current_player.make_move(board)
 
+        if recorder is not None:
+            recorder.add_move(move, current_player.get_node_count() - nodes if isinstance(current_player, SearchPlayer) else 0,
+                              int((perf_counter() - start) * 1000), current_player.last_depth if isinstance(current_player, SearchPlayer) else 0,
+                              current_player.last_score)
+
         current_player_index = 1 - current_player_index
-        winner = winning(board.get_board_state(), game_n)
+        winner = board.get_winner(game_n)
+
+        if winner == 0 and isinstance(current_player, SearchPlayer):
+            current_player.start_pondering(board) # only if the player ponders, it searches while the opponent thinks
+
+    if recorder is not None:
+        recorder.end_game(winner)
 
     # Printing out winner, final board and number of evaluations after the game 
     print(board)
@@ -40,8 +62,28 @@ def start_game(game_n: int, board: Board, players: List[PlayerController]) -> in
     else:
         print(f'Player {current_player} won!')
 
+    for p in players:
+        if isinstance(p, SearchPlayer):
+            p.stop_pondering()
+
+    print(f'{Board.allocation_count - allocations} board arrays were allocated during the game!')
     for p in players:
         print(f'Player {p} evaluated a boardstate {p.get_eval_count()} times!')
+        if isinstance(p, SearchPlayer):
+            print(f'Player {p} searched {p.get_node_count()} positions with {p.get_cutoff_count()} cutoffs!')
+        if isinstance(p, SearchPlayer) and p.transposition_table is not None:
+            stats = p.transposition_table.get_stats()
+            print(f'Player {p} found {stats["hits"]} of {stats["probes"]} positions in its transposition table!')
+        if p.solver is not None:
+            print(f'Player {p} solved {p.solver.solve_count} positions exactly in {p.solver.solve_time:.2f} seconds!')
+        if isinstance(p, SearchPlayer) and p.ponder:
+            print(f'Player {p} predicted {p.ponder_hits} of {p.ponder_hits + p.ponder_misses} moves of its opponent while pondering!')
+        if p.move_stats:
+            hit_rates: str = ' '.join(f'{move["hit_rate"]:.2f}' for move in p.move_stats)
+            reused: str = ' '.join(str(int(move['reused'])) for move in p.move_stats)
+            print(f'Player {p} reused work of earlier moves, hit rate per move: {hit_rates}, reused entries per move: {reused}')
+        if p.stats is not None:
+            print(f'Player {p} search stats:\n{p.stats}')
 
     return winner
 
@@ -122,6 +164,48 @@ def winning(state: np.ndarray, game_n: int) -> int:
         return -1 # The board is full, game is a draw
 
     return 0 # Game is not over 
+
+
+@jit(nopython=True, cache=True)
+def winning_move(state: np.ndarray, game_n: int, col: int, row: int) -> int:
+    """Determines whether the move at (col, row) won the game
+    Only the four lines through that field are checked, so the result equals
+    that of 'winning' as long as nobody had won before the move was played
+
+    Args:
+        state (np.ndarray): the board to check
+        game_n (int): n in a row required to win
+        col (int): column of the last move
+        row (int): row of the last move
+
+    Returns:
+        int: 1 or 2 if the respective player won, -1 if the game is a draw, 0 otherwise
+    """
+    width: int
+    height: int
+    width, height = state.shape
+    player: int = state[col, row]
+
+    for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        counter: int = 1
+
+        # Count the player's fields in both directions along the line
+        for sign in (1, -1):
+            x: int = col + sign * dx
+            y: int = row + sign * dy
+            while 0 <= x < width and 0 <= y < height and state[x, y] == player:
+                counter += 1
+                x += sign * dx
+                y += sign * dy
+
+        if counter >= game_n:
+            return player
+
+    # Check for a draw
+    if np.all(state[:, 0]):
+        return -1 # The board is full, game is a draw
+
+    return 0 # Game is not over 
     
 
 def get_players(game_n: int) -> List[PlayerController]:
@@ -142,10 +226,12 @@ def get_players(game_n: int) -> List[PlayerController]:
     human1: PlayerController = HumanPlayer(1, game_n, heuristic1) #this is the human playing as min
     #human2: PlayerController = HumanPlayer(2, game_n, heuristic2) #human2 is no longer playing
 
-    computer1: PlayerController = MinMaxPlayer(2, game_n, 2, heuristic2) #this the computer playing as max,depth is 2 is a placeholder
-
-
-    # TODO: Implement other PlayerControllers (MinMaxPlayer and AlphaBetaPlayer)
+    #this the computer playing as max, searching as deep as it can in one second per move
+    #it keeps searching on the expected reply while the human thinks
+    #and plays perfectly once 16 fields are left; moves that lose right away are never searched
+    computer1: PlayerController = AlphaBetaPlayer(2, game_n, 64, heuristic2, transposition_table=TranspositionTable(), time_limit=1000, ponder=True,
+                                                  solver_threshold=16, threat_pruning=True)
+    computer1.enable_stats(sample_interval=64) # times one in 64 positions, cheap enough to always collect
 
     players: List[PlayerController] = [human1, computer1]
 
@@ -0,0 +1,276 @@
+"""Headless self-play benchmark
+
+Plays computer against computer on several board sizes and writes the
+throughput, move latency, memory and JIT warm-up numbers as JSON, e.g.
+
+    python benchmark.py --sizes 7x6 9x7 --game-n 4 --games 4 --depth 6 --output bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+import numba
+import numpy as np
+from board import Board, BitBoard
+from heuristics import Heuristic, LinearHeuristic, SimpleHeuristic, WindowHeuristic
+from players import PlayerController, SearchPlayer, MinMaxPlayer, AlphaBetaPlayer
+from transposition import TranspositionTable
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+HEURISTICS: Dict[str, type] = {'simple': SimpleHeuristic, 'window': WindowHeuristic, 'linear': LinearHeuristic}
+PLAYERS: Dict[str, type] = {'minmax': MinMaxPlayer, 'alphabeta': AlphaBetaPlayer}
+
+
+def make_player(args: argparse.Namespace, player_id: int, game_n: int) -> PlayerController:
+    """Creates a computer player from the command line arguments
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+        player_id (int): id of the player, 1 or 2
+        game_n (int): n in a row required to win
+
+    Returns:
+        PlayerController: the player
+    """
+    heuristic: Heuristic = HEURISTICS[args.heuristic](game_n)
+    table: Optional[TranspositionTable] = TranspositionTable(args.table_size) if args.table_size > 0 else None
+    return PLAYERS[args.player](player_id, game_n, args.depth, heuristic, transposition_table=table, time_limit=args.time_limit)
+
+
+def warm_up(width: int, height: int, game_n: int, heuristic_name: str) -> float:
+    """Calls every compiled kernel once, so compilation (or loading it from the cache) isn't measured as play
+
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        heuristic_name (str): name of the heuristic to warm up
+
+    Returns:
+        float: seconds it took
+    """
+    start: float = perf_counter()
+    board: Board = Board(width, height)
+    board.play(0, 1)
+    board.get_winner(game_n)
+    heuristic: Heuristic = HEURISTICS[heuristic_name](game_n)
+    heuristic.evaluate_board(1, board)
+    heuristic.evaluate_many(1, board.board_state[None])
+    return perf_counter() - start
+
+
+def play_game(width: int, height: int, game_n: int, players: List[PlayerController], opening: List[int]) -> Tuple[int, List[Dict[str, float]]]:
+    """Plays one game between computer players without any output
+
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        players (List[PlayerController]): the two players, the first one starts
+        opening (List[int]): moves played before the players take over
+
+    Returns:
+        Tuple[int, List[Dict[str, float]]]: id of the winner or -1 for a draw, and per move
+            its latency in seconds and the nodes and evaluations it took
+    """
+    board: Board = BitBoard(width, height)
+    winner: int = 0
+    moves: List[Dict[str, float]] = []
+    index: int = 0
+
+    for col in opening:
+        board.play(col, players[index].player_id)
+        index = 1 - index
+
+    while winner == 0:
+        player: PlayerController = players[index]
+        nodes: int = get_node_count(player)
+        evals: int = player.get_eval_count()
+
+        start: float = perf_counter()
+        col: int = player.make_move(board)
+        latency: float = perf_counter() - start
+
+        assert board.play(col, player.player_id), f'Player {player} made an invalid move'
+        moves.append({'latency': latency, 'nodes': get_node_count(player) - nodes, 'evals': player.get_eval_count() - evals})
+        winner = board.get_winner(game_n)
+        index = 1 - index
+
+    return winner, moves
+
+
+def get_node_count(player: PlayerController) -> int:
+    """
+    Args:
+        player (PlayerController): a player
+
+    Returns:
+        int: the number of positions the player searched, 0 for players that don't search
+    """
+    return player.get_node_count() if isinstance(player, SearchPlayer) else 0
+
+
+def random_opening(width: int, height: int, plies: int, generator: random.Random) -> List[int]:
+    """
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+        plies (int): number of moves, too few to win the game
+        generator (random.Random): source of randomness
+
+    Returns:
+        List[int]: random columns to open the game with, none of them overflowing
+    """
+    heights: List[int] = [0] * width
+    opening: List[int] = []
+    for _ in range(plies):
+        col: int = generator.choice([col for col in range(width) if heights[col] < height])
+        heights[col] += 1
+        opening.append(col)
+    return opening
+
+
+def run_size(args: argparse.Namespace, width: int, height: int, game_n: int, generator: random.Random) -> Dict[str, Any]:
+    """Plays the benchmark games on one board size
+
+    Args:
+        args (argparse.Namespace): the parsed command line arguments
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        generator (random.Random): source of randomness for the openings
+
+    Returns:
+        Dict[str, Any]: the results for this board size
+    """
+    warmup: float = warm_up(width, height, game_n, args.heuristic)
+    outcomes: Dict[str, int] = {'1': 0, '2': 0, 'draw': 0}
+    moves: List[Dict[str, float]] = []
+
+    for _ in range(args.games):
+        players: List[PlayerController] = [make_player(args, 1, game_n), make_player(args, 2, game_n)]
+        opening: List[int] = random_opening(width, height, min(args.random_plies, 2 * game_n - 2), generator)
+        winner, game_moves = play_game(width, height, game_n, players, opening)
+        outcomes['draw' if winner < 0 else str(winner)] += 1
+        moves.extend(game_moves)
+        for player in players:
+            player.close()
+
+    latencies: np.ndarray = np.array([move['latency'] for move in moves]) * 1000
+    seconds: float = float(sum(move['latency'] for move in moves))
+    nodes: int = int(sum(move['nodes'] for move in moves))
+    evals: int = int(sum(move['evals'] for move in moves))
+
+    return {
+        'width': width,
+        'height': height,
+        'game_n': game_n,
+        'games': args.games,
+        'outcomes': outcomes,
+        'moves': len(moves),
+        'warmup_seconds': warmup,
+        'search_seconds': seconds,
+        'nodes': nodes,
+        'evals': evals,
+        'nodes_per_second': nodes / seconds if seconds > 0 else 0.0,
+        'evals_per_second': evals / seconds if seconds > 0 else 0.0,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'max': float(latencies.max()),
+        },
+    }
+
+
+def get_commit() -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: the git commit the benchmark runs on, None if it can't be determined
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_peak_memory() -> Optional[int]:
+    """
+    Returns:
+        Optional[int]: peak resident memory of the process in kilobytes, None if it can't be determined
+    """
+    if resource is None:
+        return None
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak # macOS reports bytes
+
+
+def parse_size(size: str) -> Tuple[int, int]:
+    """
+    Args:
+        size (str): board size as WIDTHxHEIGHT
+
+    Returns:
+        Tuple[int, int]: width and height
+    """
+    width, height = size.lower().split('x')
+    return int(width), int(height)
+
+
+def main() -> None:
+    """Runs the benchmark with the settings from the command line
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Headless self-play benchmark')
+    parser.add_argument('--sizes', nargs='+', default=['7x6'], help='board sizes as WIDTHxHEIGHT')
+    parser.add_argument('--game-n', nargs='+', type=int, default=[4], help='n in a row required to win')
+    parser.add_argument('--games', type=int, default=2, help='games per board size and game_n')
+    parser.add_argument('--player', choices=PLAYERS, default='alphabeta')
+    parser.add_argument('--heuristic', choices=HEURISTICS, default='simple')
+    parser.add_argument('--depth', type=int, default=6, help='search depth, or the max depth with a time limit')
+    parser.add_argument('--time-limit', type=int, default=None, help='time budget per move in milliseconds')
+    parser.add_argument('--table-size', type=int, default=1 << 18, help='transposition table entries, 0 for none')
+    parser.add_argument('--random-plies', type=int, default=2, help='random moves at the start of every game')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='file to write the JSON report to, stdout if not given')
+    args: argparse.Namespace = parser.parse_args()
+
+    generator: random.Random = random.Random(args.seed)
+    total_start: float = perf_counter()
+    results: List[Dict[str, Any]] = []
+
+    for size in args.sizes:
+        width, height = parse_size(size)
+        for game_n in args.game_n:
+            if not 1 < game_n <= min(width, height):
+                continue
+            results.append(run_size(args, width, height, game_n, generator))
+
+    report: Dict[str, Any] = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba.__version__,
+        'config': vars(args),
+        'total_seconds': perf_counter() - total_start,
+        'peak_memory_kb': get_peak_memory(),
+        'results': results,
+    }
+
+    output: str = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,13 @@
-from heuristics import Heuristic, SimpleHeuristic
-from players import PlayerController, HumanPlayer, MinMaxPlayer, AlphaBetaPlayer
-from typing import List
+from typing import Dict, List, Tuple
 import numpy as np
+import random
 
 
 class Board:
     """A n in a row board
     """
+    allocation_count: int = 0 # board state arrays allocated by all boards, for new boards and copies
+
     def __init__(self, *args) -> None:
         """Constructor for the Board class
 
@@ -25,12 +26,17 @@ class Board:
         self.width: int
         self.height: int
         self.board_state: np.ndarray
+        self.moves: List[int] = [] # columns played on this board object, used by undo
+        self.hash: int # Zobrist hash of the board state, updated on every move
+        self.mirror_hash: int # Zobrist hash of the board state reflected left to right
+        self.state_view: np.ndarray # read-only view of the board state
         
         # Creates an empty board with the provided dimensions
         if len(args) == 2:
             assert isinstance(args[0], int) and isinstance(args[1], int)
             self.width, self.height = args
             self.board_state = np.full(args, 0, dtype=int)
+            Board.allocation_count += 1
         
         # Creates a copy of the provided board
         elif len(args) == 1 and isinstance(args[0], self.__class__):
@@ -38,6 +44,12 @@ class Board:
             self.width = other.width
             self.height = other.height
             self.board_state = other.get_board_state()
+            self.moves = list(other.moves)
+            self.zobrist: List[List[int]] = other.zobrist
+            self.hash = other.hash
+            self.mirror_hash = other.mirror_hash
+            self.state_view = _read_only_view(self.board_state)
+            return
 
         # Creates a new board with the provided board state
         elif len(args) == 1 and isinstance(args[0], np.ndarray):
@@ -50,6 +62,16 @@ class Board:
         else:
             raise TypeError('Board constructor has received a wrong type as parameter')
 
+        self.zobrist = zobrist_keys(self.width, self.height)
+        self.hash = 0
+        self.mirror_hash = 0
+        for col in range(self.width):
+            for row in range(self.height):
+                if self.board_state[col, row] != 0:
+                    self.hash ^= self.zobrist[self.board_state[col, row] - 1][col * self.height + row]
+                    self.mirror_hash ^= self.zobrist[self.board_state[col, row] - 1][(self.width - 1 - col) * self.height + row]
+        self.state_view = _read_only_view(self.board_state)
+
     
     def get_value(self, col: int, row: int) -> int:
         """Retrieves the value of a field in the board
@@ -70,7 +92,16 @@ class Board:
         Returns:
             np.ndarray: copy of the board state
         """
+        Board.allocation_count += 1
         return self.board_state.copy()
+
+
+    def get_state_view(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: read-only view of the board state, it follows the moves played on the board without being copied
+        """
+        return self.state_view
     
     
     def play(self, col: int, player_id: int) -> bool:
@@ -86,10 +117,29 @@ class Board:
         for i, field in enumerate(self.board_state[col][::-1]):
             if field == 0:
                 self.board_state[col, self.height - i - 1] = player_id
+                self.hash ^= self.zobrist[player_id - 1][col * self.height + self.height - i - 1]
+                self.mirror_hash ^= self.zobrist[player_id - 1][(self.width - 1 - col) * self.height + self.height - i - 1]
+                self.moves.append(col)
                 return True
         return False
     
 
+    def undo(self) -> int:
+        """Takes back the last move played on this board with 'play'
+
+        Returns:
+            int: column of the move that was taken back
+        """
+        col: int = self.moves.pop()
+        for row, field in enumerate(self.board_state[col]):
+            if field != 0:
+                self.hash ^= self.zobrist[field - 1][col * self.height + row]
+                self.mirror_hash ^= self.zobrist[field - 1][(self.width - 1 - col) * self.height + row]
+                self.board_state[col, row] = 0
+                break
+        return col
+    
+
     def is_valid(self, col: int) -> bool:
         """Returns if a move is valid
 
@@ -100,6 +150,26 @@ class Board:
             bool: true if spot is not taken yet
         """
         return self.board_state[col, 0] == 0
+
+
+    def get_canonical_key(self) -> Tuple[int, bool]:
+        """Gets a key that is the same for the board and its mirror image
+
+        Returns:
+            Tuple[int, bool]: the lower of the hash and the mirrored hash, and whether it is the mirrored one;
+                moves found for the key must then be mirrored (width - 1 - col) to apply to this board
+        """
+        if self.mirror_hash < self.hash:
+            return self.mirror_hash, True
+        return self.hash, False
+
+
+    def is_symmetric(self) -> bool:
+        """
+        Returns:
+            bool: true if the board is its own mirror image, so mirrored moves lead to mirrored positions
+        """
+        return self.hash == self.mirror_hash and bool((self.board_state == self.board_state[::-1]).all())
     
 
     def get_new_board(self, col: int, player_id: int) -> 'Board':
@@ -112,13 +182,29 @@ class Board:
         Returns:
             Board: a *new* Board object with the resulting state
         """
-        state: np.ndarray = self.get_board_state()
-        for i, field in enumerate(state[col][::-1]):
-            if field == 0:
-                state[col, self.height - i - 1] = player_id
-                return Board(state)
-            
-        return Board(state)
+        board: Board = Board(self)
+        board.play(col, player_id)
+        return board
+    
+
+    def get_winner(self, game_n: int) -> int:
+        """Determines whether a player has won, and if so, which one
+        Only the lines through the last move are checked, so this gives the same
+        result as app.winning as long as nobody had won before that move
+
+        Args:
+            game_n (int): n in a row required to win
+
+        Returns:
+            int: 1 or 2 if the respective player won, -1 if the game is a draw, 0 otherwise
+        """
+        from app import winning, winning_move # imported here to avoid circular imports
+        if not self.moves:
+            return winning(self.board_state, game_n)
+
+        col: int = self.moves[-1]
+        row: int = int(np.argmax(self.board_state[col] != 0))
+        return winning_move(self.board_state, game_n, col, row)
     
 
     def __str__(self) -> str:
@@ -152,3 +238,360 @@ class Board:
         
         return output
 
+
+def _read_only_view(state: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        state (np.ndarray): a board state
+
+    Returns:
+        np.ndarray: a view of the state that can't be written to
+    """
+    view: np.ndarray = state.view()
+    view.flags.writeable = False
+    return view
+
+
+def _line_masks(width: int, height: int, game_n: int) -> List[List[Tuple[int, Tuple[int, ...]]]]:
+    """Gets, for every bit of a bitboard, the masks of the four lines through it
+
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+
+    Returns:
+        List[List[Tuple[int, Tuple[int, ...]]]]: per bit index a list with, for each direction,
+            the mask of the fields within game_n - 1 steps and the shifts that find n in a row
+    """
+    key: Tuple[int, int, int] = (width, height, game_n)
+    if key in _LINE_MASKS:
+        return _LINE_MASKS[key]
+
+    stride: int = height + 1
+    masks: List[List[Tuple[int, Tuple[int, ...]]]] = [[] for _ in range(width * stride)]
+
+    for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)): # vertical, horizontal, both diagonals
+        shift: int = dx * stride + dy
+
+        # Combining runs of length k with runs of length <= k doubles the run length each step
+        shifts: List[int] = []
+        length: int = 1
+        while length < game_n:
+            step: int = min(length, game_n - length)
+            shifts.append(step * shift)
+            length += step
+
+        for col in range(width):
+            for height_index in range(height): # counted from the bottom, like the bits
+                mask: int = 0
+                for d in range(-game_n + 1, game_n):
+                    x: int = col + d * dx
+                    y: int = height_index + d * dy
+                    if 0 <= x < width and 0 <= y < height:
+                        mask |= 1 << (x * stride + y)
+                masks[col * stride + height_index].append((mask, tuple(shifts)))
+
+    _LINE_MASKS[key] = masks
+    return masks
+
+
+_LINE_MASKS: Dict[Tuple[int, int, int], List[List[Tuple[int, Tuple[int, ...]]]]] = {}
+
+
+def _board_masks(width: int, height: int) -> Tuple[int, int]:
+    """
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+
+    Returns:
+        Tuple[int, int]: mask of the bottom field of every column and mask of all fields of the board, without the sentinel bits
+    """
+    key: Tuple[int, int] = (width, height)
+    if key not in _BOARD_MASKS:
+        stride: int = height + 1
+        bottom: int = sum(1 << (col * stride) for col in range(width))
+        _BOARD_MASKS[key] = (bottom, bottom * ((1 << height) - 1))
+    return _BOARD_MASKS[key]
+
+
+_BOARD_MASKS: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+
+def state_bitboards(board_state: np.ndarray) -> Tuple[List[int], List[int]]:
+    """Gets the bitboards of a board state, without the hashes and mirror image a BitBoard keeps
+
+    Args:
+        board_state (np.ndarray): a board state
+
+    Returns:
+        Tuple[List[int], List[int]]: the bitboard of each player id and the number of pieces in each column
+    """
+    width, height = board_state.shape
+    stride: int = height + 1
+    bitboards: List[int] = [0, 0]
+    heights: List[int] = [0] * width
+    for col in range(width):
+        for row in range(height - 1, -1, -1):
+            field: int = board_state[col, row]
+            if field == 0:
+                break
+            bitboards[field - 1] |= 1 << (col * stride + heights[col])
+            heights[col] += 1
+    return bitboards, heights
+
+
+def playable_squares(bitboards: List[int], width: int, height: int) -> int:
+    """
+    Args:
+        bitboards (List[int]): the bitboard of each player id
+        width (int): width of the board
+        height (int): height of the board
+
+    Returns:
+        int: mask of the fields a piece can be played in right now, the lowest empty field of every column
+    """
+    bottom, full = _board_masks(width, height)
+    return (bitboards[0] + bitboards[1] + bottom) & full
+
+
+def winning_squares(bitboards: List[int], player_id: int, width: int, height: int, game_n: int) -> int:
+    """Finds the empty fields that would give a player n in a row, playable right now or not
+    For every direction and every place of the empty field within the line,
+    the pieces are shifted onto it from both sides; the empty sentinel bits
+    keep lines from wrapping around columns
+
+    Args:
+        bitboards (List[int]): the bitboard of each player id
+        player_id (int): the player
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+
+    Returns:
+        int: mask of the winning fields
+    """
+    pieces: int = bitboards[player_id - 1]
+    stride: int = height + 1
+    squares: int = 0
+    for shift in (1, stride, stride - 1, stride + 1): # vertical, horizontal, both diagonals
+        # On top of a vertical line of pieces is the only place an empty field can be
+        for offset in (range(game_n - 1, game_n) if shift == 1 else range(game_n)):
+            line: int = -1
+            for step in range(-offset, game_n - offset):
+                if step > 0:
+                    line &= pieces >> (step * shift)
+                elif step < 0:
+                    line &= pieces << (-step * shift)
+            squares |= line
+
+    _, full = _board_masks(width, height)
+    return squares & full & ~(bitboards[0] | bitboards[1])
+
+
+def zobrist_keys(width: int, height: int) -> List[List[int]]:
+    """Gets the Zobrist keys for a board size
+    The keys are seeded by the board size, so hashes are the same in every process
+
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+
+    Returns:
+        List[List[int]]: per player id - 1, a random 64 bit key for field (col, row) at index col * height + row
+    """
+    key: Tuple[int, int] = (width, height)
+    if key not in _ZOBRIST_KEYS:
+        generator: random.Random = random.Random(f'zobrist {width}x{height}')
+        _ZOBRIST_KEYS[key] = [[generator.getrandbits(64) for _ in range(width * height)] for _ in range(2)]
+    return _ZOBRIST_KEYS[key]
+
+
+_ZOBRIST_KEYS: Dict[Tuple[int, int], List[List[int]]] = {}
+
+
+class BitBoard(Board):
+    """A n in a row board backed by two bitboards
+    Inherits from Board
+
+    Every column takes up height + 1 bits, the lowest bit being the bottom field
+    and the extra top bit acting as a sentinel, so field (col, row) is bit
+    col * (height + 1) + (height - 1 - row). Python integers are unbounded, so
+    boards that don't fit in 64 bits simply use bigger integers; 'fits_64' tells
+    compiled code whether the bitboards can be passed on as uint64.
+    The bitboards of the mirror image are kept as well, so testing whether the
+    board is symmetric takes a single comparison.
+    The board state array is kept up to date alongside the bitboards, so the
+    heuristics can still read it without converting.
+    """
+    def __init__(self, *args) -> None:
+        """Constructor for the BitBoard class
+
+        *args follows the same formats as the Board constructor, where any
+        Board object (bitboard backed or not) can be converted
+
+        Raises:
+            TypeError: if none of the formats of the Board constructor are followed
+        """
+        # Copying a bitboard only needs to copy the integers
+        if len(args) == 1 and isinstance(args[0], BitBoard):
+            other: 'BitBoard' = args[0]
+            self.width = other.width
+            self.height = other.height
+            self.stride: int = other.stride
+            self.fits_64: bool = other.fits_64
+            self.board_state = other.get_board_state()
+            self.bitboards: List[int] = list(other.bitboards)
+            self.mirror_bitboards: List[int] = list(other.mirror_bitboards)
+            self.heights: List[int] = list(other.heights)
+            self.moves = list(other.moves)
+            self.zobrist = other.zobrist
+            self.hash = other.hash
+            self.mirror_hash = other.mirror_hash
+            self.state_view = _read_only_view(self.board_state)
+            return
+
+        if len(args) == 1 and isinstance(args[0], Board):
+            super().__init__(args[0].get_board_state())
+            self.moves = list(args[0].moves)
+        else:
+            super().__init__(*args)
+
+        self.stride = self.height + 1
+        self.fits_64 = self.width * self.stride <= 64
+        # One bitboard for each player id, the number of pieces in each column and the bitboards reflected left to right
+        self.bitboards, self.heights = state_bitboards(self.board_state)
+        self.mirror_bitboards = state_bitboards(self.board_state[::-1])[0]
+
+
+    def play(self, col: int, player_id: int) -> bool:
+        """Let player playerId make a move in column 'col'
+
+        Args:
+            col (int): column of the action
+            player_id (int): player that takes the action
+
+        Returns:
+            bool: true if succeeded
+        """
+        height: int = self.heights[col]
+        if height == self.height:
+            return False
+
+        self.bitboards[player_id - 1] |= 1 << (col * self.stride + height)
+        self.mirror_bitboards[player_id - 1] |= 1 << ((self.width - 1 - col) * self.stride + height)
+        self.board_state[col, self.height - 1 - height] = player_id
+        self.hash ^= self.zobrist[player_id - 1][col * self.height + self.height - 1 - height]
+        self.mirror_hash ^= self.zobrist[player_id - 1][(self.width - 1 - col) * self.height + self.height - 1 - height]
+        self.heights[col] = height + 1
+        self.moves.append(col)
+        return True
+
+
+    def undo(self) -> int:
+        """Takes back the last move played on this board with 'play'
+
+        Returns:
+            int: column of the move that was taken back
+        """
+        col: int = self.moves.pop()
+        height: int = self.heights[col] - 1
+        row: int = self.height - 1 - height
+
+        player_id: int = self.board_state[col, row]
+        self.bitboards[player_id - 1] ^= 1 << (col * self.stride + height)
+        self.mirror_bitboards[player_id - 1] ^= 1 << ((self.width - 1 - col) * self.stride + height)
+        self.hash ^= self.zobrist[player_id - 1][col * self.height + row]
+        self.mirror_hash ^= self.zobrist[player_id - 1][(self.width - 1 - col) * self.height + row]
+        self.board_state[col, row] = 0
+        self.heights[col] = height
+        return col
+
+
+    def is_valid(self, col: int) -> bool:
+        """Returns if a move is valid
+
+        Args:
+            col (int): column of the action
+
+        Returns:
+            bool: true if spot is not taken yet
+        """
+        return self.heights[col] < self.height
+
+
+    def is_symmetric(self) -> bool:
+        """
+        Returns:
+            bool: true if the board is its own mirror image, so mirrored moves lead to mirrored positions
+        """
+        return self.bitboards == self.mirror_bitboards
+
+
+    def get_playable_squares(self) -> int:
+        """
+        Returns:
+            int: mask of the fields a piece can be played in right now, the lowest empty field of every column
+        """
+        return playable_squares(self.bitboards, self.width, self.height)
+
+
+    def get_winning_squares(self, player_id: int, game_n: int) -> int:
+        """Finds the empty fields that would give a player n in a row, playable right now or not, see winning_squares
+
+        Args:
+            player_id (int): the player
+            game_n (int): n in a row required to win
+
+        Returns:
+            int: mask of the winning fields
+        """
+        return winning_squares(self.bitboards, player_id, self.width, self.height, game_n)
+
+
+    def get_new_board(self, col: int, player_id: int) -> 'BitBoard':
+        """Gets a new board given a player and their action
+
+        Args:
+            col (int): column of the action
+            player_id (int): player that takes the action
+
+        Returns:
+            BitBoard: a *new* BitBoard object with the resulting state
+        """
+        board: BitBoard = BitBoard(self)
+        board.play(col, player_id)
+        return board
+    
+
+    def get_winner(self, game_n: int) -> int:
+        """Determines whether a player has won, and if so, which one
+        Only the lines through the last move are checked, using shift-and-mask
+        tests on the bitboard of the player who made it
+
+        Args:
+            game_n (int): n in a row required to win
+
+        Returns:
+            int: 1 or 2 if the respective player won, -1 if the game is a draw, 0 otherwise
+        """
+        if not self.moves:
+            return super().get_winner(game_n)
+
+        col: int = self.moves[-1]
+        height: int = self.heights[col] - 1
+        player_id: int = int(self.board_state[col, self.height - 1 - height])
+        pieces: int = self.bitboards[player_id - 1]
+
+        for mask, shifts in _line_masks(self.width, self.height, game_n)[col * self.stride + height]:
+            line: int = pieces & mask
+            for shift in shifts:
+                line &= line >> shift
+            if line:
+                return player_id
+
+        # Only a move that fills its column can fill the board
+        if height == self.height - 1 and sum(self.heights) == self.width * self.height:
+            return -1 # The board is full, game is a draw
+        return 0
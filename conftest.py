@@ -0,0 +1,2 @@
+"""Makes the modules of the repository importable from the tests, which pytest does for the directory of this file
+"""
@@ -0,0 +1,330 @@
+"""Position datasets for fitting heuristics, exported from game records
+
+Every position before a move of a finished game is stored as a fixed size
+record: the bitboards of both players, the player to move, the outcome of the
+game for that player, and the score the search gave the move played, if it was
+recorded. The records follow a short header and are read back with
+numpy.memmap, so any position can be read without loading the file; a second
+file, the index, holds the number of the first position of every game.
+
+    python dataset.py --self-play 1000 --depth 4 --records games.bin --output positions.bin
+    python dataset.py --records games.bin more_games.bin --output positions.bin
+
+    dataset = PositionDataset('positions.bin')
+    batch = dataset.sample(4096, np.random.default_rng(0))
+    states = dataset.to_states(batch) # board states for Heuristic._evaluate
+"""
+from __future__ import annotations
+import argparse
+import random
+import struct
+from time import perf_counter
+from typing import BinaryIO, List, Optional, Sequence
+import numpy as np
+from benchmark import random_opening
+from board import BitBoard
+from heuristics import SimpleHeuristic
+from players import AlphaBetaPlayer, PlayerController
+from records import GameReader, GameRecord, GameWriter
+from transposition import TranspositionTable
+
+
+MAGIC: bytes = b'NRDS' # n in a row dataset
+VERSION: int = 2
+HEADER: struct.Struct = struct.Struct('<4sBBBBB7xQ') # magic, version, width, height, game_n, words per bitboard, number of positions
+
+
+def get_words(width: int, height: int) -> int:
+    """
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+
+    Returns:
+        int: number of 64 bit words a bitboard of the board size takes
+    """
+    return (width * (height + 1) + 63) // 64
+
+
+def get_dtype(words: int) -> np.dtype:
+    """
+    Args:
+        words (int): number of 64 bit words per bitboard
+
+    Returns:
+        np.dtype: the record of a position, packed without padding
+    """
+    return np.dtype([
+        ('pieces', '<u8', (2, words)), # bitboards of player 1 and player 2, lowest word first, laid out like BitBoard
+        ('to_move', 'u1'), # the player to move
+        ('outcome', 'i1'), # 1 if the player to move won the game, 0 for a draw, -1 if they lost
+        ('ply', '<u2'), # number of moves played
+        ('scored', 'u1'), # whether the score was recorded
+        ('score', '<i4'), # search score of the move played, for the player to move
+        ('game', '<u4'), # number of the game in the dataset
+    ])
+
+
+class DatasetWriter:
+    """Appends positions to a dataset file, in batches
+    """
+    def __init__(self, path: str, width: int, height: int, game_n: int, batch_size: int = 1 << 16) -> None:
+        """
+        Args:
+            path (str): path of the dataset file, it is overwritten; the index is written next to it with '.index' appended
+            width (int): width of the boards
+            height (int): height of the boards
+            game_n (int): n in a row required to win
+            batch_size (int): number of positions collected before they are written, at least the number of fields of the board
+        """
+        assert batch_size >= width * height, 'A whole game has to fit in a batch'
+        self.width: int = width
+        self.height: int = height
+        self.game_n: int = game_n
+        self.words: int = get_words(width, height)
+        self.dtype: np.dtype = get_dtype(self.words)
+        self.batch: np.ndarray = np.zeros(batch_size, dtype=self.dtype)
+        self.batch_count: int = 0
+        self.count: int = 0 # positions written
+        self.game_count: int = 0
+
+        self.file: BinaryIO = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height, game_n, self.words, 0))
+        self.index: BinaryIO = open(path + '.index', 'wb')
+
+
+    def add_game(self, game: GameRecord, board: Optional[BitBoard] = None) -> Optional[BitBoard]:
+        """Adds the positions before every move of a game, unless the game wasn't finished or has another board size
+
+        Args:
+            game (GameRecord): the game
+            board (Optional[BitBoard]): board to replay the game on, see GameRecord.replay
+
+        Returns:
+            Optional[BitBoard]: the board the game was replayed on, to reuse for the next game
+        """
+        if game.result == 0 or len(game.moves) == 0 or (game.width, game.height, game.game_n) != (self.width, self.height, self.game_n):
+            return board
+        if self.batch_count + len(game.moves) > len(self.batch):
+            self.flush()
+
+        np.array([self.count + self.batch_count], dtype='<u8').tofile(self.index)
+        mask: int = (1 << 64) - 1
+        pieces: List[List[List[int]]] = []
+        for ply, board in game.replay(board):
+            if ply == len(game.moves):
+                break # the game is over, there is no move to learn from
+            pieces.append([[board.bitboards[player] >> (64 * word) & mask for word in range(self.words)] for player in range(2)])
+
+        records: np.ndarray = self.batch[self.batch_count:self.batch_count + len(pieces)]
+        to_move: np.ndarray = np.array([game.get_player(ply) for ply in range(len(pieces))])
+        records['pieces'] = np.array(pieces, dtype=np.uint64)
+        records['to_move'] = to_move
+        records['outcome'] = 0 if game.result < 0 else np.where(to_move == game.result, 1, -1)
+        records['ply'] = np.arange(len(pieces))
+        # Random opening moves and book moves weren't searched
+        records['scored'] = game.stats['depth'] > 0 if game.stats is not None else False
+        records['score'] = game.stats['score'] if game.stats is not None else 0
+        records['game'] = self.game_count
+
+        self.batch_count += len(pieces)
+        self.game_count += 1
+        return board
+
+
+    def flush(self) -> None:
+        """Writes the collected positions to the file
+        """
+        self.batch[:self.batch_count].tofile(self.file)
+        self.count += self.batch_count
+        self.batch_count = 0
+
+
+    def close(self) -> None:
+        """Writes the remaining positions and the number of positions, and closes the files
+        """
+        self.flush()
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.width, self.height, self.game_n, self.words, self.count))
+        self.file.close()
+        self.index.close()
+
+
+class PositionDataset:
+    """A dataset file, memory-mapped so positions are only read when they are used
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): path of the dataset file
+        """
+        with open(path, 'rb') as file:
+            magic, version, self.width, self.height, self.game_n, words, count = HEADER.unpack(file.read(HEADER.size))
+        assert magic == MAGIC and version == VERSION, f'{path} is not a position dataset'
+
+        self.stride: int = self.height + 1
+        self.positions: np.ndarray = np.zeros(0, dtype=get_dtype(words)) # empty files can't be mapped
+        self.games: np.ndarray = np.zeros(0, dtype='<u8') # number of the first position of every game
+        if count > 0:
+            self.positions = np.memmap(path, dtype=get_dtype(words), mode='r', offset=HEADER.size, shape=(count,))
+            self.games = np.memmap(path + '.index', dtype='<u8', mode='r')
+
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: number of positions
+        """
+        return len(self.positions)
+
+
+    def sample(self, count: int, generator: np.random.Generator) -> np.ndarray:
+        """Picks random positions
+        The positions are read in file order, so reading them touches every page at most once
+
+        Args:
+            count (int): number of positions
+            generator (np.random.Generator): source of randomness
+
+        Returns:
+            np.ndarray: the records of the positions, copied into memory
+        """
+        indices: np.ndarray = np.sort(generator.choice(len(self.positions), size=min(count, len(self.positions)), replace=False))
+        return self.positions[indices]
+
+
+    def get_game(self, game: int) -> np.ndarray:
+        """
+        Args:
+            game (int): number of the game
+
+        Returns:
+            np.ndarray: the records of the positions of the game, a view of the file
+        """
+        end: int = int(self.games[game + 1]) if game + 1 < len(self.games) else len(self.positions)
+        return self.positions[int(self.games[game]):end]
+
+
+    def to_states(self, records: np.ndarray) -> np.ndarray:
+        """Unpacks the bitboards of positions into board states
+
+        Args:
+            records (np.ndarray): records of positions
+
+        Returns:
+            np.ndarray: array of shape (positions, width, height) with the board states, laid out like Board.board_state
+        """
+        states: np.ndarray = np.zeros((len(records), self.width, self.height), dtype=int)
+        for col in range(self.width):
+            for height in range(self.height): # counted from the bottom, like the bits
+                bit: int = col * self.stride + height
+                for player in range(2):
+                    pieces: np.ndarray = records['pieces'][:, player, bit // 64]
+                    states[:, col, self.height - 1 - height] += (player + 1) * ((pieces >> np.uint64(bit % 64)) & np.uint64(1)).astype(int)
+        return states
+
+
+    def get_board(self, index: int) -> BitBoard:
+        """
+        Args:
+            index (int): number of the position
+
+        Returns:
+            BitBoard: a board with the position, without the moves that led to it
+        """
+        return BitBoard(self.to_states(self.positions[index:index + 1])[0])
+
+
+def self_play(path: str, games: int, width: int, height: int, game_n: int, depth: int, plies: int, seed: int = 0) -> None:
+    """Plays games between two alpha-beta players and appends them to a record file, with the search statistics
+
+    Args:
+        path (str): path of the record file
+        games (int): number of games
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        depth (int): search depth of the players
+        plies (int): number of random moves at the start of every game, so the games differ
+        seed (int): seed of the random moves
+    """
+    generator: random.Random = random.Random(seed)
+    writer: GameWriter = GameWriter(path, stats=True)
+    description: str = f'AlphaBetaPlayer depth {depth}'
+
+    for _ in range(games):
+        players: List[PlayerController] = [
+            AlphaBetaPlayer(player_id, game_n, depth, SimpleHeuristic(game_n), transposition_table=TranspositionTable(1 << 16), threat_pruning=True)
+            for player_id in (1, 2)
+        ]
+        board: BitBoard = BitBoard(width, height)
+        writer.begin_game(width, height, game_n, [description, description])
+        winner: int = 0
+
+        for col in random_opening(width, height, min(plies, 2 * game_n - 2), generator):
+            writer.add_move(col)
+            board.play(col, 1 + len(board.moves) % 2)
+
+        while winner == 0:
+            player: AlphaBetaPlayer = players[len(board.moves) % 2]
+            nodes: int = player.get_node_count()
+            start: float = perf_counter()
+            col = player.make_move(board)
+            millis: int = int((perf_counter() - start) * 1000)
+            board.play(col, player.player_id)
+            writer.add_move(col, player.get_node_count() - nodes, millis, player.last_depth, player.last_score)
+            winner = board.get_winner(game_n)
+
+        writer.end_game(winner)
+        for player in players:
+            player.close()
+    writer.close()
+
+
+def export(record_paths: Sequence[str], path: str, width: int, height: int, game_n: int) -> int:
+    """Exports the positions of the finished games of record files with one board size to a dataset
+
+    Args:
+        record_paths (Sequence[str]): paths of the record files
+        path (str): path of the dataset file
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+
+    Returns:
+        int: number of positions written
+    """
+    writer: DatasetWriter = DatasetWriter(path, width, height, game_n)
+    board: Optional[BitBoard] = None
+    for record_path in record_paths:
+        reader: GameReader = GameReader(record_path)
+        for game in reader:
+            board = writer.add_game(game, board)
+        reader.close()
+    writer.close()
+    return writer.count
+
+
+def main() -> None:
+    """Exports a dataset with the settings from the command line, playing games first if asked to
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Export positions of recorded games to a dataset')
+    parser.add_argument('--records', nargs='+', default=['games.bin'], help='game record files; self-play games are added to the first')
+    parser.add_argument('--output', default='positions.bin')
+    parser.add_argument('--width', type=int, default=7)
+    parser.add_argument('--height', type=int, default=6)
+    parser.add_argument('--game-n', type=int, default=4)
+    parser.add_argument('--self-play', type=int, default=0, help='number of games to play and record first')
+    parser.add_argument('--depth', type=int, default=4, help='search depth of the self-play games')
+    parser.add_argument('--random-plies', type=int, default=2, help='random moves at the start of every self-play game')
+    parser.add_argument('--seed', type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    if args.self_play > 0:
+        self_play(args.records[0], args.self_play, args.width, args.height, args.game_n, args.depth, args.random_plies, args.seed)
+    count: int = export(args.records, args.output, args.width, args.height, args.game_n)
+    print(f'Wrote {count} positions to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 from __future__ import annotations
+import json
 import numpy as np
 from abc import abstractmethod
 from numba import jit
-from typing import TYPE_CHECKING
+from numba.core.dispatcher import Dispatcher
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+from search import WIN_THRESHOLD, threat_moves
 if TYPE_CHECKING:
     from board import Board
 
@@ -21,23 +24,30 @@ class Heuristic:
 
     def get_best_action(self, player_id: int, board: Board) -> int:
         """Determines the best column for the next move
+        Only the moves threat_moves keeps are evaluated, so a win is always taken
+        and a win of the opponent always blocked
 
         Args:
             player_id (int): the player for which to compute the heuristic value
-            board (Board): the board to evaluate
+            board (Board): the board to evaluate, the moves are played on it and taken back
 
         Returns:
             int: column with the best heuristic value
         """
-        min_util: int = -max(board.get_board_state().shape)
-        utils: np.ndarray = np.full(board.width, min_util - 1, dtype=int)
-
-        for i in range(board.width):
-            if board.is_valid(i):
-                self.eval_count += 1
-                utils[i] = self.evaluate_board(player_id, board.get_new_board(i, player_id))
-
-        return np.argmax(utils)
+        utils: np.ndarray = np.full(board.width, -np.inf) # columns that aren't evaluated are never picked
+        moves: List[int] = threat_moves(board, player_id, self.game_n, [i for i in range(board.width) if board.is_valid(i)])
+
+        symmetric: bool = board.is_symmetric()
+        for i in moves:
+            if symmetric and 2 * i > board.width - 1: # the mirrored move has the same utility
+                utils[i] = utils[board.width - 1 - i]
+            else:
+                # Played on the board itself and taken back, so no board is copied
+                board.play(i, player_id)
+                utils[i] = self.evaluate_board(player_id, board)
+                board.undo()
+
+        return int(np.argmax(utils))
     
 
     def evaluate_board(self, player_id: int, board: Board) -> int:
@@ -45,14 +55,33 @@ class Heuristic:
 
         Args:
             player_id (int): the player for which to compute the heuristic value
-            board (Board): the board to evaluate
+            board (Board): the board to evaluate, its state is read without copying it
 
         Returns:
             int: the utility of a board
         """
         self.eval_count += 1
-        state: np.ndarray = board.get_board_state()
-        return self._evaluate(player_id, state, self.winning(state, self.game_n))
+        state: np.ndarray = board.get_state_view()
+        return self._evaluate(player_id, state, board.get_winner(self.game_n))
+    
+
+    def evaluate_many(self, player_id: int, states: np.ndarray) -> np.ndarray:
+        """Assigns a utility to many board states at once
+        For heuristics with a compiled _evaluate, win detection and scoring of
+        all states happen in a single compiled call
+
+        Args:
+            player_id (int): the player for which to compute the heuristic values
+            states (np.ndarray): array of shape (boards, width, height) with the board states
+
+        Returns:
+            np.ndarray: the utility of every board state
+        """
+        self.eval_count += len(states)
+        if isinstance(self._evaluate, Dispatcher):
+            return _get_evaluate_many(self._evaluate)(player_id, states, self.game_n)
+
+        return np.array([self._evaluate(player_id, state, self.winning(state, self.game_n)) for state in states], dtype=np.int64)
     
 
     @staticmethod
@@ -103,6 +132,33 @@ class Heuristic:
         pass    
 
 
+def _get_evaluate_many(evaluate: Dispatcher) -> Callable[[int, np.ndarray, int], np.ndarray]:
+    """Gets a compiled function that detects wins and scores many states with a compiled _evaluate
+    The function is compiled once per _evaluate, which is built into it so calling it is cheap
+
+    Args:
+        evaluate (Dispatcher): the compiled _evaluate of a heuristic
+
+    Returns:
+        Callable[[int, np.ndarray, int], np.ndarray]: function taking a player id, states and game_n, returning the scores
+    """
+    if evaluate not in _EVALUATE_MANY:
+        from app import winning # imported here to avoid circular imports
+
+        @jit(nopython=True)
+        def evaluate_many(player_id: int, states: np.ndarray, game_n: int) -> np.ndarray:
+            scores: np.ndarray = np.empty(states.shape[0], dtype=np.int64)
+            for i in range(states.shape[0]):
+                scores[i] = evaluate(player_id, states[i], winning(states[i], game_n))
+            return scores
+
+        _EVALUATE_MANY[evaluate] = evaluate_many
+    return _EVALUATE_MANY[evaluate]
+
+
+_EVALUATE_MANY: Dict[Dispatcher, Callable[[int, np.ndarray, int], np.ndarray]] = {}
+
+
 class SimpleHeuristic(Heuristic):
     """A simple heuristic
     Inherits from Heuristic
@@ -174,10 +230,524 @@ class SimpleHeuristic(Heuristic):
                     else:
                         break
 
-                for a in range(1, min(width - i, j)):
+                for a in range(1, min(width - i, j + 1)):
                     if state[i + a, j - a] == player_id:
                         max_in_row = max(max_in_row, a + 1)
                     else:
                         break
         return max_in_row
 
+
+class WindowHeuristic(Heuristic):
+    """A heuristic scoring every window of n fields in a row
+    Inherits from Heuristic
+
+    A window that holds k pieces of the player and none of the opponent adds
+    weights[k] to the score, a window with only k opponent pieces subtracts it.
+    """
+    def __init__(self, game_n: int, weights: Optional[Sequence[int]] = None) -> None:
+        """
+        Args:
+            game_n (int): n in a row required to win
+            weights (Optional[Sequence[int]]): value of a window with 0 up to n - 1 pieces of one player,
+                by default 4^(k - 1) for k pieces
+        """
+        super().__init__(game_n)
+        if weights is None:
+            weights = [0] + [4 ** (k - 1) for k in range(1, game_n)]
+        assert len(weights) == game_n, 'There must be a weight for 0 up to n - 1 pieces'
+
+        self.weights: np.ndarray = np.array(list(weights) + [0], dtype=np.int64)
+        self.windows: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+    def _name(self) -> str:
+        """
+        Returns:
+            str: the name of the heuristic; Window
+        """
+        return 'Window'
+
+
+    def get_windows(self, width: int, height: int) -> np.ndarray:
+        """Gets the windows of a board size, computed once per size
+
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+
+        Returns:
+            np.ndarray: array of shape (windows, n) with the flattened indices (col * height + row) of every window
+        """
+        if (width, height) not in self.windows:
+            cols: np.ndarray
+            rows: np.ndarray
+            cols, rows = np.meshgrid(np.arange(width), np.arange(height), indexing='ij')
+            steps: np.ndarray = np.arange(self.game_n)
+            windows: list = []
+
+            for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_cols: np.ndarray = cols + (self.game_n - 1) * dx
+                end_rows: np.ndarray = rows + (self.game_n - 1) * dy
+                fits: np.ndarray = (end_cols < width) & (0 <= end_rows) & (end_rows < height)
+                start_cols: np.ndarray = cols[fits][:, None]
+                start_rows: np.ndarray = rows[fits][:, None]
+                windows.append((start_cols + steps * dx) * height + start_rows + steps * dy)
+
+            self.windows[(width, height)] = np.ascontiguousarray(np.concatenate(windows), dtype=np.int64)
+        return self.windows[(width, height)]
+
+
+    def get_win_value(self, width: int, height: int) -> int:
+        """
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+
+        Returns:
+            int: value of a won board, higher than any other board can score
+        """
+        return len(self.get_windows(width, height)) * int(self.weights.max()) + 1
+
+
+    def _evaluate(self, player_id: int, state: np.ndarray, winner: int) -> int:
+        """Determine utility of a board state
+
+        Args:
+            player_id (int): the player for which to compute the heuristic value
+            state (np.ndarray): the board to check
+            winner (int): 1 or 2 if the respective player won, -1 if the game is a draw, 0 otherwise
+
+        Returns:
+            int: heuristic value for the board state
+        """
+        width: int
+        height: int
+        width, height = state.shape
+
+        if winner == player_id: # player won
+            return self.get_win_value(width, height)
+        elif winner < 0: # draw
+            return 0
+        elif winner > 0: # player lost
+            return -self.get_win_value(width, height)
+
+        return int(_score_windows(player_id, state.reshape(1, width * height), height, self.get_windows(width, height), self.weights, 0)[0])
+
+
+    def evaluate_many(self, player_id: int, states: np.ndarray) -> np.ndarray:
+        """Determine the utility of many board states at once
+        Wins and draws are detected from the windows, so no winner is needed
+
+        Args:
+            player_id (int): the player for which to compute the heuristic values
+            states (np.ndarray): array of shape (boards, width, height) with the board states
+
+        Returns:
+            np.ndarray: heuristic value for every board state
+        """
+        count: int
+        width: int
+        height: int
+        count, width, height = states.shape
+        self.eval_count += count
+
+        flat: np.ndarray = np.ascontiguousarray(states).reshape(count, width * height)
+        return _score_windows(player_id, flat, height, self.get_windows(width, height), self.weights, self.get_win_value(width, height))
+
+
+@jit(nopython=True, cache=True)
+def _score_windows(player_id: int, states: np.ndarray, height: int, windows: np.ndarray, weights: np.ndarray, win_value: int) -> np.ndarray:
+    """Scores flattened board states by the pieces in their windows
+
+    Args:
+        player_id (int): the player for which to compute the heuristic values
+        states (np.ndarray): array of shape (boards, width * height) with the flattened board states
+        height (int): height of the boards
+        windows (np.ndarray): array of shape (windows, n) with the flattened indices of every window
+        weights (np.ndarray): value of a window with 0 up to n pieces of one player
+        win_value (int): value of a won board, 0 to not check for wins and draws
+
+    Returns:
+        np.ndarray: heuristic value for every board state
+    """
+    game_n: int = windows.shape[1]
+    scores: np.ndarray = np.zeros(states.shape[0], dtype=np.int64)
+
+    for s in range(states.shape[0]):
+        state: np.ndarray = states[s]
+        score: int = 0
+        winner: int = 0
+
+        for w in range(windows.shape[0]):
+            own: int = 0
+            other: int = 0
+            for k in range(game_n):
+                field: int = state[windows[w, k]]
+                if field == player_id:
+                    own += 1
+                elif field != 0:
+                    other += 1
+
+            if other == 0:
+                score += weights[own]
+            elif own == 0:
+                score -= weights[other]
+
+            if win_value != 0 and winner == 0:
+                if own == game_n:
+                    winner = 1
+                elif other == game_n:
+                    winner = -1
+
+        if winner != 0:
+            score = winner * win_value
+        elif win_value != 0:
+            # Check for a draw, the top field of every column is taken
+            full: bool = True
+            for col in range(state.shape[0] // height):
+                if state[col * height] == 0:
+                    full = False
+                    break
+            if full:
+                score = 0
+        scores[s] = score
+
+    return scores
+
+
+LINEAR_WEIGHTS_PATH: str = 'linear_weights.json'
+LINEAR_SCALE: int = 1000 # heuristic value of a weighted feature sum of 1
+
+
+def get_linear_feature_count(width: int, game_n: int) -> int:
+    """The features of LinearHeuristic, from the view of one player, are in this order:
+    windows with 1 up to n - 1 own pieces and no opponent pieces, windows with
+    1 up to n - 1 opponent pieces and no own pieces, windows one own piece from a
+    win whose empty field can be played right away, the same for the opponent,
+    and for every pair of mirrored columns the own minus the opponent pieces in them
+
+    Args:
+        width (int): width of the board
+        game_n (int): n in a row required to win
+
+    Returns:
+        int: number of features
+    """
+    return 2 * game_n + (width + 1) // 2
+
+
+def load_linear_weights(path: str, width: int, height: int, game_n: int) -> Optional[np.ndarray]:
+    """
+    Args:
+        path (str): path of the weights file
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+
+    Returns:
+        Optional[np.ndarray]: the weights stored for the board size, None if there are none
+    """
+    try:
+        with open(path) as file:
+            weights: Dict[str, List[float]] = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    key: str = f'{width}x{height}x{game_n}'
+    return np.array(weights[key], dtype=np.float64) if key in weights else None
+
+
+def save_linear_weights(path: str, width: int, height: int, game_n: int, weights: np.ndarray) -> None:
+    """Stores the weights of a board size, keeping those of other sizes in the file
+
+    Args:
+        path (str): path of the weights file
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        weights (np.ndarray): the weights, one per feature
+    """
+    assert len(weights) == get_linear_feature_count(width, game_n), 'There must be a weight for every feature'
+    stored: Dict[str, List[float]] = {}
+    try:
+        with open(path) as file:
+            stored = json.load(file)
+    except FileNotFoundError:
+        pass
+
+    stored[f'{width}x{height}x{game_n}'] = [float(weight) for weight in weights]
+    with open(path, 'w') as file:
+        json.dump(stored, file, indent=4, sort_keys=True)
+
+
+class LinearHeuristic(WindowHeuristic):
+    """A heuristic scoring a board with a learned weighted sum of window and column features
+    Inherits from WindowHeuristic, for its windows
+
+    The weights are fitted to the outcomes of recorded games by train.py and
+    loaded per board size; sizes without stored weights get hand-picked weights
+    close to those of WindowHeuristic. See get_linear_feature_count for the features.
+    """
+    def __init__(self, game_n: int, path: Optional[str] = LINEAR_WEIGHTS_PATH) -> None:
+        """
+        Args:
+            game_n (int): n in a row required to win
+            path (Optional[str]): path of the weights file, None to always use the default weights
+        """
+        super().__init__(game_n)
+        self.path: Optional[str] = path
+        self.linear_weights: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+    def _name(self) -> str:
+        """
+        Returns:
+            str: the name of the heuristic; Linear
+        """
+        return 'Linear'
+
+
+    def get_default_weights(self, width: int) -> np.ndarray:
+        """
+        Args:
+            width (int): width of the board
+
+        Returns:
+            np.ndarray: the weights used when none are stored, windows counting 4 times more per piece
+        """
+        windows: np.ndarray = np.array([4.0 ** (k - 1) for k in range(1, self.game_n)]) / 100
+        threats: np.ndarray = np.array([0.25, -0.25])
+        return np.concatenate((windows, -windows, threats, np.zeros((width + 1) // 2)))
+
+
+    def get_linear_weights(self, width: int, height: int) -> np.ndarray:
+        """Gets the weights of a board size, loaded once per size
+
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+
+        Returns:
+            np.ndarray: the weights, one per feature
+        """
+        if (width, height) not in self.linear_weights:
+            weights: Optional[np.ndarray] = None
+            if self.path is not None:
+                weights = load_linear_weights(self.path, width, height, self.game_n)
+            self.set_linear_weights(width, height, weights if weights is not None else self.get_default_weights(width))
+        return self.linear_weights[(width, height)]
+
+
+    def set_linear_weights(self, width: int, height: int, weights: np.ndarray) -> None:
+        """Uses other weights for a board size, without storing them
+
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+            weights (np.ndarray): the weights, one per feature
+        """
+        assert len(weights) == get_linear_feature_count(width, self.game_n), 'There must be a weight for every feature'
+        self.linear_weights[(width, height)] = np.ascontiguousarray(weights, dtype=np.float64)
+        assert self.get_win_value(width, height) < WIN_THRESHOLD, 'The weights are too large to tell heuristic values from wins'
+
+
+    def get_win_value(self, width: int, height: int) -> int:
+        """
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+
+        Returns:
+            int: value of a won board, higher than any other board can score
+        """
+        windows: int = len(self.get_windows(width, height))
+        limits: np.ndarray = np.full(get_linear_feature_count(width, self.game_n), windows, dtype=np.float64)
+        limits[2 * self.game_n:] = 2 * height # a pair of columns holds at most 2 * height pieces
+        return int(LINEAR_SCALE * np.abs(self.get_linear_weights(width, height)) @ limits) + 1
+
+
+    def get_features(self, player_ids: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """Computes the features of many board states, for training
+
+        Args:
+            player_ids (np.ndarray): the player from whose view the features of every state are computed
+            states (np.ndarray): array of shape (boards, width, height) with the board states
+
+        Returns:
+            np.ndarray: array of shape (boards, features) with the features
+        """
+        count: int
+        width: int
+        height: int
+        count, width, height = states.shape
+        flat: np.ndarray = np.ascontiguousarray(states).reshape(count, width * height)
+        features: np.ndarray = np.zeros((count, get_linear_feature_count(width, self.game_n)), dtype=np.float64)
+        _linear_features(np.ascontiguousarray(player_ids, dtype=np.int64), flat, height, self.get_windows(width, height), features)
+        return features
+
+
+    def _evaluate(self, player_id: int, state: np.ndarray, winner: int) -> int:
+        """Determine utility of a board state
+
+        Args:
+            player_id (int): the player for which to compute the heuristic value
+            state (np.ndarray): the board to check
+            winner (int): 1 or 2 if the respective player won, -1 if the game is a draw, 0 otherwise
+
+        Returns:
+            int: heuristic value for the board state
+        """
+        width: int
+        height: int
+        width, height = state.shape
+        weights: np.ndarray = self.get_linear_weights(width, height)
+
+        if winner == player_id: # player won
+            return self.get_win_value(width, height)
+        elif winner < 0: # draw
+            return 0
+        elif winner > 0: # player lost
+            return -self.get_win_value(width, height)
+
+        return int(_score_linear(player_id, state.reshape(1, width * height), height, self.get_windows(width, height), weights, 0)[0])
+
+
+    def evaluate_many(self, player_id: int, states: np.ndarray) -> np.ndarray:
+        """Determine the utility of many board states at once
+        Wins and draws are detected from the windows, so no winner is needed
+
+        Args:
+            player_id (int): the player for which to compute the heuristic values
+            states (np.ndarray): array of shape (boards, width, height) with the board states
+
+        Returns:
+            np.ndarray: heuristic value for every board state
+        """
+        count: int
+        width: int
+        height: int
+        count, width, height = states.shape
+        self.eval_count += count
+        weights: np.ndarray = self.get_linear_weights(width, height)
+
+        flat: np.ndarray = np.ascontiguousarray(states).reshape(count, width * height)
+        return _score_linear(player_id, flat, height, self.get_windows(width, height), weights, self.get_win_value(width, height))
+
+
+@jit(nopython=True, cache=True)
+def _state_features(player_id: int, state: np.ndarray, height: int, windows: np.ndarray, features: np.ndarray) -> int:
+    """Computes the features of LinearHeuristic of a flattened board state
+
+    Args:
+        player_id (int): the player from whose view the features are computed
+        state (np.ndarray): the flattened board state
+        height (int): height of the board
+        windows (np.ndarray): array of shape (windows, n) with the flattened indices of every window
+        features (np.ndarray): array the features are written to
+
+    Returns:
+        int: 1 if the player has a window of n pieces, -1 if the opponent has one, 0 otherwise
+    """
+    game_n: int = windows.shape[1]
+    width: int = state.shape[0] // height
+    winner: int = 0
+    features[:] = 0
+
+    for w in range(windows.shape[0]):
+        own: int = 0
+        other: int = 0
+        empty: int = -1
+        for k in range(game_n):
+            field: int = state[windows[w, k]]
+            if field == player_id:
+                own += 1
+            elif field != 0:
+                other += 1
+            else:
+                empty = windows[w, k]
+
+        if own == game_n:
+            if winner == 0:
+                winner = 1
+        elif other == game_n:
+            if winner == 0:
+                winner = -1
+        elif other == 0 and own > 0:
+            features[own - 1] += 1
+        elif own == 0 and other > 0:
+            features[game_n - 2 + other] += 1
+
+        # One piece from a win, and the empty field is the next one played in its column
+        if own + other == game_n - 1 and (own == 0 or other == 0):
+            if empty % height == height - 1 or state[empty + 1] != 0:
+                features[2 * game_n - 2 + (1 if own == 0 else 0)] += 1
+
+    for col in range(width):
+        pair: int = 2 * game_n + min(col, width - 1 - col)
+        for row in range(height):
+            field = state[col * height + row]
+            if field == player_id:
+                features[pair] += 1
+            elif field != 0:
+                features[pair] -= 1
+
+    return winner
+
+
+@jit(nopython=True, cache=True)
+def _linear_features(player_ids: np.ndarray, states: np.ndarray, height: int, windows: np.ndarray, features: np.ndarray) -> None:
+    """Computes the features of LinearHeuristic of flattened board states
+
+    Args:
+        player_ids (np.ndarray): the player from whose view the features of every state are computed
+        states (np.ndarray): array of shape (boards, width * height) with the flattened board states
+        height (int): height of the boards
+        windows (np.ndarray): array of shape (windows, n) with the flattened indices of every window
+        features (np.ndarray): array of shape (boards, features) the features are written to
+    """
+    for s in range(states.shape[0]):
+        _state_features(player_ids[s], states[s], height, windows, features[s])
+
+
+@jit(nopython=True, cache=True)
+def _score_linear(player_id: int, states: np.ndarray, height: int, windows: np.ndarray, weights: np.ndarray, win_value: int) -> np.ndarray:
+    """Scores flattened board states by the weighted sum of their features
+
+    Args:
+        player_id (int): the player for which to compute the heuristic values
+        states (np.ndarray): array of shape (boards, width * height) with the flattened board states
+        height (int): height of the boards
+        windows (np.ndarray): array of shape (windows, n) with the flattened indices of every window
+        weights (np.ndarray): the weight of every feature
+        win_value (int): value of a won board, 0 to not check for wins and draws
+
+    Returns:
+        np.ndarray: heuristic value for every board state
+    """
+    scores: np.ndarray = np.zeros(states.shape[0], dtype=np.int64)
+    features: np.ndarray = np.zeros(weights.shape[0], dtype=np.float64) # reused for every state
+
+    for s in range(states.shape[0]):
+        state: np.ndarray = states[s]
+        winner: int = _state_features(player_id, state, height, windows, features)
+
+        if win_value != 0 and winner != 0:
+            scores[s] = winner * win_value
+            continue
+        if win_value != 0:
+            # Check for a draw, the top field of every column is taken
+            full: bool = True
+            for col in range(state.shape[0] // height):
+                if state[col * height] == 0:
+                    full = False
+                    break
+            if full:
+                continue # a draw scores 0
+
+        score: float = 0.0
+        for f in range(weights.shape[0]):
+            score += weights[f] * features[f]
+        scores[s] = int(round(LINEAR_SCALE * score))
+
+    return scores
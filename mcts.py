@@ -0,0 +1,325 @@
+from __future__ import annotations
+from math import log, sqrt
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
+from numba import jit
+from search import center_first
+if TYPE_CHECKING:
+    from board import Board
+
+
+class MCTSNode:
+    """Node of a Monte Carlo search tree
+    """
+    __slots__ = ('move', 'player_id', 'hash', 'parent', 'children', 'untried', 'winner', 'visits', 'wins')
+
+    def __init__(self, move: int, player_id: int, board: Board, parent: Optional[MCTSNode], winner: int) -> None:
+        """
+        Args:
+            move (int): column played to reach the node, -1 for the root
+            player_id (int): the player that made the move
+            board (Board): the board after the move
+            parent (Optional[MCTSNode]): the parent node, None for the root
+            winner (int): 1 or 2 if the respective player won, -1 for a draw, 0 otherwise
+        """
+        self.move: int = move
+        self.player_id: int = player_id
+        self.hash: int = board.hash
+        self.parent: Optional[MCTSNode] = parent
+        self.children: Dict[int, MCTSNode] = {}
+        self.untried: List[int] = [] if winner != 0 else [col for col in center_first(board.width)[::-1] if board.is_valid(col)] # popped from the back
+        self.winner: int = winner
+        self.visits: int = 0
+        self.wins: float = 0.0 # playouts won by the player that made the move, draws count half
+
+
+    def get_size(self) -> int:
+        """
+        Returns:
+            int: number of nodes in the subtree of this node
+        """
+        size: int = 0
+        stack: List[MCTSNode] = [self]
+        while stack:
+            node: MCTSNode = stack.pop()
+            size += 1
+            stack.extend(node.children.values())
+        return size
+
+
+class MCTS:
+    """Monte Carlo tree search with UCT selection
+
+    Every iteration walks down the tree picking the child with the best upper
+    confidence bound, adds one new child and plays a batch of playouts from it
+    in a single compiled call. The tree is kept between moves: when the position
+    to search is a child or grandchild of the previous root, that subtree becomes
+    the new root and the rest is dropped.
+    """
+    def __init__(self, player_id: int, game_n: int, batch_size: int = 16, exploration: float = sqrt(2), light_playouts: bool = True,
+                 reuse_tree: bool = True, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            player_id (int): id of the player that searches, can take values 1 or 2
+            game_n (int): n in a row required to win
+            batch_size (int): number of playouts from every new node
+            exploration (float): exploration constant of the upper confidence bound
+            light_playouts (bool): whether playouts take immediate wins and block immediate losses, otherwise they are random
+            reuse_tree (bool): whether to keep the subtree of the new position between moves
+            seed (Optional[int]): seed of the random playouts, None to not seed them
+        """
+        self.player_id: int = player_id
+        self.game_n: int = game_n
+        self.batch_size: int = batch_size
+        self.exploration: float = exploration
+        self.light_playouts: bool = light_playouts
+        self.reuse_tree: bool = reuse_tree
+        if seed is not None:
+            _seed(seed)
+
+        self.root: Optional[MCTSNode] = None
+        self.iteration_count: int = 0 # number of iterations over all moves
+        self.playout_count: int = 0 # number of playouts over all moves
+        self.reused_nodes: int = 0 # number of nodes kept from the previous move for the last search
+
+
+    def search(self, board: Board, iterations: Optional[int] = None, time_limit: Optional[int] = None) -> Tuple[int, float]:
+        """Searches the board for the best move of the player
+
+        Args:
+            board (Board): the board to search, it is changed during the search but restored afterwards
+            iterations (Optional[int]): number of iterations, None for no limit
+            time_limit (Optional[int]): time budget in milliseconds, None for no limit
+
+        Returns:
+            Tuple[int, float]: the most visited column and the share of its playouts the player won
+        """
+        assert iterations is not None or time_limit is not None, 'The search needs an iteration or time budget'
+        self.root = self.get_root(board)
+        deadline: float = perf_counter() + time_limit / 1000 if time_limit is not None else float('inf')
+
+        iteration: int = 0
+        while (iterations is None or iteration < iterations) and (iteration == 0 or perf_counter() < deadline):
+            self.iterate(board)
+            iteration += 1
+        self.iteration_count += iteration
+
+        best: MCTSNode = max(self.root.children.values(), key=lambda child: child.visits)
+        return best.move, best.wins / best.visits
+
+
+    def get_root(self, board: Board) -> MCTSNode:
+        """Finds the node of the board in the tree of the previous search, or creates a new root
+
+        Args:
+            board (Board): the board to search
+
+        Returns:
+            MCTSNode: the root for the search
+        """
+        self.reused_nodes = 0
+        if self.reuse_tree and self.root is not None:
+            # The position is the root itself, the move the player made or the reply of the opponent to it
+            candidates: List[MCTSNode] = [self.root]
+            for child in self.root.children.values():
+                candidates.append(child)
+                candidates.extend(child.children.values())
+
+            for node in candidates:
+                if node.hash == board.hash and node.player_id != self.player_id:
+                    node.parent = None
+                    self.reused_nodes = node.get_size()
+                    return node
+
+        return MCTSNode(-1, 3 - self.player_id, board, None, board.get_winner(self.game_n) if board.moves else 0)
+
+
+    def iterate(self, board: Board) -> None:
+        """Runs one iteration: selection, expansion, playouts and backpropagation
+
+        Args:
+            board (Board): the board of the root, restored afterwards
+        """
+        node: MCTSNode = self.root
+        played: int = 0
+
+        # Selection
+        while not node.untried and node.children:
+            node = self.select_child(node)
+            board.play(node.move, node.player_id)
+            played += 1
+
+        # Expansion
+        if node.untried:
+            col: int = node.untried.pop()
+            player_id: int = 3 - node.player_id
+            board.play(col, player_id)
+            played += 1
+            child: MCTSNode = MCTSNode(col, player_id, board, node, board.get_winner(self.game_n))
+            node.children[col] = child
+            node = child
+
+        # Playouts
+        wins: np.ndarray
+        if node.winner != 0:
+            wins = np.full(self.batch_size, node.winner, dtype=np.int64)
+        else:
+            wins = _playouts(board.board_state, 3 - node.player_id, self.game_n, self.batch_size, self.light_playouts)
+        self.playout_count += self.batch_size
+
+        # Backpropagation, every player counts the playouts they won
+        scores: Dict[int, float] = {
+            1: float((wins == 1).sum()) + 0.5 * float((wins < 0).sum()),
+            2: float((wins == 2).sum()) + 0.5 * float((wins < 0).sum()),
+        }
+        while node is not None:
+            node.visits += self.batch_size
+            node.wins += scores[node.player_id]
+            node = node.parent
+
+        for _ in range(played):
+            board.undo()
+
+
+    def select_child(self, node: MCTSNode) -> MCTSNode:
+        """
+        Args:
+            node (MCTSNode): a fully expanded node
+
+        Returns:
+            MCTSNode: the child with the highest upper confidence bound
+        """
+        log_visits: float = log(node.visits)
+        return max(node.children.values(), key=lambda child: child.wins / child.visits + self.exploration * sqrt(log_visits / child.visits))
+
+
+@jit(nopython=True, cache=True)
+def _seed(seed: int) -> None:
+    """Seeds the random generator of compiled code, which is separate from NumPy's
+
+    Args:
+        seed (int): the seed
+    """
+    np.random.seed(seed)
+
+
+@jit(nopython=True, cache=True)
+def _is_win(state: np.ndarray, game_n: int, col: int, row: int) -> bool:
+    """Checks whether the piece at (col, row) is part of n in a row
+
+    Args:
+        state (np.ndarray): the board state
+        game_n (int): n in a row required to win
+        col (int): column of the piece
+        row (int): row of the piece
+
+    Returns:
+        bool: true if the piece completes n in a row
+    """
+    width: int
+    height: int
+    width, height = state.shape
+    player_id: int = state[col, row]
+
+    for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count: int = 1
+        x: int = col + dx
+        y: int = row + dy
+        while 0 <= x < width and 0 <= y < height and state[x, y] == player_id:
+            count += 1
+            x += dx
+            y += dy
+        x = col - dx
+        y = row - dy
+        while 0 <= x < width and 0 <= y < height and state[x, y] == player_id:
+            count += 1
+            x -= dx
+            y -= dy
+        if count >= game_n:
+            return True
+    return False
+
+
+@jit(nopython=True, cache=True)
+def _playouts(state: np.ndarray, player_id: int, game_n: int, count: int, light: bool) -> np.ndarray:
+    """Plays games from a position to the end with random moves
+
+    The games are played on a batch of copies of the board, with the number of
+    pieces in every column kept alongside, so a move is a single write. They are
+    played one after another rather than spread with prange: once Numba's thread
+    pool runs, processes forked afterwards (search workers, Lazy SMP helpers,
+    tournament workers) can deadlock, and _seed only seeds the calling thread.
+
+    Args:
+        state (np.ndarray): the board state to start from, it is not changed
+        player_id (int): the player to move
+        game_n (int): n in a row required to win
+        count (int): number of games
+        light (bool): whether moves that win right away are taken and moves that let the opponent win
+            right away are blocked, otherwise every move is random
+
+    Returns:
+        np.ndarray: per game the winner, or -1 for a draw
+    """
+    width: int
+    height: int
+    width, height = state.shape
+    states: np.ndarray = np.empty((count, width, height), dtype=state.dtype)
+    heights: np.ndarray = np.zeros((count, width), dtype=np.int64)
+    winners: np.ndarray = np.zeros(count, dtype=np.int64)
+    moves: np.ndarray = np.empty(width, dtype=np.int64)
+
+    empty: int = 0
+    for col in range(width):
+        for row in range(height):
+            if state[col, row] == 0:
+                empty += 1
+            else:
+                heights[0, col] += 1
+    for game in range(count):
+        states[game] = state
+        heights[game] = heights[0]
+
+    for game in range(count):
+        board: np.ndarray = states[game]
+        pieces: np.ndarray = heights[game]
+        mover: int = player_id
+
+        for _ in range(empty):
+            valid: int = 0
+            for col in range(width):
+                if pieces[col] < height:
+                    moves[valid] = col
+                    valid += 1
+
+            choice: int = -1
+            if light:
+                # Take a win, else block a win of the opponent
+                for candidate in (mover, 3 - mover):
+                    for i in range(valid):
+                        col = moves[i]
+                        row: int = height - 1 - pieces[col]
+                        board[col, row] = candidate
+                        won: bool = _is_win(board, game_n, col, row)
+                        board[col, row] = 0
+                        if won:
+                            choice = col
+                            break
+                    if choice >= 0:
+                        break
+            if choice < 0:
+                choice = moves[np.random.randint(valid)]
+
+            row = height - 1 - pieces[choice]
+            board[choice, row] = mover
+            pieces[choice] += 1
+            if _is_win(board, game_n, choice, row):
+                winners[game] = mover
+                break
+            mover = 3 - mover
+
+        if winners[game] == 0:
+            winners[game] = -1 # the board is full, game is a draw
+
+    return winners
@@ -0,0 +1,189 @@
+"""Opening book of searched positions, generated offline and memory-mapped at runtime
+
+Generate a book for the default board with
+
+    python opening_book.py --width 7 --height 6 --game-n 4 --plies 6 --depth 10 --output book.bin
+
+The file starts with a header, followed by the sorted position keys, the best
+moves and the scores, each as one contiguous array. Positions are stored once
+for a position and its mirror image, under the lower of the two hashes.
+"""
+from __future__ import annotations
+import argparse
+import mmap
+import struct
+from typing import Dict, Optional, Tuple
+import numpy as np
+from board import Board, BitBoard
+from heuristics import Heuristic, SimpleHeuristic, WindowHeuristic
+from search import Search, mirror_move
+from transposition import TranspositionTable
+
+
+MAGIC: bytes = b'NROB' # n in a row opening book
+HEADER: struct.Struct = struct.Struct('<4sBBBBBQ') # magic, width, height, game_n, plies, depth, number of positions
+
+# Mixed into the key for the player to move, so books don't depend on who started
+SIDE_KEYS: Tuple[int, int, int] = (0, 0x8BB84B93962EACC9, 0x4B82C6A1D2D5F1E7)
+
+
+def book_key(board: Board, player_id: int) -> Tuple[int, bool]:
+    """
+    Args:
+        board (Board): a board
+        player_id (int): the player to move
+
+    Returns:
+        Tuple[int, bool]: key of the position in the book, and whether it is the key of the mirror image
+    """
+    key, mirrored = board.get_canonical_key()
+    return key ^ SIDE_KEYS[player_id], mirrored
+
+
+class OpeningBook:
+    """An opening book file, memory-mapped so it takes no heap memory however big it is
+
+    Lookups binary search the sorted keys, which only touches the pages on the
+    search path.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): path of the book file
+        """
+        with open(path, 'rb') as file:
+            self.mmap: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.width, self.height, self.game_n, self.plies, self.depth, count = HEADER.unpack_from(self.mmap)
+        assert magic == MAGIC, f'{path} is not an opening book'
+
+        offset: int = HEADER.size
+        self.keys: np.ndarray = np.frombuffer(self.mmap, dtype='<u8', count=count, offset=offset)
+        offset += 8 * count
+        self.moves: np.ndarray = np.frombuffer(self.mmap, dtype='i1', count=count, offset=offset)
+        offset += count
+        self.scores: np.ndarray = np.frombuffer(self.mmap, dtype='<i4', count=count, offset=offset)
+
+
+    def lookup(self, board: Board, player_id: int, game_n: int) -> Optional[Tuple[int, int]]:
+        """Looks up the best move for a position
+
+        Args:
+            board (Board): the current board
+            player_id (int): the player to move
+            game_n (int): n in a row required to win
+
+        Returns:
+            Optional[Tuple[int, int]]: the best column and its score, None if the position is not in the book
+        """
+        if (board.width, board.height, game_n) != (self.width, self.height, self.game_n):
+            return None
+
+        key, mirrored = book_key(board, player_id)
+        index: int = int(np.searchsorted(self.keys, np.uint64(key)))
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+
+        return mirror_move(board, int(self.moves[index]), mirrored), int(self.scores[index])
+
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: number of positions in the book
+        """
+        return len(self.keys)
+
+
+    def close(self) -> None:
+        """Unmaps the book file
+        """
+        del self.keys, self.moves, self.scores
+        self.mmap.close()
+
+
+def generate(width: int, height: int, game_n: int, plies: int, depth: int, heuristic: Heuristic, first_player: int = 1) -> Dict[int, Tuple[int, int]]:
+    """Searches every position up to a number of moves
+
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        plies (int): positions with up to this many moves are searched
+        depth (int): search depth for every position
+        heuristic (Heuristic): heuristic used by the search
+        first_player (int): the player that makes the first move
+
+    Returns:
+        Dict[int, Tuple[int, int]]: book key to best move and score, for the position as keyed
+    """
+    book: Dict[int, Tuple[int, int]] = {}
+    board: BitBoard = BitBoard(width, height)
+    table: TranspositionTable = TranspositionTable()
+    searches: Dict[int, Search] = {player_id: Search(player_id, game_n, heuristic, True, table) for player_id in (1, 2)}
+
+    def visit(player_id: int) -> None:
+        key, mirrored = book_key(board, player_id)
+        if key in book:
+            return
+
+        move, score = searches[player_id].search(board, depth)
+        book[key] = (mirror_move(board, move, mirrored), score) # stored for the position with the lower hash
+
+        if len(board.moves) < plies:
+            for col in range(width):
+                if board.is_symmetric() and 2 * col > width - 1: # leads to the mirror image of a position already visited
+                    break
+                if board.play(col, player_id):
+                    if board.get_winner(game_n) == 0:
+                        visit(3 - player_id)
+                    board.undo()
+
+    visit(first_player)
+    return book
+
+
+def write(path: str, book: Dict[int, Tuple[int, int]], width: int, height: int, game_n: int, plies: int, depth: int) -> None:
+    """Writes a book to a file, sorted by key
+
+    Args:
+        path (str): path of the book file
+        book (Dict[int, Tuple[int, int]]): book key to best move and score
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        plies (int): number of moves the book covers
+        depth (int): search depth used for the book
+    """
+    keys: np.ndarray = np.array(sorted(book), dtype='<u8')
+    moves: np.ndarray = np.array([book[int(key)][0] for key in keys], dtype='i1')
+    scores: np.ndarray = np.array([book[int(key)][1] for key in keys], dtype='<i4')
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, width, height, game_n, plies, depth, len(keys)))
+        file.write(keys.tobytes())
+        file.write(moves.tobytes())
+        file.write(scores.tobytes())
+
+
+def main() -> None:
+    """Generates an opening book with the settings from the command line
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Generate an opening book')
+    parser.add_argument('--width', type=int, default=7)
+    parser.add_argument('--height', type=int, default=6)
+    parser.add_argument('--game-n', type=int, default=4)
+    parser.add_argument('--plies', type=int, default=4, help='positions with up to this many moves are stored')
+    parser.add_argument('--depth', type=int, default=8, help='search depth for every position')
+    parser.add_argument('--heuristic', choices=['simple', 'window'], default='simple')
+    parser.add_argument('--output', default='book.bin')
+    args: argparse.Namespace = parser.parse_args()
+
+    heuristic: Heuristic = (SimpleHeuristic if args.heuristic == 'simple' else WindowHeuristic)(args.game_n)
+    book: Dict[int, Tuple[int, int]] = generate(args.width, args.height, args.game_n, args.plies, args.depth, heuristic)
+    write(args.output, book, args.width, args.height, args.game_n, args.plies, args.depth)
+    print(f'Wrote {len(book)} positions to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
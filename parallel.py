@@ -0,0 +1,402 @@
+from __future__ import annotations
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed, wait
+from multiprocessing.sharedctypes import Synchronized
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Type
+import numpy as np
+from search import Search, SearchTimeout, WIN_SCORE, MoveOrder, center_order, mirror_move
+from transposition import TranspositionTable, ConcurrentTranspositionTable, EXACT
+if TYPE_CHECKING:
+    from heuristics import Heuristic
+    from board import Board
+
+
+# State of a worker process, set up once when the pool starts it
+_worker_search: Optional[Search] = None
+_worker_alpha: Optional[Synchronized] = None
+
+
+def _init_worker(player_id: int, game_n: int, heuristic: Heuristic, alpha_beta: bool, table_size: int, batch_leaves: bool, move_order: MoveOrder,
+                 threat_pruning: bool, shared_alpha: Synchronized) -> None:
+    """Sets up the search of a worker process
+
+    Args:
+        player_id (int): id of the player that searches
+        game_n (int): n in a row required to win
+        heuristic (Heuristic): heuristic used to evaluate the leaves
+        alpha_beta (bool): whether to prune with alpha-beta
+        table_size (int): size of the transposition table of the worker, 0 to not use one
+        batch_leaves (bool): whether to score the leaves below a position in one batch
+        move_order (MoveOrder): policy ordering the moves
+        threat_pruning (bool): whether to prune the moves of every position with threat_moves
+        shared_alpha (Synchronized): best score found at the root so far, shared by all workers
+    """
+    global _worker_search, _worker_alpha
+    table: Optional[TranspositionTable] = TranspositionTable(table_size) if table_size > 0 else None
+    _worker_search = Search(player_id, game_n, heuristic, alpha_beta, table, batch_leaves, move_order, threat_pruning)
+    _worker_alpha = shared_alpha
+
+
+def _search_root_move(board_class: Type[Board], state: np.ndarray, col: int, depth: int, alpha: int, deadline: float) -> Optional[Tuple[int, Tuple[int, ...], int, int, int, int]]:
+    """Searches one root move in a worker process
+
+    Args:
+        board_class (Type[Board]): board representation to search on
+        state (np.ndarray): the root board state
+        col (int): the root move to search
+        depth (int): the search depth including the root move
+        alpha (int): best score at the root when the move was handed out
+        deadline (float): wall clock time at which the search has to stop, 0 for no limit
+
+    Returns:
+        Optional[Tuple[int, Tuple[int, ...], int, int, int, int]]: score and principal variation below the move,
+            and the number of nodes, generated moves, cutoffs and evaluations it took; None if the time ran out
+    """
+    search: Search = _worker_search
+    nodes: int = search.node_count
+    generated: int = search.generated_count
+    cutoffs: int = search.cutoff_count
+    evals: int = search.heuristic.eval_count
+
+    # Searching just below the best score keeps moves that tie with it exact
+    alpha = max(alpha, _worker_alpha.value) - 1
+    search.pv = [()] * (depth + 2)
+    search.deadline = perf_counter() + deadline - time() if deadline > 0 else 0.0
+    try:
+        score: int = search.search_move(board_class(state), col, search.player_id, depth, alpha, WIN_SCORE + 1, 1)
+    except SearchTimeout:
+        return None
+    finally:
+        search.deadline = 0.0
+
+    with _worker_alpha.get_lock():
+        if score > _worker_alpha.value:
+            _worker_alpha.value = score
+
+    return (score, search.pv[1], search.node_count - nodes, search.generated_count - generated, search.cutoff_count - cutoffs,
+            search.heuristic.eval_count - evals)
+
+
+class ParallelSearch(Search):
+    """Search that splits the root moves over a pool of worker processes
+    Inherits from Search
+
+    The first root move is searched here, after which the other moves are
+    searched by the workers (Young Brothers Wait at the root). Workers share
+    the best score found so far and search just below it, so moves that tie
+    with the best move get exact scores and the same move is picked as the
+    serial search would at equal depth; workers keep their own transposition
+    table, so with tables the scores can differ as they do between any two
+    searches with different table contents.
+    The pool lives as long as the search, so process start-up and Numba
+    compilation are paid once, call close when done with it.
+    """
+    def __init__(self, player_id: int, game_n: int, heuristic: Heuristic, alpha_beta: bool = True, transposition_table: Optional[TranspositionTable] = None,
+                 batch_leaves: bool = False, workers: int = 2, move_order: MoveOrder = center_order, threat_pruning: bool = False) -> None:
+        """
+        Args:
+            player_id (int): id of the player that searches, can take values 1 or 2
+            game_n (int): n in a row required to win
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            alpha_beta (bool): whether to prune with alpha-beta, otherwise a full minmax search is done
+            transposition_table (Optional[TranspositionTable]): table to store search results in, None to not use one,
+                every worker gets a table of the same size
+            batch_leaves (bool): whether to score the leaves below a position in one batch
+            workers (int): number of worker processes
+            move_order (MoveOrder): policy ordering the moves, it has to be picklable
+            threat_pruning (bool): whether to prune the moves of every position with threat_moves
+        """
+        super().__init__(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, move_order, threat_pruning)
+        self.workers: int = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.shared_alpha: Synchronized = multiprocessing.Value('i', -WIN_SCORE - 1)
+
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """
+        Returns:
+            ProcessPoolExecutor: the worker pool, started on first use
+        """
+        if self.pool is None:
+            table_size: int = len(self.transposition_table) if self.transposition_table is not None else 0
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(self.player_id, self.game_n, self.heuristic, self.alpha_beta, table_size, self.batch_leaves, self.move_order, self.threat_pruning,
+                                                      self.shared_alpha))
+        return self.pool
+
+
+    def search(self, board: Board, depth: int) -> Tuple[int, int]:
+        """Searches the board for the best move of the player, splitting the root moves over the workers
+
+        Args:
+            board (Board): the board to search, it is changed during the search but restored afterwards
+            depth (int): the max search depth, at least 1
+
+        Raises:
+            SearchTimeout: if the deadline passed, the board is restored before raising
+
+        Returns:
+            Tuple[int, int]: the best column and its score
+        """
+        moves: List[int] = self.order_root_moves(board)
+        if depth == 1 or len(moves) == 1:
+            return super().search(board, depth)
+
+        # The eldest brother is searched first, to give the workers a bound
+        root_moves: int = len(board.moves)
+        self.pv = [()] * (depth + 2)
+        try:
+            alpha: int = self.search_move(board, moves[0], self.player_id, depth, -WIN_SCORE - 1, WIN_SCORE + 1, 1)
+        except SearchTimeout:
+            while len(board.moves) > root_moves:
+                board.undo()
+            raise
+        scores: Dict[int, int] = {moves[0]: alpha}
+        pvs: Dict[int, Tuple[int, ...]] = {moves[0]: self.pv[1]}
+
+        self.shared_alpha.value = alpha
+        deadline: float = time() + max(self.deadline - perf_counter(), 1e-3) if self.deadline else 0.0 # perf_counter differs between processes
+        futures: Dict[Future, int] = {
+            self.get_pool().submit(_search_root_move, type(board), board.board_state, col, depth, alpha, deadline): col for col in moves[1:]
+        }
+
+        for future in as_completed(futures):
+            result: Optional[Tuple[int, Tuple[int, ...], int, int, int, int]] = future.result()
+            if result is None:
+                for other in futures:
+                    other.cancel()
+                raise SearchTimeout()
+
+            col: int = futures[future]
+            scores[col], pvs[col], nodes, generated, cutoffs, evals = result
+            self.node_count += nodes
+            self.generated_count += generated
+            self.cutoff_count += cutoffs
+            self.heuristic.eval_count += evals
+
+        # The first move in search order with the best score, as the serial search picks
+        best: int = max(scores.values())
+        best_move: int = next(col for col in moves if scores[col] == best)
+        self.pv[0] = (best_move,) + pvs[best_move]
+
+        if self.transposition_table is not None:
+            key, mirrored = self.get_table_key(board)
+            self.transposition_table.store(key, depth, EXACT, best, mirror_move(board, best_move, mirrored))
+
+        self.last_pv = self.pv[0]
+        return best_move, best
+
+
+    def close(self) -> None:
+        """Shuts down the worker pool
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+
+# State of a Lazy SMP helper process, set up once when the pool starts it
+_helper_search: Optional[_HelperSearch] = None
+
+
+def _init_helper(player_id: int, game_n: int, heuristic: Heuristic, alpha_beta: bool, transposition_table: ConcurrentTranspositionTable, batch_leaves: bool,
+                 move_order: MoveOrder, threat_pruning: bool, current_search: Synchronized) -> None:
+    """Sets up the search of a helper process
+
+    Args:
+        player_id (int): id of the player that searches
+        game_n (int): n in a row required to win
+        heuristic (Heuristic): heuristic used to evaluate the leaves
+        alpha_beta (bool): whether to prune with alpha-beta
+        transposition_table (ConcurrentTranspositionTable): the table shared with the main search
+        batch_leaves (bool): whether to score the leaves below a position in one batch
+        move_order (MoveOrder): policy ordering the moves
+        threat_pruning (bool): whether to prune the moves of every position with threat_moves
+        current_search (Synchronized): number of the search the main process is running, helpers of other searches stop
+    """
+    global _helper_search
+    _helper_search = _HelperSearch(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, current_search, move_order, threat_pruning)
+
+
+def _run_helper(board_class: Type[Board], state: np.ndarray, depth: int, index: int, search_number: int, deadline: float,
+                pv_moves: Dict[int, int], generation: int) -> Tuple[int, int, int, int, int, int, int]:
+    """Lets the helper of this process search until it is done or stopped
+
+    Args:
+        board_class (Type[Board]): board representation to search on
+        state (np.ndarray): the root board state
+        depth (int): depth to search to
+        index (int): number of the helper, starting at 1
+        search_number (int): number of the search of the main process the helper joins
+        deadline (float): wall clock time at which the search has to stop, 0 for no limit
+        pv_moves (Dict[int, int]): the principal variation of the previous search of the main process
+        generation (int): generation of the transposition table of the main process
+
+    Returns:
+        Tuple[int, int, int, int, int, int, int]: number of nodes, generated moves, cutoffs and evaluations it took,
+            and the probes, hits and reused entries of its transposition table
+    """
+    helper: _HelperSearch = _helper_search
+    table: TranspositionTable = helper.transposition_table
+    counts: Tuple[int, ...] = (helper.node_count, helper.generated_count, helper.cutoff_count, helper.heuristic.eval_count,
+                               table.probes, table.hits, table.reused)
+    helper.index = index
+    helper.search_number = search_number
+    helper.pv_moves = pv_moves
+    table.generation = generation
+    helper.deadline = perf_counter() + deadline - time() if deadline > 0 else float('inf') # a deadline is needed to be stopped
+    try:
+        helper.search(board_class(state), depth)
+    except SearchTimeout:
+        pass
+    finally:
+        helper.deadline = 0.0
+        helper.pv_moves = {}
+
+    return tuple(after - before for before, after in zip(counts, (helper.node_count, helper.generated_count, helper.cutoff_count,
+                                                                 helper.heuristic.eval_count, table.probes, table.hits, table.reused)))
+
+
+class _HelperSearch(Search):
+    """Search run by a helper process of a LazySMPSearch
+    Inherits from Search
+    """
+    def __init__(self, player_id: int, game_n: int, heuristic: Heuristic, alpha_beta: bool, transposition_table: TranspositionTable,
+                 batch_leaves: bool, current_search: Synchronized, move_order: MoveOrder = center_order, threat_pruning: bool = False) -> None:
+        """
+        Args:
+            player_id (int): id of the player that searches, can take values 1 or 2
+            game_n (int): n in a row required to win
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            alpha_beta (bool): whether to prune with alpha-beta
+            transposition_table (TranspositionTable): the table shared with the other processes
+            batch_leaves (bool): whether to score the leaves below a position in one batch
+            current_search (Synchronized): number of the search the main process is running
+            move_order (MoveOrder): policy ordering the moves
+            threat_pruning (bool): whether to prune the moves of every position with threat_moves
+        """
+        super().__init__(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, move_order, threat_pruning)
+        self.current_search: Synchronized = current_search
+        self.search_number: int = 0 # number of the search of the main process this helper is part of
+        self.index: int = 1 # number of the helper, starting at 1
+
+
+    def order_root_moves(self, board: Board) -> List[int]:
+        """Rotates the root moves by the helper index, so the helpers start in different subtrees
+
+        Args:
+            board (Board): the root board
+
+        Returns:
+            List[int]: the valid columns
+        """
+        moves: List[int] = super().order_root_moves(board)
+        offset: int = self.index % len(moves)
+        return moves[offset:] + moves[:offset]
+
+
+    def is_stopped(self) -> bool:
+        """
+        Returns:
+            bool: whether the search has to abort, because the deadline passed or the main search is over
+        """
+        return self.current_search.value != self.search_number or super().is_stopped()
+
+
+class LazySMPSearch(Search):
+    """Search that runs helper processes on the same root (Lazy SMP)
+    Inherits from Search
+
+    While this process searches, every helper searches the same position, every
+    other helper one depth deeper. The processes only communicate through the
+    shared transposition table, where the helpers leave results that cut off or
+    order the main search; the result of the main search is the one returned.
+    The helpers are processes rather than threads, as the search holds the GIL.
+    The pool lives as long as the search, so process start-up and Numba
+    compilation are paid once, call close when done with it.
+    """
+    def __init__(self, player_id: int, game_n: int, heuristic: Heuristic, alpha_beta: bool = True, transposition_table: Optional[TranspositionTable] = None,
+                 batch_leaves: bool = False, helpers: int = 1, move_order: MoveOrder = center_order, threat_pruning: bool = False) -> None:
+        """
+        Args:
+            player_id (int): id of the player that searches, can take values 1 or 2
+            game_n (int): n in a row required to win
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            alpha_beta (bool): whether to prune with alpha-beta, otherwise a full minmax search is done
+            transposition_table (Optional[TranspositionTable]): table shared by the processes, it must be a
+                ConcurrentTranspositionTable; None to create one
+            batch_leaves (bool): whether to score the leaves below a position in one batch
+            helpers (int): number of helper processes searching the same root next to this one
+            move_order (MoveOrder): policy ordering the moves, it has to be picklable
+            threat_pruning (bool): whether to prune the moves of every position with threat_moves
+        """
+        if transposition_table is None:
+            transposition_table = ConcurrentTranspositionTable()
+        assert isinstance(transposition_table, ConcurrentTranspositionTable), 'Processes can only share a ConcurrentTranspositionTable'
+
+        super().__init__(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, move_order, threat_pruning)
+        self.helpers: int = helpers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.current_search: Synchronized = multiprocessing.Value('q', 0, lock=False) # only written by this process
+        self.search_number: int = 0
+
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """
+        Returns:
+            ProcessPoolExecutor: the helper pool, started on first use
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.helpers, initializer=_init_helper,
+                                            initargs=(self.player_id, self.game_n, self.heuristic, self.alpha_beta, self.transposition_table, self.batch_leaves,
+                                                      self.move_order, self.threat_pruning, self.current_search))
+        return self.pool
+
+
+    def search(self, board: Board, depth: int) -> Tuple[int, int]:
+        """Searches the board for the best move of the player, with the helper processes searching alongside
+
+        Args:
+            board (Board): the board to search, it is changed during the search but restored afterwards
+            depth (int): the max search depth, at least 1
+
+        Raises:
+            SearchTimeout: if the deadline passed, the board is restored before raising
+
+        Returns:
+            Tuple[int, int]: the best column and its score
+        """
+        self.search_number += 1
+        self.current_search.value = self.search_number
+        deadline: float = time() + max(self.deadline - perf_counter(), 1e-3) if self.deadline else 0.0 # perf_counter differs between processes
+        futures: List[Future] = [
+            self.get_pool().submit(_run_helper, type(board), board.board_state, depth + index % 2, index, self.search_number, deadline, self.pv_moves,
+                                   self.transposition_table.generation)
+            for index in range(1, self.helpers + 1)
+        ]
+
+        try:
+            return super().search(board, depth)
+        finally:
+            self.current_search.value = 0 # stops the helpers
+            wait(futures)
+
+            table: TranspositionTable = self.transposition_table
+            for future in futures:
+                nodes, generated, cutoffs, evals, probes, hits, reused = future.result()
+                self.node_count += nodes
+                self.generated_count += generated
+                self.cutoff_count += cutoffs
+                self.heuristic.eval_count += evals
+                table.probes += probes
+                table.hits += hits
+                table.reused += reused
+
+
+    def close(self) -> None:
+        """Shuts down the helper processes
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
@@ -1,51 +1,44 @@
 from __future__ import annotations
 from abc import abstractmethod
 import numpy as np
-from typing import TYPE_CHECKING
+from math import sqrt
+from threading import Thread
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Type
+from board import Board, BitBoard
+from search import Search, MoveOrder, WIN_SCORE, center_order
+from opening_book import OpeningBook
+from parallel import ParallelSearch, LazySMPSearch
+from mcts import MCTS
+from solver import Solver
+from stats import SearchStats
+from transposition import TranspositionTable
+from treeStructure import ArenaTree, TreeStructure
 if TYPE_CHECKING:
     from heuristics import Heuristic
-    from board import Board
-
-
-class Node:
-    """Class defining a node
-    """
-
-    def __init__(self, board: Board, player_id: int, depth: int = 0) -> None:
-        """
-        Args:
-            player_id (int): id of a player, can take values 1 or 2 (0 = empty)
-            board: (fill in later)
-        """
-        self.board = board
-        self.player_id = player_id
-        self.depth = depth
-        self.children = []  # create an empty list for the children
-
-
-#something is wrong here, the children list ends up being empty
-    def add_child(self, board: Board):
-        for i in range(board.width):                # loop through the number of columns
-            if board.is_valid(i):                   # check if the move is valid
-                child = Board(self)
-                child.play(i)
-                self.children.append((i, child))    # add the child to the children list
-        return self.children                        # returns a list of children
 
 
 class PlayerController:
     """Abstract class defining a player
     """
-    def __init__(self, player_id: int, game_n: int, heuristic: Heuristic) -> None:
+    def __init__(self, player_id: int, game_n: int, heuristic: Heuristic, board_class: Type[Board] = Board) -> None:
         """
         Args:
             player_id (int): id of a player, can take values 1 or 2 (0 = empty)
             game_n (int): n in a row required to win
             heuristic (Heuristic): heuristic used by the player
+            board_class (Type[Board]): board representation the player searches on, BitBoard is the fast one
         """
         self.player_id = player_id
         self.game_n = game_n
         self.heuristic = heuristic
+        self.board_class = board_class
+        self.move_stats: List[Dict[str, float]] = [] # per move, the hit rate on and the amount of work reused from earlier moves
+        self.solver_threshold: int = 0 # max number of empty fields for which the exact solver is used, 0 to never use it
+        self.solver: Optional[Solver] = None
+        self.last_outcome: Optional[Tuple[int, int]] = None # outcome and moves left of the last solved position
+        self.last_score: int = 0 # score of the last move for the player, like search scores; 0 if the player doesn't score its moves
+        self.stats: Optional[SearchStats] = None # instrumentation of the search, see SearchPlayer.enable_stats
 
 
     def get_eval_count(self) -> int:
@@ -56,6 +49,52 @@ class PlayerController:
         return self.heuristic.eval_count
     
 
+    def close(self) -> None:
+        """Releases the resources the player holds, such as worker processes
+        """
+    
+
+    def use_solver(self, empty_fields: int) -> None:
+        """Switches to the exact solver when few fields are empty
+
+        Args:
+            empty_fields (int): max number of empty fields for which the position is solved, 0 to never solve
+        """
+        self.solver_threshold = empty_fields
+        if empty_fields > 0 and self.solver is None:
+            self.solver = Solver(self.game_n)
+
+
+    def solve(self, board: Board) -> Optional[int]:
+        """Solves the board exactly if few enough fields are empty
+
+        Args:
+            board (Board): the current board
+
+        Returns:
+            Optional[int]: the column that wins fastest or loses slowest, None if the board has too many empty fields
+        """
+        empty: int = int((board.board_state == 0).sum())
+        if self.solver is None or empty > self.solver_threshold:
+            return None
+
+        move, score = self.solver.solve_board(self.get_search_board(board), self.player_id)
+        self.last_outcome = self.solver.get_outcome(score, board.width * board.height - empty)
+        self.last_score = self.last_outcome[0] * (WIN_SCORE - self.last_outcome[1]) # quicker wins score higher, like in the search
+        return move
+
+
+    def get_search_board(self, board: Board) -> Board:
+        """
+        Args:
+            board (Board): the current board
+
+        Returns:
+            Board: a private copy of the board in the representation chosen by the player
+        """
+        return self.board_class(board)
+    
+
     def __str__(self) -> str:
         """
         Returns:
@@ -79,69 +118,405 @@ class PlayerController:
         pass
 
 
-class MinMaxPlayer(PlayerController):
-    """Class for the minmax player using the minmax algorithm
+class SearchPlayer(PlayerController):
+    """Abstract class defining a player that searches the game tree
     Inherits from Playercontroller
     """
-    def __init__(self, player_id: int, game_n: int, depth: int, heuristic: Heuristic) -> None:
+    def __init__(self, player_id: int, game_n: int, depth: int, heuristic: Heuristic, alpha_beta: bool, board_class: Type[Board] = BitBoard,
+                 transposition_table: Optional[TranspositionTable] = None, time_limit: Optional[int] = None, batch_leaves: bool = False,
+                 workers: int = 1, helpers: int = 0, opening_book: Optional[OpeningBook] = None, move_order: MoveOrder = center_order,
+                 ponder: bool = False, solver_threshold: int = 0, threat_pruning: bool = False) -> None:
         """
         Args:
             player_id (int): id of a player, can take values 1 or 2 (0 = empty)
             game_n (int): n in a row required to win
             depth (int): the max search depth
             heuristic (Heuristic): heuristic used by the player
+            alpha_beta (bool): whether the search prunes with alpha-beta
+            board_class (Type[Board]): board representation the player searches on
+            transposition_table (Optional[TranspositionTable]): table kept across moves, None to not use one
+            time_limit (Optional[int]): time budget per move in milliseconds, searching deeper until it runs out,
+                None to always search to the max depth
+            batch_leaves (bool): whether to score the leaves below a position in one batch
+            workers (int): number of processes to split the root moves over, 1 to search in this process
+            helpers (int): number of helper processes searching the same root (Lazy SMP), 0 to search alone; they need a ConcurrentTranspositionTable
+            opening_book (Optional[OpeningBook]): book to play from before searching, None to always search
+            move_order (MoveOrder): policy ordering the moves that aren't known to be good from earlier searches
+            ponder (bool): whether to search on the expected reply of the opponent while they think, needs a time_limit, see start_pondering
+            solver_threshold (int): max number of empty fields for which the position is solved exactly instead, 0 to never solve
+            threat_pruning (bool): whether the search prunes moves with threat_moves
         """
-        super().__init__(player_id, game_n, heuristic)
+        super().__init__(player_id, game_n, heuristic, board_class)
         self.depth: int = depth
+        self.time_limit: Optional[int] = time_limit
+        self.search: Search
+        assert not (ponder and workers > 1), 'Worker processes can\'t be stopped to ponder'
+        assert not (ponder and time_limit is None), 'Pondering needs a time limit to end a search on the expected reply'
+        if workers > 1:
+            self.search = ParallelSearch(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, workers, move_order, threat_pruning)
+        elif helpers > 0:
+            self.search = LazySMPSearch(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, helpers, move_order, threat_pruning)
+        else:
+            self.search = Search(player_id, game_n, heuristic, alpha_beta, transposition_table, batch_leaves, move_order, threat_pruning)
+        self.transposition_table: Optional[TranspositionTable] = self.search.transposition_table
+        self.last_depth: int = 0 # depth reached for the last move
+        self.opening_book: Optional[OpeningBook] = opening_book
+        self.book_hits: int = 0 # moves played from the opening book
+        self.use_solver(solver_threshold)
+
+        self.ponder: bool = ponder
+        self.ponder_thread: Optional[Thread] = None
+        self.ponder_hash: int = 0 # hash of the position searched while pondering
+        self.ponder_start: float = 0.0 # perf_counter time pondering started
+        self.ponder_result: Optional[Tuple[int, int, int]] = None
+        self.ponder_hits: int = 0 # moves where the opponent played the expected reply
+        self.ponder_misses: int = 0
+        self.table_counts: Tuple[int, int, int] = (0, 0, 0) # probes, hits and reused entries of the table at the start of the move
+
+
+    def get_node_count(self) -> int:
+        """
+        Returns:
+            int: The amount of positions the player has searched
+        """
+        return self.search.node_count
+
+
+    def get_generated_count(self) -> int:
+        """
+        Returns:
+            int: The amount of moves the player has generated, of which get_node_count were searched
+        """
+        return self.search.generated_count
 
 
-    def min_max(self, node: Node, depth: int,  max_player: bool):
-        #print("min_max method is reached")
+    def get_cutoff_count(self) -> int:
+        """
+        Returns:
+            int: The amount of times the search was cut off by alpha-beta pruning
+        """
+        return self.search.cutoff_count
+
 
-        max_move = 0
-        min_move = 0
+    def close(self) -> None:
+        """Stops pondering and shuts down the worker processes of a parallel search
+        """
+        self.stop_pondering()
+        self.search.close()
 
-        if max_player:
-            print("the max_player loop is reached")
-            max_eval = -np.inf
-            print(node.children)
 
-            for child in node.children:
-                print("Child is", child)
+    def enable_stats(self, sample_interval: int = 1, profile: bool = False) -> SearchStats:
+        """Starts collecting detailed numbers of the search and of every move in self.stats
 
-        else:
-            print("the min-player loop is reached")
-            min_eval = np.inf
+        Args:
+            sample_interval (int): time one in this many positions, higher for less overhead
+            profile (bool): whether to run cProfile during moves, see SearchStats.dump_profile
+
+        Returns:
+            SearchStats: the stats object
+        """
+        self.stats = SearchStats(sample_interval, profile)
+        self.search.stats = self.stats
+        return self.stats
+
+
+    def start_pondering(self, board: Board) -> None:
+        """Starts searching the expected reply of the opponent in a background thread, if the player ponders
+        The expected reply is the one on the principal variation of the last search,
+        or else the first move in search order
+
+        Args:
+            board (Board): the board after the player's move
+        """
+        if not self.ponder:
+            return
+        self.stop_pondering()
+
+        ponder_board: Board = self.get_search_board(board)
+        pv: Tuple[int, ...] = self.search.last_pv
+        reply: int = pv[1] if len(pv) > 1 and board.moves and pv[0] == board.moves[-1] else -1
+        if reply < 0 or not ponder_board.is_valid(reply):
+            reply = self.search.order_moves(ponder_board, 3 - self.player_id)[0]
+        ponder_board.play(reply, 3 - self.player_id)
+        if ponder_board.get_winner(self.game_n) != 0:
+            return
+
+        self.start_move_stats()
+        self.ponder_hash = ponder_board.hash
+        self.ponder_start = perf_counter()
+        self.ponder_result = None
+        self.ponder_thread = Thread(target=self.run_pondering, args=(ponder_board,), daemon=True)
+        self.ponder_thread.start()
+
+
+    def run_pondering(self, board: Board) -> None:
+        """Searches deeper and deeper until stopped or the max depth is reached, in the pondering thread
+
+        Args:
+            board (Board): the board after the expected reply
+        """
+        self.ponder_result = self.search.iterative_deepening(board, None, self.depth)
+
+
+    def stop_pondering(self, board: Optional[Board] = None) -> Optional[Tuple[int, int, int]]:
+        """Ends pondering
+        If the board is the position pondered on, the search goes on until it has had
+        the time budget of a move, which may already be over, and its result is used;
+        otherwise the search is cancelled
+
+        Args:
+            board (Optional[Board]): the board after the opponent's move, None to cancel
+
+        Returns:
+            Optional[Tuple[int, int, int]]: the best column, its score and the depth reached if the pondering
+                search was on this board, None otherwise
+        """
+        if self.ponder_thread is None:
+            return None
+
+        hit: bool = board is not None and board.hash == self.ponder_hash
+        assert self.time_limit is not None
+        stop_time: float = self.ponder_start + self.time_limit / 1000
+        while self.ponder_thread.is_alive(): # repeated in case the thread hasn't started searching yet
+            if hit:
+                self.search.set_stop_time(stop_time)
+            else:
+                self.search.stop()
+            self.ponder_thread.join(0.01)
+        self.ponder_thread = None
+
+        if board is not None:
+            hit = hit and self.ponder_result is not None and self.ponder_result[0] >= 0
+            self.ponder_hits += hit
+            self.ponder_misses += not hit
+        return self.ponder_result if hit else None
+
+
+    def start_move_stats(self) -> None:
+        """Starts a new generation in the transposition table and remembers its counts at the start of the move
+        """
+        table: Optional[TranspositionTable] = self.transposition_table
+        if table is not None:
+            table.new_search()
+            self.table_counts = (table.probes, table.hits, table.reused)
+
+
+    def record_move_stats(self) -> None:
+        """Adds the hit rate and reused entries of the transposition table since start_move_stats to the move stats
+        """
+        table: Optional[TranspositionTable] = self.transposition_table
+        if table is not None:
+            probes: int = table.probes - self.table_counts[0]
+            hits: int = table.hits - self.table_counts[1]
+            self.move_stats.append({'hit_rate': hits / probes if probes else 0.0, 'reused': table.reused - self.table_counts[2]})
 
-        return 5  # placeholder
 
     def make_move(self, board: Board) -> int:
+        """Gets the column for the player to play in
+
+        Args:
+            board (Board): the current board
+
+        Returns:
+            int: column to play in
+        """
+        if self.stats is None:
+            return self.choose_move(board)
+
+        self.stats.begin_move(self.transposition_table)
+        move: int = self.choose_move(board)
+        self.stats.end_move(self.last_depth, self.transposition_table)
+        return move
+
+
+    def choose_move(self, board: Board) -> int:
+        """Gets the column for the player to play in from the solver, pondering, the opening book or a search
+
+        Args:
+            board (Board): the current board
 
-        place_holder_move = 2   #just a placeholder
+        Returns:
+            int: column to play in
+        """
+        pondered: Optional[Tuple[int, int, int]] = self.stop_pondering(board)
+        solved: Optional[int] = self.solve(board)
+        if solved is not None:
+            self.last_depth = int((board.board_state == 0).sum())
+            return solved
+
+        if pondered is not None:
+            move, self.last_score, self.last_depth = pondered
+            self.record_move_stats()
+            return move
+
+        if self.opening_book is not None:
+            entry: Optional[Tuple[int, int]] = self.opening_book.lookup(board, self.player_id, self.game_n)
+            if entry is not None and board.is_valid(entry[0]):
+                self.book_hits += 1
+                self.last_depth = 0
+                self.last_score = entry[1]
+                return entry[0]
+
+        self.start_move_stats()
+        move: int
+        if self.time_limit is None:
+            move, self.last_score = self.search.search(self.get_search_board(board), self.depth)
+            self.last_depth = self.depth
+        else:
+            move, self.last_score, self.last_depth = self.search.iterative_deepening(self.get_search_board(board), self.time_limit, self.depth)
 
-        root_node = Node(board, self.player_id, 0) #depth is 0, get the root node (first node)
-        trying_out_move = self.min_max(root_node, self.depth, True)
+        self.record_move_stats()
+        return move
 
-        print("trying out move is", trying_out_move)
-        print("The best move is", trying_out_move)
 
-        return trying_out_move
+class MinMaxPlayer(SearchPlayer):
+    """Class for the minmax player using the minmax algorithm
+    Inherits from SearchPlayer
+    """
+    def __init__(self, player_id: int, game_n: int, depth: int, heuristic: Heuristic, board_class: Type[Board] = BitBoard,
+                 transposition_table: Optional[TranspositionTable] = None, time_limit: Optional[int] = None, batch_leaves: bool = False,
+                 workers: int = 1, helpers: int = 0, opening_book: Optional[OpeningBook] = None, move_order: MoveOrder = center_order,
+                 ponder: bool = False, solver_threshold: int = 0, threat_pruning: bool = False) -> None:
+        """
+        Args:
+            player_id (int): id of a player, can take values 1 or 2 (0 = empty)
+            game_n (int): n in a row required to win
+            depth (int): the max search depth
+            heuristic (Heuristic): heuristic used by the player
+            board_class (Type[Board]): board representation the player searches on
+            transposition_table (Optional[TranspositionTable]): table kept across moves, None to not use one
+            time_limit (Optional[int]): time budget per move in milliseconds, None to always search to the max depth
+            batch_leaves (bool): whether to score the leaves below a position in one batch
+            workers (int): number of processes to split the root moves over, 1 to search in this process
+            helpers (int): number of helper processes searching the same root (Lazy SMP), 0 to search alone; they need a ConcurrentTranspositionTable
+            opening_book (Optional[OpeningBook]): book to play from before searching, None to always search
+            move_order (MoveOrder): policy ordering the moves that aren't known to be good from earlier searches
+            ponder (bool): whether to search on the expected reply of the opponent while they think, needs a time_limit, see start_pondering
+            solver_threshold (int): max number of empty fields for which the position is solved exactly instead, 0 to never solve
+            threat_pruning (bool): whether the search prunes moves with threat_moves
+        """
+        super().__init__(player_id, game_n, depth, heuristic, False, board_class, transposition_table, time_limit, batch_leaves, workers, helpers, opening_book, move_order, ponder, solver_threshold,
+                         threat_pruning)
 
 
-class AlphaBetaPlayer(PlayerController):
+class AlphaBetaPlayer(SearchPlayer):
     """Class for the minmax player using the minmax algorithm with alpha-beta pruning
-    Inherits from Playercontroller
+    Inherits from SearchPlayer
     """
-    def __init__(self, player_id: int, game_n: int, depth: int, heuristic: Heuristic) -> None:
+    def __init__(self, player_id: int, game_n: int, depth: int, heuristic: Heuristic, board_class: Type[Board] = BitBoard,
+                 transposition_table: Optional[TranspositionTable] = None, time_limit: Optional[int] = None, batch_leaves: bool = False,
+                 workers: int = 1, helpers: int = 0, opening_book: Optional[OpeningBook] = None, move_order: MoveOrder = center_order,
+                 ponder: bool = False, solver_threshold: int = 0, threat_pruning: bool = False) -> None:
         """
         Args:
             player_id (int): id of a player, can take values 1 or 2 (0 = empty)
             game_n (int): n in a row required to win
             depth (int): the max search depth
             heuristic (Heuristic): heuristic used by the player
+            board_class (Type[Board]): board representation the player searches on
+            transposition_table (Optional[TranspositionTable]): table kept across moves, None to not use one
+            time_limit (Optional[int]): time budget per move in milliseconds, None to always search to the max depth
+            batch_leaves (bool): whether to score the leaves below a position in one batch
+            workers (int): number of processes to split the root moves over, 1 to search in this process
+            helpers (int): number of helper processes searching the same root (Lazy SMP), 0 to search alone; they need a ConcurrentTranspositionTable
+            opening_book (Optional[OpeningBook]): book to play from before searching, None to always search
+            move_order (MoveOrder): policy ordering the moves that aren't known to be good from earlier searches
+            ponder (bool): whether to search on the expected reply of the opponent while they think, needs a time_limit, see start_pondering
+            solver_threshold (int): max number of empty fields for which the position is solved exactly instead, 0 to never solve
+            threat_pruning (bool): whether the search prunes moves with threat_moves
         """
-        super().__init__(player_id, game_n, heuristic)
+        super().__init__(player_id, game_n, depth, heuristic, True, board_class, transposition_table, time_limit, batch_leaves, workers, helpers, opening_book, move_order, ponder, solver_threshold,
+                         threat_pruning)
+
+
+class MCTSPlayer(PlayerController):
+    """Class for the player using Monte Carlo tree search
+    Inherits from PlayerController
+
+    The player needs no heuristic, the playouts are counted as its evaluations,
+    which makes it usable on board sizes where a fixed depth search sees too little.
+    """
+    def __init__(self, player_id: int, game_n: int, iterations: Optional[int] = None, time_limit: Optional[int] = 1000, batch_size: int = 16,
+                 exploration: float = sqrt(2), light_playouts: bool = True, reuse_tree: bool = True, board_class: Type[Board] = BitBoard,
+                 seed: Optional[int] = None, solver_threshold: int = 0) -> None:
+        """
+        Args:
+            player_id (int): id of a player, can take values 1 or 2 (0 = empty)
+            game_n (int): n in a row required to win
+            iterations (Optional[int]): number of iterations per move, None for no limit
+            time_limit (Optional[int]): time budget per move in milliseconds, None for no limit
+            batch_size (int): number of playouts from every new node
+            exploration (float): exploration constant of the upper confidence bound
+            light_playouts (bool): whether playouts take immediate wins and block immediate losses, otherwise they are random
+            reuse_tree (bool): whether to keep the subtree of the new position between moves
+            board_class (Type[Board]): board representation the player searches on
+            seed (Optional[int]): seed of the random playouts, None to not seed them
+            solver_threshold (int): max number of empty fields for which the position is solved exactly instead, 0 to never solve
+        """
+        super().__init__(player_id, game_n, None, board_class)
+        self.iterations: Optional[int] = iterations
+        self.time_limit: Optional[int] = time_limit
+        self.search: MCTS = MCTS(player_id, game_n, batch_size, exploration, light_playouts, reuse_tree, seed)
+        self.use_solver(solver_threshold)
+
+
+    def get_eval_count(self) -> int:
+        """
+        Returns:
+            int: The amount of playouts the player has played
+        """
+        return self.search.playout_count
+
+
+    def make_move(self, board: Board) -> int:
+        """Gets the column for the player to play in
+
+        Args:
+            board (Board): the current board
+
+        Returns:
+            int: column to play in
+        """
+        solved: Optional[int] = self.solve(board)
+        if solved is not None:
+            return solved
+
+        move, _ = self.search.search(self.get_search_board(board), self.iterations, self.time_limit)
+        # The hit rate is 1 if the position was found in the tree of the previous move
+        self.move_stats.append({'hit_rate': float(self.search.reused_nodes > 0), 'reused': self.search.reused_nodes})
+        return move
+
+
+class TreePlayer(PlayerController):
+    """Class for the player that builds the game tree explicitly
+    Inherits from PlayerController
+
+    With reuse_tree the tree is an ArenaTree kept between moves: it is rerooted
+    at the position after the opponent's reply, so the subtree searched for the
+    previous move is reused and only its frontier is grown. Otherwise a
+    TreeStructure is built for every move, generating children lazily under
+    alpha-beta pruning.
+    """
+    def __init__(self, player_id: int, game_n: int, depth: int, heuristic: Heuristic, reuse_tree: bool = True, move_order: MoveOrder = center_order,
+                 threat_pruning: bool = False, board_class: Type[Board] = BitBoard) -> None:
+        """
+        Args:
+            player_id (int): id of a player, can take values 1 or 2 (0 = empty)
+            game_n (int): n in a row required to win
+            depth (int): depth of the tree
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            reuse_tree (bool): whether to keep the subtree of the new position between moves
+            move_order (MoveOrder): policy ordering the children, when the tree isn't reused
+            threat_pruning (bool): whether to only generate the children threat_moves keeps, when the tree isn't reused
+            board_class (Type[Board]): board representation the tree is built on, when it isn't reused
+        """
+        super().__init__(player_id, game_n, heuristic, board_class)
         self.depth: int = depth
+        self.reuse_tree: bool = reuse_tree
+        self.move_order: MoveOrder = move_order
+        self.threat_pruning: bool = threat_pruning
+        self.tree: Optional[ArenaTree] = None
+        self.tree_moves: List[int] = [] # moves played on the board at the root of the kept tree
 
 
     def make_move(self, board: Board) -> int:
@@ -153,9 +528,25 @@ class AlphaBetaPlayer(PlayerController):
         Returns:
             int: column to play in
         """
+        if not self.reuse_tree:
+            tree: TreeStructure = TreeStructure(self.player_id, self.get_search_board(board), self.heuristic, self.depth, self.move_order, self.threat_pruning)
+            move, value = tree.create_tree(tree.root_node, self.depth)
+            self.last_score = int(value)
+            return move
+
+        reused: int = 0
+        if self.tree is not None and board.moves[:len(self.tree_moves)] == self.tree_moves:
+            reused = self.tree.reroot(board.moves[len(self.tree_moves):])
+        else: # a new game, or a board without the moves since the last one
+            self.tree = ArenaTree(self.player_id, board, self.heuristic, self.game_n)
+        self.tree_moves = list(board.moves)
+
+        self.tree.build(self.depth)
+        self.last_score = self.tree.backup()
+        # The hit rate is 1 if the position was found in the tree of the previous move
+        self.move_stats.append({'hit_rate': float(reused > 0), 'reused': reused})
+        return self.tree.get_principal_variation()[0]
 
-        # TODO: implement minmax algorithm with alpha beta pruning!
-        return 0
 
 class HumanPlayer(PlayerController):
     """Class for the human player
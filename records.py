@@ -0,0 +1,350 @@
+"""Compact binary game records, written append-only and read back lazily
+
+A record file starts with a file header, followed by two kinds of records:
+player records give a player description an index the first time it is used,
+and game records hold the board size, game_n, the result, the indices of both
+players and the moves, packed two to a byte (one per byte on boards wider than
+16 columns), optionally followed by search statistics for every move. A game
+of 7x6 connect four takes about 25 bytes without statistics, which add 13
+bytes per move, so they are only recorded when asked for.
+
+    writer = GameWriter('games.bin', stats=True)
+    writer.begin_game(7, 6, 4, ['AlphaBetaPlayer SimpleHeuristic', 'MCTSPlayer'])
+    writer.add_move(3, nodes=1234, millis=52, depth=6, score=17)
+    ...
+    writer.end_game(winner)
+
+    for game in GameReader('games.bin'):
+        for ply, board in game.replay():
+            ...
+"""
+from __future__ import annotations
+import mmap
+import os
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from board import BitBoard
+
+
+MAGIC: bytes = b'NRGR' # n in a row game records
+VERSION: int = 1
+FILE_HEADER: struct.Struct = struct.Struct('<4sB') # magic, version
+PLAYER_HEADER: struct.Struct = struct.Struct('<cH') # tag, length of the UTF-8 description
+GAME_HEADER: struct.Struct = struct.Struct('<cBBBbBHHH') # tag, width, height, game_n, result, flags, first player, second player, moves
+
+PLAYER_TAG: bytes = b'P'
+GAME_TAG: bytes = b'G'
+
+FLAG_STATS: int = 1 # the moves are followed by search statistics
+FLAG_SECOND_STARTS: int = 2 # player 2 made the first move
+FLAG_BYTE_MOVES: int = 4 # moves take a byte each, the board is too wide for nibbles
+
+# Search statistics of a move, packed without padding
+STATS_DTYPE: np.dtype = np.dtype([('nodes', '<u4'), ('millis', '<u4'), ('depth', 'u1'), ('score', '<i4')])
+
+
+def pack_moves(moves: Sequence[int], width: int) -> bytes:
+    """
+    Args:
+        moves (Sequence[int]): the columns played
+        width (int): width of the board
+
+    Returns:
+        bytes: the moves, two to a byte with the first one in the low nibble if the board is at most 16 columns wide
+    """
+    array: np.ndarray = np.asarray(moves, dtype=np.uint8)
+    if width > 16:
+        return array.tobytes()
+    if len(array) % 2:
+        array = np.append(array, np.uint8(0))
+    return (array[0::2] | array[1::2] << 4).astype(np.uint8).tobytes()
+
+
+def unpack_moves(data: np.ndarray, count: int, byte_moves: bool) -> np.ndarray:
+    """
+    Args:
+        data (np.ndarray): the packed moves as bytes
+        count (int): number of moves
+        byte_moves (bool): whether the moves take a byte each
+
+    Returns:
+        np.ndarray: the columns played
+    """
+    if byte_moves:
+        return data[:count]
+    moves: np.ndarray = np.empty(2 * len(data), dtype=np.uint8)
+    moves[0::2] = data & 15
+    moves[1::2] = data >> 4
+    return moves[:count]
+
+
+class GameRecord:
+    """A game read from a record file
+    """
+    def __init__(self, width: int, height: int, game_n: int, result: int, first_player: int, players: Tuple[str, str],
+                 moves: np.ndarray, stats: Optional[np.ndarray]) -> None:
+        """
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+            game_n (int): n in a row required to win
+            result (int): 1 or 2 if the respective player won, -1 for a draw, 0 if the game wasn't finished
+            first_player (int): id of the player that made the first move
+            players (Tuple[str, str]): descriptions of player 1 and player 2
+            moves (np.ndarray): the columns played
+            stats (Optional[np.ndarray]): per move the search statistics with STATS_DTYPE, None if they weren't recorded
+        """
+        self.width: int = width
+        self.height: int = height
+        self.game_n: int = game_n
+        self.result: int = result
+        self.first_player: int = first_player
+        self.players: Tuple[str, str] = players
+        self.moves: np.ndarray = moves
+        self.stats: Optional[np.ndarray] = stats
+
+
+    def get_player(self, ply: int) -> int:
+        """
+        Args:
+            ply (int): number of moves played before
+
+        Returns:
+            int: id of the player making move 'ply'
+        """
+        return self.first_player if ply % 2 == 0 else 3 - self.first_player
+
+
+    def replay(self, board: Optional[BitBoard] = None) -> Iterator[Tuple[int, BitBoard]]:
+        """Replays the moves, yielding every position from the empty board to the end of the game
+        The moves are played on a single board, so a position is only valid until the next one is yielded
+
+        Args:
+            board (Optional[BitBoard]): board to reuse, it is emptied first; None or a board of another size to create one
+
+        Yields:
+            Tuple[int, BitBoard]: the number of moves played and the board after them
+        """
+        if board is None or (board.width, board.height) != (self.width, self.height):
+            board = BitBoard(self.width, self.height)
+        while board.moves:
+            board.undo()
+
+        yield 0, board
+        for ply, col in enumerate(self.moves.tolist()):
+            board.play(col, self.get_player(ply))
+            yield ply + 1, board
+
+
+class GameReader:
+    """Reads the games of a record file one at a time
+
+    The file is memory-mapped, so only the pages of the games that are read
+    are loaded; the moves and statistics of a game are read straight from the
+    mapped file without copying; the file stays mapped until the reader is closed
+    and none of them are left. Reading stops at a record that is cut off or
+    unknown, such as one the process died while writing.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): path of the record file
+        """
+        self.players: List[str] = [] # player descriptions, by index
+        self.end: int = FILE_HEADER.size # byte after the last record read in full, known once all games were read
+        self.mmap: Optional[mmap.mmap] = None
+        if os.path.getsize(path) > FILE_HEADER.size:
+            with open(path, 'rb') as file:
+                self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = FILE_HEADER.unpack_from(self.mmap)
+            assert magic == MAGIC and version == VERSION, f'{path} is not a game record file'
+
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        """
+        Yields:
+            GameRecord: the games in the order they were written
+        """
+        self.players = []
+        self.end = FILE_HEADER.size
+        if self.mmap is None:
+            return
+
+        data: np.ndarray = np.frombuffer(self.mmap, dtype=np.uint8)
+        offset: int = FILE_HEADER.size
+        size: int = len(self.mmap)
+        while offset < size:
+            tag: bytes = self.mmap[offset:offset + 1]
+            if tag == PLAYER_TAG:
+                if offset + PLAYER_HEADER.size > size:
+                    break # cut off while it was written
+                _, length = PLAYER_HEADER.unpack_from(self.mmap, offset)
+                offset += PLAYER_HEADER.size
+                if offset + length > size:
+                    break
+                self.players.append(self.mmap[offset:offset + length].decode('utf-8'))
+                offset += length
+                self.end = offset
+                continue
+
+            if tag != GAME_TAG or offset + GAME_HEADER.size > size:
+                break
+            _, width, height, game_n, result, flags, first, second, count = GAME_HEADER.unpack_from(self.mmap, offset)
+            if max(first, second) >= len(self.players):
+                break # refers to a player record that isn't there
+            offset += GAME_HEADER.size
+
+            byte_moves: bool = bool(flags & FLAG_BYTE_MOVES)
+            move_bytes: int = count if byte_moves else (count + 1) // 2
+            stats_bytes: int = count * STATS_DTYPE.itemsize if flags & FLAG_STATS else 0
+            if offset + move_bytes + stats_bytes > size:
+                break
+
+            moves: np.ndarray = unpack_moves(data[offset:offset + move_bytes], count, byte_moves)
+            offset += move_bytes
+            stats: Optional[np.ndarray] = None
+            if flags & FLAG_STATS:
+                stats = np.frombuffer(self.mmap, dtype=STATS_DTYPE, count=count, offset=offset)
+                offset += stats_bytes
+            self.end = offset
+
+            yield GameRecord(width, height, game_n, result, 2 if flags & FLAG_SECOND_STARTS else 1, (self.players[first], self.players[second]),
+                             moves, stats)
+
+
+    def positions(self) -> Iterator[Tuple[GameRecord, int, BitBoard]]:
+        """Replays every game, reusing one board for all games of the same size
+
+        Yields:
+            Tuple[GameRecord, int, BitBoard]: the game, the number of moves played and the board after them
+        """
+        board: Optional[BitBoard] = None
+        for game in self:
+            for ply, board in game.replay(board):
+                yield game, ply, board
+
+
+    def close(self) -> None:
+        """Lets go of the record file, it is unmapped as soon as no moves or statistics read from it are left
+        """
+        self.mmap = None
+
+
+class GameWriter:
+    """Appends games to a record file
+
+    A game is collected move by move with begin_game, add_move and end_game, and
+    written in one go when it ends, so the file never holds half a game unless
+    the process dies while writing; readers stop at such a game, and a writer
+    opening the file cuts it off before appending.
+    """
+    def __init__(self, path: str, stats: bool = False) -> None:
+        """
+        Args:
+            path (str): path of the record file, games are appended if it exists
+            stats (bool): whether to record the search statistics of every move
+        """
+        self.stats: bool = stats
+        self.player_indices: Dict[str, int] = {}
+        end: int = 0 # length of the readable part of an existing file
+        if os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER.size:
+            reader: GameReader = GameReader(path)
+            for _ in reader: # reading the games reads the player records as well
+                pass
+            self.player_indices = {player: i for i, player in enumerate(reader.players)}
+            end = reader.end
+            reader.close()
+
+        self.file: BinaryIO = open(path, 'r+b' if end > 0 else 'wb')
+        if end > 0:
+            self.file.truncate(end) # drop a record that was cut off, games appended after it could never be read
+            self.file.seek(end)
+        else:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+        self.game: Optional[Tuple[int, int, int, Tuple[str, str], int]] = None # width, height, game_n, players and first player of the current game
+        self.moves: List[int] = []
+        self.move_stats: List[Tuple[int, int, int, int]] = []
+        self.game_count: int = 0 # games written by this writer
+
+
+    def begin_game(self, width: int, height: int, game_n: int, players: Sequence[str], first_player: int = 1) -> None:
+        """Starts recording a game
+
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+            game_n (int): n in a row required to win
+            players (Sequence[str]): descriptions of player 1 and player 2
+            first_player (int): id of the player that makes the first move
+        """
+        self.game = (width, height, game_n, (players[0], players[1]), first_player)
+        self.moves = []
+        self.move_stats = []
+
+
+    def add_move(self, col: int, nodes: int = 0, millis: int = 0, depth: int = 0, score: int = 0) -> None:
+        """Records a move of the current game
+
+        Args:
+            col (int): column played
+            nodes (int): number of positions searched for the move
+            millis (int): milliseconds the move took
+            depth (int): depth searched to
+            score (int): score of the move for the player making it
+        """
+        self.moves.append(col)
+        self.move_stats.append((min(nodes, 0xFFFFFFFF), min(millis, 0xFFFFFFFF), min(depth, 0xFF), score))
+
+
+    def end_game(self, result: int) -> None:
+        """Writes the current game to the file
+
+        Args:
+            result (int): 1 or 2 if the respective player won, -1 for a draw, 0 if the game wasn't finished
+        """
+        assert self.game is not None, 'No game was started'
+        width, height, game_n, players, first_player = self.game
+        self.write_game(width, height, game_n, players, self.moves, result, first_player, self.move_stats if self.stats else None)
+        self.game = None
+
+
+    def write_game(self, width: int, height: int, game_n: int, players: Sequence[str], moves: Sequence[int], result: int, first_player: int = 1,
+                   stats: Optional[Sequence[Tuple[int, int, int, int]]] = None) -> None:
+        """Writes a whole game to the file
+
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+            game_n (int): n in a row required to win
+            players (Sequence[str]): descriptions of player 1 and player 2
+            moves (Sequence[int]): the columns played
+            result (int): 1 or 2 if the respective player won, -1 for a draw, 0 if the game wasn't finished
+            first_player (int): id of the player that made the first move
+            stats (Optional[Sequence[Tuple[int, int, int, int]]]): per move the nodes, milliseconds, depth and score, None to not record them
+        """
+        data: bytearray = bytearray()
+        indices: List[int] = []
+        for player in players[:2]:
+            if player not in self.player_indices:
+                description: bytes = player.encode('utf-8')
+                data += PLAYER_HEADER.pack(PLAYER_TAG, len(description)) + description
+                self.player_indices[player] = len(self.player_indices)
+            indices.append(self.player_indices[player])
+
+        flags: int = (FLAG_STATS if stats is not None else 0) | (FLAG_SECOND_STARTS if first_player == 2 else 0) | (FLAG_BYTE_MOVES if width > 16 else 0)
+        data += GAME_HEADER.pack(GAME_TAG, width, height, game_n, result, flags, indices[0], indices[1], len(moves))
+        data += pack_moves(moves, width)
+        if stats is not None:
+            data += np.array(list(stats), dtype=STATS_DTYPE).tobytes()
+
+        self.file.write(data)
+        self.file.flush()
+        self.game_count += 1
+
+
+    def close(self) -> None:
+        """Closes the record file
+        """
+        self.file.close()
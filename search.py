@@ -0,0 +1,590 @@
+from __future__ import annotations
+from functools import lru_cache
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from board import BitBoard, playable_squares, state_bitboards, winning_squares
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+if TYPE_CHECKING:
+    from heuristics import Heuristic
+    from board import Board
+    from stats import SearchStats
+
+
+WIN_SCORE: int = 1_000_000 # score of a won position, minus the number of moves it takes to get there
+WIN_THRESHOLD: int = WIN_SCORE // 2 # scores beyond this are wins or losses, not heuristic values
+
+# Keys mixed into the hash for each searching player; leaves are scored by the
+# heuristic of the searching player, so the scores of the two players differ
+PERSPECTIVE_KEYS: Tuple[int, int, int] = (0, 0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+
+
+@lru_cache(maxsize=None)
+def center_first(width: int) -> Tuple[int, ...]:
+    """Orders the columns of a board from the center outwards
+
+    Args:
+        width (int): width of the board
+
+    Returns:
+        Tuple[int, ...]: the columns, central columns first
+    """
+    return tuple(sorted(range(width), key=lambda col: abs(2 * col - width + 1)))
+
+
+# A move ordering policy gives the columns of a board in the order to try them, valid or not
+MoveOrder = Callable[['Board'], Sequence[int]]
+
+
+def center_order(board: Board) -> Sequence[int]:
+    """Move ordering policy trying the central columns first
+
+    Args:
+        board (Board): the board to move on
+
+    Returns:
+        Sequence[int]: the columns, central columns first
+    """
+    return center_first(board.width)
+
+
+def left_to_right_order(board: Board) -> Sequence[int]:
+    """Move ordering policy trying the columns from left to right
+
+    Args:
+        board (Board): the board to move on
+
+    Returns:
+        Sequence[int]: the columns, leftmost first
+    """
+    return range(board.width)
+
+
+def threat_moves(board: Board, player_id: int, game_n: int, moves: Sequence[int]) -> List[int]:
+    """Prunes moves using the fields either player wins with
+    If the player can win right away only the winning moves are kept, else if the
+    opponent threatens to win only the moves blocking that; otherwise moves right
+    below a field the opponent wins with are dropped, as the opponent would win on
+    top of them, unless no other moves are left. Pruned moves all lose right away
+    or don't win as quickly, so the value of the position doesn't change
+
+    Args:
+        board (Board): the board to move on, where nobody has won yet
+        player_id (int): the player to move
+        game_n (int): n in a row required to win
+        moves (Sequence[int]): the valid columns to prune, in search order
+
+    Returns:
+        List[int]: the remaining columns, in the same order
+    """
+    bitboards: List[int]
+    heights: List[int]
+    if isinstance(board, BitBoard):
+        bitboards, heights = board.bitboards, board.heights
+    else: # only the bitboards are needed, not a whole BitBoard with its hashes
+        bitboards, heights = state_bitboards(board.get_state_view())
+    stride: int = board.height + 1
+    playable: int = playable_squares(bitboards, board.width, board.height)
+
+    # A player needs game_n - 1 pieces to have a winning field
+    if bin(bitboards[player_id - 1]).count('1') >= game_n - 1:
+        wins: int = winning_squares(bitboards, player_id, board.width, board.height, game_n) & playable
+        if wins:
+            return [col for col in moves if wins >> (col * stride + heights[col]) & 1]
+
+    if bin(bitboards[2 - player_id]).count('1') < game_n - 1:
+        return list(moves)
+    threats: int = winning_squares(bitboards, 3 - player_id, board.width, board.height, game_n)
+    if threats & playable: # more than one can't all be blocked, any of them loses
+        return [col for col in moves if threats >> (col * stride + heights[col]) & 1]
+
+    safe: List[int] = [col for col in moves if heights[col] == board.height - 1 or not threats >> (col * stride + heights[col] + 1) & 1]
+    return safe if safe else list(moves)
+
+
+def mirror_move(board: Board, col: int, mirrored: bool) -> int:
+    """Converts a move between a board and its mirror image
+
+    Args:
+        board (Board): the board
+        col (int): column of the move, -1 if unknown
+        mirrored (bool): whether to mirror the move
+
+    Returns:
+        int: the column on the other board if mirrored, otherwise the column itself
+    """
+    if mirrored and col >= 0:
+        return board.width - 1 - col
+    return col
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its time budget has run out
+    """
+
+
+def to_table_score(score: int, ply: int) -> int:
+    """Makes win and loss scores relative to the position instead of the root
+
+    Args:
+        score (int): score relative to the root
+        ply (int): number of moves played since the root
+
+    Returns:
+        int: score to store in a transposition table
+    """
+    if score > WIN_THRESHOLD:
+        return score + ply
+    if score < -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def from_table_score(score: int, ply: int) -> int:
+    """Inverse of to_table_score
+
+    Args:
+        score (int): score from a transposition table
+        ply (int): number of moves played since the root
+
+    Returns:
+        int: score relative to the root
+    """
+    if score > WIN_THRESHOLD:
+        return score - ply
+    if score < -WIN_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Search:
+    """Depth limited negamax search using make/unmake moves on a single board
+
+    Scores are given from the perspective of the player to move; leaves are
+    scored by the heuristic of the root player, negated on the opponent's turns,
+    so the search finds the same values as a classic min/max search.
+    A transposition table can be shared between searches, also of different
+    players, as long as they use the same kind of heuristic. Positions are
+    stored under their canonical key, so a position and its mirror image share
+    an entry, with the stored move mirrored as needed.
+    """
+    def __init__(self, player_id: int, game_n: int, heuristic: Heuristic, alpha_beta: bool = True, transposition_table: Optional[TranspositionTable] = None,
+                 batch_leaves: bool = False, move_order: MoveOrder = center_order, threat_pruning: bool = False) -> None:
+        """
+        Args:
+            player_id (int): id of the player that searches, can take values 1 or 2
+            game_n (int): n in a row required to win
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            alpha_beta (bool): whether to prune with alpha-beta, otherwise a full minmax search is done
+            transposition_table (Optional[TranspositionTable]): table to store search results in, None to not use one
+            batch_leaves (bool): whether to score all leaves below a position with one evaluate_many call,
+                which gives up pruning at the last depth for less overhead per leaf
+            move_order (MoveOrder): policy ordering the moves that aren't known to be good from earlier searches
+            threat_pruning (bool): whether to prune the moves of every position with threat_moves
+        """
+        self.player_id: int = player_id
+        self.game_n: int = game_n
+        self.heuristic: Heuristic = heuristic
+        self.alpha_beta: bool = alpha_beta
+        self.transposition_table: Optional[TranspositionTable] = transposition_table
+        self.perspective_key: int = PERSPECTIVE_KEYS[player_id]
+        self.batch_leaves: bool = batch_leaves
+        self.move_order: MoveOrder = move_order
+        self.threat_pruning: bool = threat_pruning
+        self.leaf_states: np.ndarray = np.empty((0, 0, 0), dtype=int) # buffer for the leaves of one position
+
+        self.node_count: int = 0 # number of positions visited
+        self.generated_count: int = 0 # number of moves generated, cutoffs keep some of them from being visited
+        self.cutoff_count: int = 0 # number of beta cutoffs
+        self.stats: Optional[SearchStats] = None # detailed counters and timers, None to not collect them
+
+        self.deadline: float = 0.0 # perf_counter time at which the search is aborted, 0 for no limit
+        self.stop_time: float = 0.0 # perf_counter time at which iterative deepening stops
+        self.pv: List[Tuple[int, ...]] = [()] # per ply, the principal variation found below it
+        self.last_pv: Tuple[int, ...] = () # principal variation of the last completed search
+        self.pv_moves: Dict[int, int] = {} # hash to move of the positions on the previous principal variation
+
+
+    def search(self, board: Board, depth: int) -> Tuple[int, int]:
+        """Searches the board for the best move of the player
+
+        Args:
+            board (Board): the board to search, it is changed during the search but restored afterwards
+            depth (int): the max search depth, at least 1
+
+        Raises:
+            SearchTimeout: if the deadline passed, the board is restored before raising
+
+        Returns:
+            Tuple[int, int]: the best column and its score
+        """
+        alpha: int = -WIN_SCORE - 1
+        beta: int = WIN_SCORE + 1
+        best_move: int = -1
+        root_moves: int = len(board.moves)
+        self.pv = [()] * (depth + 2)
+        if self.stats is not None:
+            self.stats.reserve(depth + 1)
+
+        try:
+            moves: List[int] = self.order_root_moves(board)
+            self.generated_count += len(moves)
+            for col in moves:
+                score: int = self.search_move(board, col, self.player_id, depth, alpha, beta, 1)
+                if score > alpha or best_move < 0:
+                    alpha = max(alpha, score)
+                    best_move = col
+                    self.pv[0] = (col,) + self.pv[1]
+        except SearchTimeout:
+            while len(board.moves) > root_moves:
+                board.undo()
+            raise
+
+        if self.transposition_table is not None:
+            key, mirrored = self.get_table_key(board)
+            self.transposition_table.store(key, depth, EXACT, alpha, mirror_move(board, best_move, mirrored))
+
+        self.last_pv = self.pv[0]
+        return best_move, alpha
+
+
+    def get_table_key(self, board: Board) -> Tuple[int, bool]:
+        """
+        Args:
+            board (Board): a board
+
+        Returns:
+            Tuple[int, bool]: transposition table key of the board for this player, and whether it is the key of the mirror image
+        """
+        key, mirrored = board.get_canonical_key()
+        return key ^ self.perspective_key, mirrored
+
+
+    def order_root_moves(self, board: Board) -> List[int]:
+        """
+        Args:
+            board (Board): the root board
+
+        Returns:
+            List[int]: the valid columns, the move of the previous principal variation
+                or else the transposition table first, then in the order of the move ordering policy;
+                in a symmetric position only one of every two mirrored columns
+        """
+        table_move: int = -1
+        if self.transposition_table is not None:
+            key, mirrored = self.get_table_key(board)
+            entry: Optional[Tuple[int, int, int, int]] = self.transposition_table.probe(key)
+            if entry is not None:
+                table_move = mirror_move(board, entry[3], mirrored)
+
+        moves: List[int] = self.order_moves(board, self.player_id, self.pv_moves.get(board.hash, table_move))
+        if board.is_symmetric(): # mirrored moves have the same score
+            moves = [col for i, col in enumerate(moves) if board.width - 1 - col not in moves[:i]]
+        return moves
+
+
+    def iterative_deepening(self, board: Board, time_limit: Optional[int], max_depth: int) -> Tuple[int, int, int]:
+        """Searches the board one depth deeper at a time, until the time runs out
+        Each iteration tries the principal variation of the previous one first.
+        An iteration that is aborted is thrown away; depth 1 is always completed
+        unless the search is stopped
+
+        Args:
+            board (Board): the board to search, it is changed during the search but restored afterwards
+            time_limit (Optional[int]): time budget in milliseconds, None to search until stopped or set_stop_time is called
+            max_depth (int): depth at which to stop even if there is time left
+
+        Returns:
+            Tuple[int, int, int]: the best column and its score of the deepest completed search, and that depth
+        """
+        self.stop_time = perf_counter() + time_limit / 1000 if time_limit is not None else float('inf')
+        empty: int = board.width * board.height - int((board.board_state != 0).sum())
+        best: Tuple[int, int, int] = (-1, 0, 0)
+        self.pv_moves = {}
+
+        try:
+            for depth in range(1, min(max_depth, empty) + 1):
+                self.deadline = self.stop_time if depth > 1 else 0.0
+                move, score = self.search(board, depth)
+                best = (move, score, depth)
+
+                if abs(score) > WIN_THRESHOLD: # the outcome is decided, searching deeper won't change it
+                    break
+                self.pv_moves = self.get_pv_moves(board, self.pv[0])
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = 0.0
+            self.pv_moves = {}
+
+        return best
+
+
+    def get_pv_moves(self, board: Board, pv: Tuple[int, ...]) -> Dict[int, int]:
+        """
+        Args:
+            board (Board): the root board
+            pv (Tuple[int, ...]): the principal variation from the root
+
+        Returns:
+            Dict[int, int]: hash of every position on the principal variation, mapped to the move played in it
+        """
+        pv_moves: Dict[int, int] = {}
+        player_id: int = self.player_id
+
+        for col in pv:
+            pv_moves[board.hash] = col
+            board.play(col, player_id)
+            player_id = 3 - player_id
+
+        for _ in pv:
+            board.undo()
+        return pv_moves
+
+
+    def stop(self) -> None:
+        """Moves the deadline into the past, so a running search aborts at its next check
+        Safe to call from another thread
+        """
+        self.stop_time = -1.0
+        self.deadline = -1.0
+
+
+    def set_stop_time(self, stop_time: float) -> None:
+        """Moves the time at which a running iterative deepening search stops
+        Safe to call from another thread
+
+        Args:
+            stop_time (float): perf_counter time to stop at
+        """
+        self.stop_time = stop_time
+        if self.deadline:
+            self.deadline = stop_time
+
+
+    def is_stopped(self) -> bool:
+        """Checked every 1024 positions while a deadline is set
+
+        Returns:
+            bool: whether the search has to abort, because the deadline passed
+        """
+        return perf_counter() > self.deadline
+
+
+    def close(self) -> None:
+        """Releases the resources of the search, nothing for a serial search
+        """
+
+
+    def negamax(self, board: Board, player_id: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Negamax search of a position
+
+        Args:
+            board (Board): the board to search
+            player_id (int): the player to move
+            depth (int): remaining search depth, at least 1
+            alpha (int): lower bound of the search window
+            beta (int): upper bound of the search window
+            ply (int): number of moves played since the root
+
+        Returns:
+            int: score of the position for the player to move
+        """
+        best: int = -WIN_SCORE - 1
+        best_move: int = -1
+        table_move: int = -1
+        key, mirrored = self.get_table_key(board)
+
+        if self.transposition_table is not None:
+            entry: Optional[Tuple[int, int, int, int]] = self.transposition_table.probe(key)
+            if entry is not None:
+                table_depth, flag, table_score, table_move = entry
+                table_move = mirror_move(board, table_move, mirrored)
+                if table_depth >= depth:
+                    table_score = from_table_score(table_score, ply)
+                    if flag == EXACT:
+                        return table_score
+                    if flag == LOWER:
+                        alpha = max(alpha, table_score)
+                    else:
+                        beta = min(beta, table_score)
+                    if alpha >= beta:
+                        return table_score
+
+        # The bound type depends on the window that is actually searched
+        original_alpha: int = alpha
+        original_beta: int = beta
+
+        if depth == 1 and self.batch_leaves:
+            # Every move is scored, so the result is exact
+            best, best_move = self.evaluate_frontier(board, player_id, ply)
+            original_alpha, original_beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        else:
+            stats: Optional[SearchStats] = self.stats
+            timed: bool = stats is not None and self.node_count % stats.sample_interval == 0
+            start: float = perf_counter() if timed else 0.0
+            moves: List[int] = self.order_moves(board, player_id, self.pv_moves.get(board.hash, table_move))
+            if timed:
+                stats.times['moves'] += perf_counter() - start
+            self.generated_count += len(moves)
+            for i, col in enumerate(moves):
+                score: int = self.search_move(board, col, player_id, depth, alpha, beta, ply + 1)
+                if score > best:
+                    best = score
+                    best_move = col
+                    if score > alpha:
+                        alpha = score
+                        self.pv[ply] = (col,) + self.pv[ply + 1]
+                        if alpha >= beta and self.alpha_beta:
+                            self.cutoff_count += 1
+                            if stats is not None:
+                                stats.cutoffs += 1
+                                stats.first_move_cutoffs += i == 0
+                            break
+
+        if self.transposition_table is not None:
+            flag = EXACT
+            if self.alpha_beta and best <= original_alpha:
+                flag = UPPER
+            elif self.alpha_beta and best >= original_beta:
+                flag = LOWER
+            self.transposition_table.store(key, depth, flag, to_table_score(best, ply), mirror_move(board, best_move, mirrored))
+
+        return best
+
+
+    def evaluate_frontier(self, board: Board, player_id: int, ply: int) -> Tuple[int, int]:
+        """Scores every move of a position at the last search depth
+        The positions after the moves are copied into a buffer and scored with
+        a single evaluate_many call, instead of one heuristic call per leaf
+
+        Args:
+            board (Board): the board to search
+            player_id (int): the player to move
+            ply (int): number of moves played since the root
+
+        Raises:
+            SearchTimeout: if the deadline passed
+
+        Returns:
+            Tuple[int, int]: score of the position for the player to move and the best column
+        """
+        if self.leaf_states.shape != (board.width, board.width, board.height):
+            self.leaf_states = np.empty((board.width, board.width, board.height), dtype=board.board_state.dtype)
+
+        best: int = -WIN_SCORE - 1
+        best_move: int = -1
+        cols: List[int] = []
+        moves: List[int] = self.order_moves(board, player_id)
+        self.generated_count += len(moves)
+        timed: bool = self.stats is not None and self.node_count % self.stats.sample_interval == 0
+
+        for col in moves:
+            self.node_count += 1
+            if self.deadline and self.node_count & 1023 == 0 and self.is_stopped():
+                raise SearchTimeout()
+            leaf_timed: bool = False
+            if self.stats is not None:
+                self.stats.nodes[ply + 1] += 1
+                leaf_timed = self.node_count % self.stats.sample_interval == 0
+
+            board.play(col, player_id)
+            start: float = perf_counter() if leaf_timed else 0.0
+            winner: int = board.get_winner(self.game_n)
+            if leaf_timed:
+                self.stats.times['winning'] += perf_counter() - start
+            if winner == 0:
+                self.leaf_states[len(cols)] = board.board_state
+                cols.append(col)
+            board.undo()
+
+            if winner == player_id: # nothing beats winning right away
+                self.pv[ply] = (col,)
+                return WIN_SCORE - ply - 1, col
+            if winner < 0 and best < 0:
+                best, best_move = 0, col
+
+        if cols:
+            start = perf_counter() if timed else 0.0
+            scores: np.ndarray = self.heuristic.evaluate_many(self.player_id, self.leaf_states[:len(cols)])
+            if timed:
+                self.stats.times['evaluate'] += perf_counter() - start
+            if player_id != self.player_id:
+                scores = -scores
+            for col, score in zip(cols, scores.tolist()):
+                if score > best:
+                    best, best_move = score, col
+
+        self.pv[ply] = (best_move,)
+        return best, best_move
+
+
+    def search_move(self, board: Board, col: int, player_id: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Plays a move, scores the resulting position and takes the move back
+
+        Args:
+            board (Board): the board to search
+            col (int): column to play in
+            player_id (int): the player making the move
+            depth (int): remaining search depth including this move
+            alpha (int): lower bound of the search window
+            beta (int): upper bound of the search window
+            ply (int): number of moves played since the root, including this move
+
+        Raises:
+            SearchTimeout: if the deadline passed
+
+        Returns:
+            int: score of the move for the player making it
+        """
+        self.node_count += 1
+        if self.deadline and self.node_count & 1023 == 0 and self.is_stopped():
+            raise SearchTimeout()
+
+        stats: Optional[SearchStats] = self.stats
+        timed: bool = False
+        if stats is not None:
+            stats.nodes[ply] += 1
+            timed = self.node_count % stats.sample_interval == 0
+
+        self.pv[ply] = ()
+        board.play(col, player_id)
+        start: float = perf_counter() if timed else 0.0
+        winner: int = board.get_winner(self.game_n)
+        if timed:
+            stats.times['winning'] += perf_counter() - start
+
+        if winner == player_id:
+            score: int = WIN_SCORE - ply # quicker wins score higher
+        elif winner < 0:
+            score = 0
+        elif depth == 1:
+            start = perf_counter() if timed else 0.0
+            score = self.heuristic.evaluate_board(self.player_id, board)
+            if timed:
+                stats.times['evaluate'] += perf_counter() - start
+            if player_id != self.player_id:
+                score = -score
+        else:
+            score = -self.negamax(board, 3 - player_id, depth - 1, -beta, -alpha, ply)
+
+        board.undo()
+        return score
+
+
+    def order_moves(self, board: Board, player_id: int, first: int = -1) -> List[int]:
+        """
+        Args:
+            board (Board): the board to move on
+            player_id (int): the player to move
+            first (int): column to try before all others, -1 for none
+
+        Returns:
+            List[int]: the valid columns in the order of the move ordering policy, pruned with threat_moves if the search does
+        """
+        moves: List[int] = [col for col in self.move_order(board) if board.is_valid(col) and col != first]
+        if first >= 0 and board.is_valid(first):
+            moves.insert(0, first)
+        if self.threat_pruning:
+            moves = threat_moves(board, player_id, self.game_n, moves)
+        return moves
@@ -0,0 +1,259 @@
+from __future__ import annotations
+from time import perf_counter
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from board import BitBoard
+from search import center_first
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+if TYPE_CHECKING:
+    from board import Board
+
+
+class Solver:
+    """Exact solver for positions with few empty fields
+
+    Positions are two integers, like the bitboards of BitBoard: the pieces of
+    the player to move and the mask of all pieces. Scores are exact:
+    0 for a draw, and for a win the number of fields still empty after the
+    winning move plus one, negative for a loss, so quick wins and slow losses
+    score higher. The value of a position is found with null-window searches
+    that halve the range of possible scores every time (like MTD(f)), with a
+    table of win, draw and loss bounds shared by all of them.
+    """
+    def __init__(self, game_n: int, transposition_table: Optional[TranspositionTable] = None) -> None:
+        """
+        Args:
+            game_n (int): n in a row required to win
+            transposition_table (Optional[TranspositionTable]): table for the score bounds, None to create one
+        """
+        self.game_n: int = game_n
+        self.transposition_table: TranspositionTable = transposition_table if transposition_table is not None else TranspositionTable()
+        self.width: int = 0
+        self.height: int = 0
+
+        self.node_count: int = 0 # number of positions visited
+        self.solve_count: int = 0 # number of root positions solved
+        self.solve_time: float = 0.0 # seconds spent solving
+
+
+    def set_size(self, width: int, height: int) -> None:
+        """Prepares the masks for a board size
+
+        Args:
+            width (int): width of the board
+            height (int): height of the board
+        """
+        if (width, height) == (self.width, self.height):
+            return
+        self.width = width
+        self.height = height
+        self.stride: int = height + 1
+        self.fields: int = width * height
+        self.fits_64: bool = width * self.stride < 64 # pos + mask needs one more bit
+        self.bottom: List[int] = [1 << (col * self.stride) for col in range(width)]
+        self.top: List[int] = [1 << (col * self.stride + height - 1) for col in range(width)]
+        self.columns: List[int] = [((1 << height) - 1) << (col * self.stride) for col in range(width)]
+        self.order: Tuple[int, ...] = center_first(width)
+
+        # Shifts that double the run length each step, for each direction
+        self.shifts: List[List[int]] = []
+        for shift in (1, self.stride, self.stride - 1, self.stride + 1): # vertical, horizontal, both diagonals
+            steps: List[int] = []
+            length: int = 1
+            while length < self.game_n:
+                step: int = min(length, self.game_n - length)
+                steps.append(step * shift)
+                length += step
+            self.shifts.append(steps)
+        self.transposition_table.clear()
+
+
+    def is_win(self, pieces: int) -> bool:
+        """
+        Args:
+            pieces (int): the pieces of one player
+
+        Returns:
+            bool: true if the pieces contain n in a row
+        """
+        for steps in self.shifts:
+            line: int = pieces
+            for step in steps:
+                line &= line >> step
+            if line:
+                return True
+        return False
+
+
+    def solve_board(self, board: Board, player_id: int) -> Tuple[int, int]:
+        """Finds the best move of a player and its exact score
+
+        Args:
+            board (Board): the board, where nobody has won yet
+            player_id (int): the player to move
+
+        Returns:
+            Tuple[int, int]: the best column, the fastest win or else the slowest loss, and its score
+        """
+        start: float = perf_counter()
+        bitboard: BitBoard = board if isinstance(board, BitBoard) else BitBoard(board)
+        self.set_size(bitboard.width, bitboard.height)
+
+        pos: int = bitboard.bitboards[player_id - 1]
+        mask: int = bitboard.bitboards[0] | bitboard.bitboards[1]
+        moves: int = sum(bitboard.heights)
+
+        best_move: int = -1
+        best: int = -self.fields - 1
+        for col in self.order:
+            if mask & self.top[col]:
+                continue
+            move: int = (mask + self.bottom[col]) & self.columns[col] # the lowest empty field of the column
+            if self.is_win(pos | move):
+                best_move, best = col, self.fields - moves
+                break
+            score: int = -self.solve(mask ^ pos, mask | move, moves + 1)
+            if score > best:
+                best_move, best = col, score
+
+        self.solve_count += 1
+        self.solve_time += perf_counter() - start
+        return best_move, best
+
+
+    def solve(self, pos: int, mask: int, moves: int) -> int:
+        """Finds the exact score of a position with null-window searches
+
+        Args:
+            pos (int): pieces of the player to move
+            mask (int): all pieces
+            moves (int): number of pieces
+
+        Returns:
+            int: the score of the position for the player to move
+        """
+        if moves == self.fields:
+            return 0
+        low: int = -(self.fields - moves)
+        high: int = self.fields - moves
+        while low < high:
+            middle: int = low + (high - low) // 2
+            # Try around zero first, deciding win, draw or loss takes the fewest nodes
+            if middle <= 0 and low // 2 < middle:
+                middle = low // 2
+            elif middle >= 0 and high // 2 > middle:
+                middle = high // 2
+            score: int = self.negamax(pos, mask, moves, middle, middle + 1)
+            if score <= middle:
+                high = score
+            else:
+                low = score
+        return low
+
+
+    def get_key(self, pos: int, mask: int) -> int:
+        """
+        Args:
+            pos (int): pieces of the player to move
+            mask (int): all pieces
+
+        Returns:
+            int: table key of the position, unique if the board fits in 64 bits
+        """
+        if self.fits_64:
+            return pos + mask # the mask plus its bottom row marks which pieces are whose
+        return hash((pos, mask)) & 0xFFFFFFFFFFFFFFFF
+
+
+    def negamax(self, pos: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+        """Alpha-beta search to the end of the game
+
+        Args:
+            pos (int): pieces of the player to move
+            mask (int): all pieces
+            moves (int): number of pieces
+            alpha (int): lower bound of the search window
+            beta (int): upper bound of the search window
+
+        Returns:
+            int: score of the position for the player to move, exact within the window, a bound otherwise
+        """
+        self.node_count += 1
+        if moves == self.fields:
+            return 0
+
+        other: int = pos ^ mask
+        playable: List[Tuple[int, int]] = []
+        for col in self.order:
+            if not mask & self.top[col]:
+                move: int = (mask + self.bottom[col]) & self.columns[col] # the lowest empty field of the column
+                if self.is_win(pos | move):
+                    return self.fields - moves # win right away
+                playable.append((col, move))
+
+        # Moves the opponent would win with, they have to be blocked
+        threats: List[Tuple[int, int]] = [(col, move) for col, move in playable if self.is_win(other | move)]
+        if len(threats) > 1:
+            return -(self.fields - moves - 1)
+        if threats:
+            playable = threats
+        else:
+            # Don't play under a field the opponent wins with, unless there is nothing else
+            safe: List[Tuple[int, int]] = [(col, move) for col, move in playable if move & self.top[col] or not self.is_win(other | move << 1)]
+            if not safe:
+                return -(self.fields - moves - 1)
+            playable = safe
+
+        # Winning right away is handled above, so the best possible is winning two moves later,
+        # or a draw if the board fills up before that
+        high: int = max(self.fields - moves - 2, 0)
+        if beta > high:
+            beta = high
+            if alpha >= beta:
+                return beta
+
+        key: int = self.get_key(pos, mask)
+        entry: Optional[Tuple[int, int, int, int]] = self.transposition_table.probe(key)
+        if entry is not None:
+            _, flag, score, _ = entry
+            if flag == EXACT:
+                return score
+            if flag == LOWER and score > alpha:
+                alpha = score
+            elif flag == UPPER and score < beta:
+                beta = score
+            if alpha >= beta:
+                return score
+
+        original_alpha: int = alpha
+        best: int = -self.fields - 1
+        for col, move in playable:
+            score: int = -self.negamax(other, mask | move, moves + 1, -beta, -alpha)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        flag: int = EXACT
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        self.transposition_table.store(key, 0, flag, best, -1)
+        return best
+
+
+    def get_outcome(self, score: int, moves: int) -> Tuple[int, int]:
+        """Converts a score to the outcome of the game
+
+        Args:
+            score (int): score of a position for the player to move
+            moves (int): number of pieces in the position
+
+        Returns:
+            Tuple[int, int]: 1 for a win, 0 for a draw, -1 for a loss, and the number of moves until the game ends that way
+        """
+        if score == 0:
+            return 0, self.fields - moves
+        return (1 if score > 0 else -1), self.fields + 1 - abs(score) - moves
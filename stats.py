@@ -0,0 +1,167 @@
+"""Instrumentation of the search of a player
+
+A SearchStats object counts the positions a search visits per ply, its cutoffs,
+transposition table probes and the time every move takes, and estimates how the
+search time splits over win detection, heuristic evaluation and move
+generation. Timing a call costs about as much as a cheap call itself, so only
+every sample_interval-th position is timed and the times are scaled up.
+
+    player.enable_stats(sample_interval=64, profile=True)
+    ... play ...
+    print(player.stats)
+    player.stats.export_trace('trace.json') # open in chrome://tracing or Perfetto
+    player.stats.dump_profile('moves.prof') # python -m pstats moves.prof
+"""
+from __future__ import annotations
+import cProfile
+import json
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+if TYPE_CHECKING:
+    from transposition import TranspositionTable
+
+
+TIMERS: List[str] = ['winning', 'evaluate', 'moves'] # win detection, heuristic evaluation and move generation
+
+
+class SearchStats:
+    """Counters and timers of a search, filled in by Search and per move by the player
+    Only the search of the player itself is counted, not worker or helper processes
+    """
+    def __init__(self, sample_interval: int = 1, profile: bool = False) -> None:
+        """
+        Args:
+            sample_interval (int): time one in this many positions, 1 to time every position
+            profile (bool): whether to run cProfile during moves, which slows them down a lot
+        """
+        assert sample_interval >= 1, 'The sample interval must be at least 1'
+        self.sample_interval: int = sample_interval
+        self.nodes: List[int] = [0] * 64 # positions visited per ply, the root moves are ply 1
+        self.cutoffs: int = 0
+        self.first_move_cutoffs: int = 0 # cutoffs by the first move searched
+        self.times: Dict[str, float] = {timer: 0.0 for timer in TIMERS} # sampled seconds
+        self.moves: List[Dict[str, float]] = [] # per move, wall time, nodes, depth reached and table probes and hits
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile() if profile else None
+
+        self.move_start: float = 0.0 # perf_counter time the current move started
+        self.move_counts: List[int] = [0, 0, 0] # nodes, table probes and table hits at the start of the current move
+        self.trace_start: float = perf_counter()
+
+
+    def reserve(self, plies: int) -> None:
+        """Makes room to count the positions of a search of up to this many plies
+
+        Args:
+            plies (int): max number of moves from the root
+        """
+        if plies >= len(self.nodes):
+            self.nodes.extend([0] * (plies + 1 - len(self.nodes)))
+
+
+    def get_node_count(self) -> int:
+        """
+        Returns:
+            int: number of positions visited
+        """
+        return sum(self.nodes)
+
+
+    def begin_move(self, table: Optional[TranspositionTable] = None) -> None:
+        """Starts timing a move, and profiling it if asked to
+
+        Args:
+            table (Optional[TranspositionTable]): transposition table of the search, None if it has none
+        """
+        self.move_start = perf_counter()
+        self.move_counts = [self.get_node_count(), table.probes if table is not None else 0, table.hits if table is not None else 0]
+        if self.profiler is not None:
+            self.profiler.enable()
+
+
+    def end_move(self, depth: int, table: Optional[TranspositionTable] = None) -> None:
+        """Adds the numbers of a move
+
+        Args:
+            depth (int): depth reached for the move
+            table (Optional[TranspositionTable]): transposition table of the search, None if it has none
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.moves.append({
+            'start': self.move_start - self.trace_start,
+            'time': perf_counter() - self.move_start,
+            'nodes': self.get_node_count() - self.move_counts[0],
+            'depth': depth,
+            'probes': table.probes - self.move_counts[1] if table is not None else 0,
+            'hits': table.hits - self.move_counts[2] if table is not None else 0,
+        })
+
+
+    def get_branching_factor(self) -> float:
+        """
+        Returns:
+            float: effective branching factor, the mean over the searched moves of nodes^(1 / depth)
+        """
+        factors: List[float] = [move['nodes'] ** (1 / move['depth']) for move in self.moves if move['depth'] > 0 and move['nodes'] > 0]
+        return sum(factors) / len(factors) if factors else 0.0
+
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: all numbers, with the times scaled up to estimates of the whole search
+        """
+        probes: int = sum(int(move['probes']) for move in self.moves)
+        plies: int = max((ply for ply, count in enumerate(self.nodes) if count > 0), default=0)
+        return {
+            'nodes': self.get_node_count(),
+            'nodes_per_ply': self.nodes[1:plies + 1],
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'table_probes': probes,
+            'table_hit_rate': sum(int(move['hits']) for move in self.moves) / probes if probes else 0.0,
+            'seconds': {timer: time * self.sample_interval for timer, time in self.times.items()},
+            'branching_factor': self.get_branching_factor(),
+            'move_seconds': [move['time'] for move in self.moves],
+        }
+
+
+    def export_trace(self, path: str) -> None:
+        """Writes every move as an event in the Chrome trace format, with its numbers as arguments
+
+        Args:
+            path (str): path of the trace file
+        """
+        events: List[Dict[str, Any]] = [{
+            'name': f'move {i + 1}', 'ph': 'X', 'pid': 0, 'tid': 0,
+            'ts': move['start'] * 1e6, 'dur': move['time'] * 1e6, # microseconds
+            'args': {key: value for key, value in move.items() if key not in ('start', 'time')},
+        } for i, move in enumerate(self.moves)]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'otherData': self.get_summary()}, file)
+
+
+    def dump_profile(self, path: str) -> None:
+        """Writes the cProfile statistics of the moves, which can be read with pstats
+
+        Args:
+            path (str): path of the profile file
+        """
+        assert self.profiler is not None, 'The moves weren\'t profiled'
+        self.profiler.dump_stats(path)
+
+
+    def __str__(self) -> str:
+        """
+        Returns:
+            str: the main numbers on a few lines
+        """
+        summary: Dict[str, Any] = self.get_summary()
+        seconds: str = ', '.join(f'{timer} {time:.3f}' for timer, time in summary['seconds'].items())
+        move_seconds: List[float] = summary['move_seconds']
+        return (f'{summary["nodes"]} positions, per ply: {summary["nodes_per_ply"]}\n'
+                f'{summary["cutoffs"]} cutoffs, {summary["first_move_cutoff_rate"]:.1%} by the first move; '
+                f'{summary["table_probes"]} table probes, {summary["table_hit_rate"]:.1%} hits\n'
+                f'estimated seconds in {seconds}; effective branching factor {summary["branching_factor"]:.2f}\n'
+                f'{len(move_seconds)} moves, {max(move_seconds, default=0.0):.3f} seconds at most, '
+                f'{sum(move_seconds) / max(len(move_seconds), 1):.3f} on average')
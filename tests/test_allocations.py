@@ -0,0 +1,37 @@
+import pytest
+from board import Board, BitBoard
+from heuristics import Heuristic, SimpleHeuristic, WindowHeuristic
+from search import Search
+from transposition import TranspositionTable
+
+
+@pytest.mark.parametrize('board_class', [Board, BitBoard])
+@pytest.mark.parametrize('heuristic_class', [SimpleHeuristic, WindowHeuristic])
+@pytest.mark.parametrize('threat_pruning', [False, True])
+def test_search_allocates_no_boards(board_class: type, heuristic_class: type, threat_pruning: bool) -> None:
+    """A fixed depth search plays and takes back moves on one board, without allocating board arrays per node
+    """
+    board: Board = board_class(7, 6)
+    for col in (3, 3, 2):
+        board.play(col, 1 + len(board.moves) % 2)
+    search: Search = Search(2, 4, heuristic_class(4), True, TranspositionTable(1 << 16), threat_pruning=threat_pruning)
+    search.search(board, 1) # compiles the kernels
+
+    allocations: int = Board.allocation_count
+    search.search(board, 5)
+    assert search.node_count > 100
+    assert Board.allocation_count == allocations
+
+
+@pytest.mark.parametrize('board_class', [Board, BitBoard])
+def test_best_action_allocates_no_boards(board_class: type) -> None:
+    """The candidate moves are evaluated on the board itself
+    """
+    board: Board = board_class(7, 6)
+    board.play(3, 1)
+    heuristic: Heuristic = SimpleHeuristic(4)
+    heuristic.get_best_action(2, board)
+
+    allocations: int = Board.allocation_count
+    heuristic.get_best_action(2, board)
+    assert Board.allocation_count == allocations
@@ -0,0 +1,24 @@
+import numpy as np
+from dataset import PositionDataset, export
+from records import GameWriter
+
+
+def test_export_large_board(tmp_path) -> None:
+    """Positions of a board with more than 255 fields keep their ply and their pieces
+    """
+    records: str = str(tmp_path / 'games.bin')
+    path: str = str(tmp_path / 'positions.bin')
+    width, height = 20, 15
+    moves = [col for col in range(width) for _ in range(height)] # fills the board column by column
+    writer: GameWriter = GameWriter(records)
+    writer.write_game(width, height, 15, ['a', 'b'], moves, -1)
+    writer.close()
+
+    assert export([records], path, width, height, 15) == width * height
+    dataset: PositionDataset = PositionDataset(path)
+    assert dataset.positions['ply'].tolist() == list(range(width * height))
+
+    last: np.ndarray = dataset.positions[-1:]
+    state: np.ndarray = dataset.to_states(last)[0]
+    assert np.count_nonzero(state) == width * height - 1
+    assert last['to_move'][0] == 2
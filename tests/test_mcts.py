@@ -0,0 +1,15 @@
+import numpy as np
+from mcts import _playouts, _seed
+
+
+def test_seeded_playouts_repeat() -> None:
+    """A seed gives the same games
+    """
+    state: np.ndarray = np.zeros((7, 6), dtype=np.int64)
+    state[3, 5] = 1
+    for light in (False, True):
+        _seed(1)
+        winners: np.ndarray = _playouts(state, 2, 4, 64, light)
+        _seed(1)
+        assert (_playouts(state, 2, 4, 64, light) == winners).all()
+        assert ((winners == -1) | (winners == 1) | (winners == 2)).all()
@@ -0,0 +1,28 @@
+import pytest
+from board import BitBoard
+from heuristics import SimpleHeuristic
+from parallel import LazySMPSearch
+from search import Search
+from transposition import ConcurrentTranspositionTable, TranspositionTable
+
+
+@pytest.mark.parametrize('moves', [(), (3, 3), (3, 2, 4, 4, 2)])
+def test_lazy_smp_matches_serial(moves: tuple) -> None:
+    """With the helpers searching alongside, Lazy SMP gives the move and score of the serial search at a fixed depth
+    """
+    board: BitBoard = BitBoard(7, 6)
+    for i, col in enumerate(moves):
+        board.play(col, 1 + i % 2)
+    player_id: int = 1 + len(moves) % 2
+
+    serial: Search = Search(player_id, 4, SimpleHeuristic(4), True, TranspositionTable(1 << 16))
+    lazy_smp: LazySMPSearch = LazySMPSearch(player_id, 4, SimpleHeuristic(4), True, ConcurrentTranspositionTable(1 << 16), helpers=2)
+    try:
+        lazy_smp.search(board, 1) # starts the helpers, so they search with the next call
+        lazy_smp.transposition_table.clear()
+        lazy_smp.node_count = 0
+
+        assert lazy_smp.search(board, 6) == serial.search(board, 6)
+        assert lazy_smp.node_count > serial.node_count # the helpers' nodes are added
+    finally:
+        lazy_smp.close()
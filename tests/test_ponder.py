@@ -0,0 +1,65 @@
+from time import perf_counter
+from typing import Tuple
+import pytest
+from board import BitBoard
+from heuristics import SimpleHeuristic
+from players import AlphaBetaPlayer
+from transposition import TranspositionTable
+
+
+TIME_LIMIT: int = 200 # milliseconds per move
+SLACK: float = 1.0 # seconds a move may take beyond the time limit on a busy machine
+
+
+def start_pondering(player: AlphaBetaPlayer) -> Tuple[BitBoard, int]:
+    """Plays the first moves of a game and lets the player ponder on the reply it expects
+
+    Args:
+        player (AlphaBetaPlayer): a pondering player for player 2
+
+    Returns:
+        Tuple[BitBoard, int]: the board after the player's move and the expected reply
+    """
+    board: BitBoard = BitBoard(7, 6)
+    board.play(3, 1)
+    board.play(player.make_move(board), 2)
+    player.start_pondering(board)
+    expected: int = next(col for col in range(7) if board.is_valid(col) and board.get_new_board(col, 1).hash == player.ponder_hash)
+    return board, expected
+
+
+def test_ponder_hit() -> None:
+    """The search on the expected reply gives the move, within the time budget of the move
+    """
+    player: AlphaBetaPlayer = AlphaBetaPlayer(2, 4, 64, SimpleHeuristic(4), transposition_table=TranspositionTable(1 << 16), time_limit=TIME_LIMIT, ponder=True)
+    board, expected = start_pondering(player)
+    board.play(expected, 1)
+
+    start: float = perf_counter()
+    move: int = player.make_move(board)
+    assert perf_counter() - start < TIME_LIMIT / 1000 + SLACK
+    assert board.is_valid(move)
+    assert (player.ponder_hits, player.ponder_misses) == (1, 0)
+    player.close()
+
+
+def test_ponder_miss() -> None:
+    """Another reply cancels the pondering search and the move is searched anew
+    """
+    player: AlphaBetaPlayer = AlphaBetaPlayer(2, 4, 64, SimpleHeuristic(4), transposition_table=TranspositionTable(1 << 16), time_limit=TIME_LIMIT, ponder=True)
+    board, expected = start_pondering(player)
+    board.play(next(col for col in range(7) if col != expected and board.is_valid(col)), 1)
+
+    start: float = perf_counter()
+    move: int = player.make_move(board)
+    assert perf_counter() - start < TIME_LIMIT / 1000 + SLACK
+    assert board.is_valid(move)
+    assert (player.ponder_hits, player.ponder_misses) == (0, 1)
+    player.close()
+
+
+def test_ponder_needs_time_limit() -> None:
+    """Without a time limit a search on the expected reply could never be ended
+    """
+    with pytest.raises(AssertionError):
+        AlphaBetaPlayer(2, 4, 64, SimpleHeuristic(4), ponder=True)
@@ -0,0 +1,101 @@
+import os
+from typing import List
+from records import GameReader, GameRecord, GameWriter, GAME_HEADER, GAME_TAG, PLAYER_HEADER, PLAYER_TAG
+
+
+def read_games(path: str) -> List[GameRecord]:
+    """
+    Args:
+        path (str): path of the record file
+
+    Returns:
+        List[GameRecord]: the games of the file
+    """
+    reader: GameReader = GameReader(path)
+    games: List[GameRecord] = list(reader)
+    reader.close()
+    return games
+
+
+def test_round_trip(tmp_path) -> None:
+    """Games are read back as they were written, with statistics only if asked for
+    """
+    path: str = str(tmp_path / 'games.bin')
+    writer: GameWriter = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'b'], [3, 3, 2, 4, 1], 1)
+    writer.close()
+    writer = GameWriter(path, stats=True)
+    writer.write_game(20, 6, 4, ['b', 'c'], [19, 0, 17], -1, 2, [(10, 1, 2, -3)] * 3)
+    writer.close()
+
+    first, second = read_games(path)
+    assert (first.players, first.moves.tolist(), first.result, first.stats) == (('a', 'b'), [3, 3, 2, 4, 1], 1, None)
+    assert (second.players, second.moves.tolist(), second.first_player) == (('b', 'c'), [19, 0, 17], 2)
+    assert second.stats['score'].tolist() == [-3] * 3
+
+
+def test_cut_off_tail(tmp_path) -> None:
+    """A record cut off while it was written is skipped by readers and dropped by the next writer
+    """
+    path: str = str(tmp_path / 'games.bin')
+    writer: GameWriter = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'b'], [3, 3, 2], 0)
+    writer.write_game(7, 6, 4, ['a', 'b'], [1, 2, 3, 4], 0)
+    writer.close()
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 1)
+    assert len(read_games(path)) == 1
+
+    writer = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'b'], [5], 0)
+    writer.close()
+    assert [game.moves.tolist() for game in read_games(path)] == [[3, 3, 2], [5]]
+
+
+def test_cut_off_player_name(tmp_path) -> None:
+    """A player record whose description is cut off is skipped like a cut off game
+    """
+    path: str = str(tmp_path / 'games.bin')
+    writer: GameWriter = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'b'], [3], 0)
+    writer.close()
+    with open(path, 'ab') as file:
+        file.write(PLAYER_HEADER.pack(PLAYER_TAG, 10) + b'abc')
+
+    reader: GameReader = GameReader(path)
+    assert len(list(reader)) == 1
+    assert reader.players == ['a', 'b']
+    reader.close()
+
+    writer = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'c'], [4], 0)
+    writer.close()
+    assert [game.players for game in read_games(path)] == [('a', 'b'), ('a', 'c')]
+
+
+def test_ends_on_player_record(tmp_path) -> None:
+    """A player record at the end of the file is kept by the next writer, and games can refer to it
+    """
+    path: str = str(tmp_path / 'games.bin')
+    writer: GameWriter = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'b'], [3], 0)
+    writer.close()
+    with open(path, 'ab') as file:
+        file.write(PLAYER_HEADER.pack(PLAYER_TAG, 1) + b'c')
+
+    writer = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'c'], [4], 0)
+    writer.close()
+    assert [game.players for game in read_games(path)] == [('a', 'b'), ('a', 'c')]
+
+
+def test_unknown_player(tmp_path) -> None:
+    """A game referring to a player that was never recorded ends the file for readers
+    """
+    path: str = str(tmp_path / 'games.bin')
+    writer: GameWriter = GameWriter(path)
+    writer.write_game(7, 6, 4, ['a', 'b'], [3], 0)
+    writer.close()
+    with open(path, 'ab') as file:
+        file.write(GAME_HEADER.pack(GAME_TAG, 7, 6, 4, 0, 0, 0, 5, 1) + b'\x04')
+    assert len(read_games(path)) == 1
@@ -0,0 +1,140 @@
+import random
+from typing import Any, Dict, List, Optional
+import pytest
+from board import Board, BitBoard, state_bitboards
+from heuristics import SimpleHeuristic
+from search import Search, SearchTimeout, threat_moves
+from transposition import TranspositionTable
+
+
+def random_board(board_class: type, moves: int, generator: random.Random) -> Optional[Board]:
+    """
+    Args:
+        board_class (type): Board or BitBoard
+        moves (int): number of random moves to play
+        generator (random.Random): source of the random moves
+
+    Returns:
+        Optional[Board]: a 7x6 board after a number of random moves, None if the game ended before
+    """
+    board: Board = board_class(7, 6)
+    for _ in range(moves):
+        board.play(generator.choice([col for col in range(7) if board.is_valid(col)]), 1 + len(board.moves) % 2)
+        if board.get_winner(4) != 0:
+            return None
+    return board
+
+
+def snapshot(board: Board) -> Dict[str, Any]:
+    """
+    Args:
+        board (Board): a board
+
+    Returns:
+        Dict[str, Any]: a copy of every attribute of the board, to compare the board with later
+    """
+    return {name: value.tobytes() if hasattr(value, 'tobytes') else tuple(value) if isinstance(value, list) else value
+            for name, value in vars(board).items()}
+
+
+@pytest.mark.parametrize('board_class', [Board, BitBoard])
+def test_alpha_beta_matches_minimax(board_class: type) -> None:
+    """Pruning doesn't change the best move or its score
+    """
+    generator: random.Random = random.Random(0)
+    tested: int = 0
+    while tested < 10:
+        board: Optional[Board] = random_board(board_class, generator.randrange(2, 16), generator)
+        if board is None:
+            continue
+        player_id: int = 1 + len(board.moves) % 2
+        minimax: Search = Search(player_id, 4, SimpleHeuristic(4), False)
+        alpha_beta: Search = Search(player_id, 4, SimpleHeuristic(4), True)
+        assert alpha_beta.search(board, 4) == minimax.search(board, 4)
+        assert alpha_beta.node_count < minimax.node_count
+        tested += 1
+
+
+@pytest.mark.parametrize('alpha_beta', [False, True])
+def test_table_matches_no_table(alpha_beta: bool) -> None:
+    """A fixed depth search with a transposition table finds the same move and score as without one
+    """
+    generator: random.Random = random.Random(1)
+    tested: int = 0
+    while tested < 10:
+        board: Optional[Board] = random_board(BitBoard, generator.randrange(2, 16), generator)
+        if board is None:
+            continue
+        player_id: int = 1 + len(board.moves) % 2
+        plain: Search = Search(player_id, 4, SimpleHeuristic(4), alpha_beta)
+        tabled: Search = Search(player_id, 4, SimpleHeuristic(4), alpha_beta, TranspositionTable(1 << 16))
+        assert tabled.search(board, 5) == plain.search(board, 5)
+        assert tabled.node_count < plain.node_count
+        tested += 1
+
+
+@pytest.mark.parametrize('board_class', [Board, BitBoard])
+def test_mirror_has_same_key(board_class: type) -> None:
+    """A position and its mirror image share a transposition table entry
+    """
+    generator: random.Random = random.Random(2)
+    search: Search = Search(1, 4, SimpleHeuristic(4))
+    for _ in range(20):
+        board: Board = board_class(7, 6)
+        for _ in range(generator.randrange(1, 12)):
+            board.play(generator.choice([col for col in range(7) if board.is_valid(col)]), 1 + len(board.moves) % 2)
+        mirror: Board = board_class(7, 6)
+        for i, col in enumerate(board.moves):
+            mirror.play(6 - col, 1 + i % 2)
+
+        key, mirrored = search.get_table_key(board)
+        mirror_key, mirror_mirrored = search.get_table_key(mirror)
+        assert key == mirror_key
+        assert mirrored != mirror_mirrored or board.is_symmetric()
+
+
+@pytest.mark.parametrize('board_class', [Board, BitBoard])
+def test_timeout_restores_board(board_class: type) -> None:
+    """An aborted search leaves the board exactly as it was, wherever the search was when the deadline passed
+    """
+    generator: random.Random = random.Random(3)
+    tested: int = 0
+    while tested < 10:
+        board: Optional[Board] = random_board(board_class, generator.randrange(2, 10), generator)
+        if board is None:
+            continue
+        before: Dict[str, Any] = snapshot(board)
+        search: Search = Search(1 + len(board.moves) % 2, 4, SimpleHeuristic(4), True, TranspositionTable(1 << 16))
+        search.search(board, 6)
+        if search.node_count < 1024: # a forced win is found before the first check
+            continue
+        search.transposition_table.clear()
+        search.node_count = generator.randrange(1024) # aborts after a random number of nodes
+        search.deadline = 1e-9 # in the past, but set
+        with pytest.raises(SearchTimeout):
+            search.search(board, 6)
+        assert snapshot(board) == before
+        tested += 1
+
+
+@pytest.mark.parametrize('game_n', [3, 4])
+def test_threat_moves_on_board(game_n: int) -> None:
+    """A plain Board is pruned the same as a BitBoard, from bitboards made of its state
+    """
+    generator: random.Random = random.Random(4)
+    for _ in range(50):
+        bitboard: BitBoard = BitBoard(7, 6)
+        board: Board = Board(7, 6)
+        for _ in range(generator.randrange(0, 20)):
+            col: int = generator.choice([col for col in range(7) if bitboard.is_valid(col)])
+            bitboard.play(col, 1 + len(bitboard.moves) % 2)
+            board.play(col, 1 + len(board.moves) % 2)
+            if bitboard.get_winner(game_n) != 0:
+                bitboard.undo()
+                board.undo()
+                break
+
+        assert state_bitboards(board.get_state_view()) == (bitboard.bitboards, bitboard.heights)
+        moves: List[int] = [col for col in range(7) if board.is_valid(col)]
+        for player_id in (1, 2):
+            assert threat_moves(board, player_id, game_n, moves) == threat_moves(bitboard, player_id, game_n, moves)
@@ -0,0 +1,94 @@
+import random
+from typing import List, Optional, Tuple
+import pytest
+from board import BitBoard
+from solver import Solver
+
+
+def brute_force(board: BitBoard, player_id: int, game_n: int) -> int:
+    """Scores a position by searching every move to the end of the game, with the scores of the solver
+
+    Args:
+        board (BitBoard): the board, where nobody has won yet
+        player_id (int): the player to move
+        game_n (int): n in a row required to win
+
+    Returns:
+        int: 0 for a draw, the number of empty fields before the winning move for a win, negative for a loss
+    """
+    fields: int = board.width * board.height
+    best: Optional[int] = None
+    for col in range(board.width):
+        if not board.is_valid(col):
+            continue
+        empty: int = fields - len(board.moves)
+        board.play(col, player_id)
+        winner: int = board.get_winner(game_n)
+        if winner == player_id:
+            score: int = empty
+        elif winner < 0:
+            score = 0
+        else:
+            score = -brute_force(board, 3 - player_id, game_n)
+        board.undo()
+        best = score if best is None else max(best, score)
+    return best
+
+
+def random_position(width: int, height: int, game_n: int, empty: int, generator: random.Random) -> Optional[Tuple[BitBoard, int]]:
+    """
+    Args:
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        empty (int): number of empty fields to leave
+        generator (random.Random): source of the random moves
+
+    Returns:
+        Optional[Tuple[BitBoard, int]]: a board with a number of empty fields after random moves, and the player to move;
+            None if the game ended before
+    """
+    board: BitBoard = BitBoard(width, height)
+    while width * height - len(board.moves) > empty:
+        moves: List[int] = [col for col in range(width) if board.is_valid(col)]
+        board.play(generator.choice(moves), 1 + len(board.moves) % 2)
+        if board.get_winner(game_n) != 0:
+            return None
+    return board, 1 + len(board.moves) % 2
+
+
+def test_draw_on_full_board() -> None:
+    """A position that can only end in a draw on a full board is not scored as a loss
+    """
+    board: BitBoard = BitBoard(4, 4)
+    for col in (3, 1, 1, 0, 0, 1, 1):
+        board.play(col, 1 + len(board.moves) % 2)
+    assert Solver(4).solve_board(board, 2)[1] == brute_force(board, 2, 4) == 0
+
+
+@pytest.mark.parametrize('width, height, game_n, empty', [(4, 4, 4, 9), (4, 4, 3, 9), (5, 4, 4, 9), (3, 3, 3, 7), (4, 3, 3, 8)])
+def test_solver_matches_brute_force(width: int, height: int, game_n: int, empty: int) -> None:
+    """Solves random positions on small boards and checks the scores and moves against searching every move
+    """
+    generator: random.Random = random.Random(width * 100 + height * 10 + game_n)
+    solver: Solver = Solver(game_n)
+    checked: int = 0
+    while checked < 40:
+        position: Optional[Tuple[BitBoard, int]] = random_position(width, height, game_n, empty, generator)
+        if position is None:
+            continue
+        board, player_id = position
+        move, score = solver.solve_board(board, player_id)
+        assert score == brute_force(board, player_id, game_n)
+
+        # The move played gets the score: it wins that fast, or else loses that slowly
+        empty_before: int = width * height - len(board.moves)
+        board.play(move, player_id)
+        winner: int = board.get_winner(game_n)
+        if winner == player_id:
+            assert score == empty_before
+        elif winner < 0:
+            assert score == 0
+        else:
+            assert -brute_force(board, 3 - player_id, game_n) == score
+        checked += 1
@@ -0,0 +1,95 @@
+import random
+from typing import Iterator, List
+from board import BitBoard
+from heuristics import SimpleHeuristic
+from players import TreePlayer
+from treeStructure import ArenaTree, Node, TreeStructure
+
+
+def test_reroot_matches_new_tree() -> None:
+    """A tree rerooted after two moves and grown to the same depth has the values of a tree built at the new root
+    """
+    generator: random.Random = random.Random(0)
+    for _ in range(20):
+        board: BitBoard = BitBoard(5, 4)
+        for ply in range(generator.randrange(4, 10)):
+            board.play(generator.choice([col for col in range(5) if board.is_valid(col)]), 1 + ply % 2)
+        if board.get_winner(3) != 0:
+            continue
+        player_id: int = 1 + len(board.moves) % 2
+
+        tree: ArenaTree = ArenaTree(player_id, board, SimpleHeuristic(3), 3)
+        tree.build(4)
+        tree.backup()
+        moves: List[int] = tree.get_principal_variation()[:2]
+        if len(moves) < 2:
+            continue
+        tree.reroot(moves)
+        tree.build(4)
+
+        for col in moves:
+            board.play(col, 1 + len(board.moves) % 2)
+        if board.get_winner(3) != 0: # a new tree doesn't score a root that ends the game
+            continue
+        new_tree: ArenaTree = ArenaTree(player_id, board, SimpleHeuristic(3), 3)
+        new_tree.build(4)
+
+        assert tree.backup() == new_tree.backup()
+        assert [tree.value[child] for child in tree.get_children(0)] == [new_tree.value[child] for child in new_tree.get_children(0)]
+
+
+def test_tree_player_reuses_tree() -> None:
+    """A player keeping its tree plays the moves of a player building a new tree every move, and reuses nodes
+    """
+    board: BitBoard = BitBoard(5, 4)
+    players: List[TreePlayer] = [TreePlayer(1, 3, 3, SimpleHeuristic(3)), TreePlayer(2, 3, 3, SimpleHeuristic(3))]
+    while board.get_winner(3) == 0:
+        player: TreePlayer = players[len(board.moves) % 2]
+        move: int = player.make_move(board)
+
+        new_tree: ArenaTree = ArenaTree(player.player_id, board, SimpleHeuristic(3), 3)
+        new_tree.build(3)
+        assert new_tree.backup() == player.last_score
+        assert new_tree.get_principal_variation()[0] == move
+        board.play(move, player.player_id)
+
+    assert all(stats['reused'] > 0 for player in players for stats in player.move_stats[1:])
+
+
+def test_tree_player_without_reuse() -> None:
+    """A player building a pruned tree every move finds a valid move and scores it like a full tree
+    """
+    board: BitBoard = BitBoard(5, 4)
+    board.play(2, 1)
+    player: TreePlayer = TreePlayer(2, 3, 3, SimpleHeuristic(3), reuse_tree=False)
+    move: int = player.make_move(board)
+
+    tree: ArenaTree = ArenaTree(2, board, SimpleHeuristic(3), 3)
+    tree.build(3)
+    assert board.is_valid(move)
+    assert tree.backup() == player.last_score # no win is in reach, which the trees would score differently
+
+
+def test_tree_structure_counts_pruned_moves() -> None:
+    """Moves cut off by alpha-beta pruning are generated but never become nodes
+    """
+    board: BitBoard = BitBoard(7, 6)
+    tree: TreeStructure = TreeStructure(1, board, SimpleHeuristic(4), 4)
+    tree.create_tree(tree.root_node, 4)
+
+    assert tree.nodes_visited == sum(1 for _ in iter_nodes(tree.root_node))
+    assert tree.nodes_generated > tree.nodes_visited
+    assert tree.nodes_visited < 1 + 7 + 7 ** 2 + 7 ** 3 + 7 ** 4 # a full tree
+
+
+def iter_nodes(node: Node) -> Iterator[Node]:
+    """
+    Args:
+        node (Node): the root of a subtree
+
+    Yields:
+        Node: the nodes of the subtree, the root first
+    """
+    yield node
+    for child in node.children:
+        yield from iter_nodes(child)
@@ -0,0 +1,29 @@
+import random
+from typing import List
+import pytest
+from app import winning
+from board import Board, BitBoard
+
+
+@pytest.mark.parametrize('width, height, game_n', [(7, 6, 4), (4, 4, 4), (5, 4, 3), (9, 7, 5), (3, 3, 2), (10, 9, 4)])
+def test_winner_matches_full_check(width: int, height: int, game_n: int) -> None:
+    """Plays seeded random games and compares the winner after every move
+    with the full board check of app.winning
+    """
+    generator: random.Random = random.Random(width * 100 + height * 10 + game_n)
+    for _ in range(50):
+        board: Board = Board(width, height)
+        bitboard: BitBoard = BitBoard(width, height)
+        player_id: int = 1
+        winner: int = 0
+
+        while winner == 0:
+            moves: List[int] = [col for col in range(width) if board.is_valid(col)]
+            col: int = generator.choice(moves)
+            board.play(col, player_id)
+            bitboard.play(col, player_id)
+
+            winner = winning(board.board_state, game_n)
+            assert board.get_winner(game_n) == winner
+            assert bitboard.get_winner(game_n) == winner
+            player_id = 3 - player_id
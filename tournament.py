@@ -0,0 +1,291 @@
+"""Headless tournament between computer players
+
+Plays every pair of a roster against each other (round robin), or the first
+player against all others (gauntlet), over a pool of worker processes. Every
+opening is played twice with the colors swapped, and no opening is repeated
+within a pairing. Games are appended to a JSON lines file as they finish, and
+the win/draw/loss table and Elo ratings are printed at the end, e.g.
+
+    python tournament.py --roster roster.json --mode round-robin --rounds 10 --workers 4 --output games.jsonl
+
+The roster is a JSON list of players, each with a name, a player type, and the
+keyword arguments of that player, e.g.
+
+    [{"name": "ab4", "player": "alphabeta", "heuristic": "simple", "depth": 4, "table_size": 262144},
+     {"name": "mcts", "player": "mcts", "time_limit": 200}]
+"""
+import argparse
+import json
+import random
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+import numpy as np
+from benchmark import HEURISTICS, PLAYERS, parse_size, play_game, random_opening
+from heuristics import Heuristic
+from players import PlayerController, MCTSPlayer
+from transposition import TranspositionTable
+
+
+# Roster used when none is given
+DEFAULT_ROSTER: List[Dict[str, Any]] = [
+    {'name': 'alphabeta-2', 'player': 'alphabeta', 'heuristic': 'simple', 'depth': 2},
+    {'name': 'alphabeta-4', 'player': 'alphabeta', 'heuristic': 'simple', 'depth': 4, 'table_size': 1 << 16},
+    {'name': 'alphabeta-4-window', 'player': 'alphabeta', 'heuristic': 'window', 'depth': 4, 'table_size': 1 << 16},
+    {'name': 'mcts-2000', 'player': 'mcts', 'iterations': 2000, 'time_limit': None},
+]
+
+# Results of a game, for the first player
+RESULTS: Dict[int, str] = {1: '1-0', 2: '0-1', -1: '1/2-1/2'}
+
+
+def make_player(config: Dict[str, Any], player_id: int, game_n: int) -> PlayerController:
+    """Creates a computer player from its roster entry
+
+    Args:
+        config (Dict[str, Any]): the roster entry; 'player' is 'mcts' or one of the search players of the benchmark,
+            'heuristic' and 'table_size' set up those of a search player, all other keys except 'name' are passed on
+        player_id (int): id of the player, 1 or 2
+        game_n (int): n in a row required to win
+
+    Returns:
+        PlayerController: the player
+    """
+    options: Dict[str, Any] = {key: value for key, value in config.items() if key not in ('name', 'player', 'heuristic', 'table_size')}
+    if config['player'] == 'mcts':
+        return MCTSPlayer(player_id, game_n, **options)
+
+    heuristic: Heuristic = HEURISTICS[config.get('heuristic', 'simple')](game_n)
+    table_size: int = config.get('table_size', 0)
+    table: Optional[TranspositionTable] = TranspositionTable(table_size) if table_size > 0 else None
+    depth: int = options.pop('depth', 4)
+    return PLAYERS[config['player']](player_id, game_n, depth, heuristic, transposition_table=table, **options)
+
+
+def play_match(game: int, configs: Tuple[Dict[str, Any], Dict[str, Any]], opening: List[int], width: int, height: int,
+               game_n: int) -> Dict[str, Any]:
+    """Plays one game in a worker process
+
+    Args:
+        game (int): number of the game in the schedule
+        configs (Tuple[Dict[str, Any], Dict[str, Any]]): roster entries of the first and the second player
+        opening (List[int]): moves played before the players take over
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+
+    Returns:
+        Dict[str, Any]: the record of the game, as written to the results file
+    """
+    start: float = perf_counter()
+    players: List[PlayerController] = [make_player(configs[0], 1, game_n), make_player(configs[1], 2, game_n)]
+    try:
+        winner, moves = play_game(width, height, game_n, players, opening)
+    finally:
+        for player in players:
+            player.close()
+
+    return {
+        'game': game,
+        'first': configs[0]['name'],
+        'second': configs[1]['name'],
+        'opening': opening,
+        'result': RESULTS[winner],
+        'moves': len(opening) + len(moves),
+        'seconds': perf_counter() - start,
+        'nodes': [int(sum(move['nodes'] for move in moves[(index - len(opening)) % 2::2])) for index in range(2)], # of the first and second player
+    }
+
+
+def schedule(roster: List[Dict[str, Any]], mode: str, rounds: int, plies: int, width: int, height: int,
+             generator: random.Random) -> Iterator[Tuple[int, int, List[int]]]:
+    """Generates the games of a tournament, pairing by pairing
+
+    Args:
+        roster (List[Dict[str, Any]]): the players
+        mode (str): 'round-robin' to pair everyone, 'gauntlet' to pair the first player with everyone else
+        rounds (int): number of openings per pairing, each played twice with the colors swapped
+        plies (int): number of random moves of every opening
+        width (int): width of the board
+        height (int): height of the board
+        generator (random.Random): source of randomness for the openings
+
+    Yields:
+        Tuple[int, int, List[int]]: roster indices of the first and the second player, and the opening
+    """
+    pairings: List[Tuple[int, int]] = [(i, j) for i in range(len(roster)) for j in range(i + 1, len(roster)) if mode == 'round-robin' or i == 0]
+    for i, j in pairings:
+        used: Set[Tuple[int, ...]] = set()
+        for _ in range(rounds):
+            opening: List[int] = random_opening(width, height, plies, generator)
+            for _ in range(100): # small boards or few plies may not have enough different openings
+                if tuple(opening) not in used:
+                    break
+                opening = random_opening(width, height, plies, generator)
+            used.add(tuple(opening))
+            yield i, j, opening
+            yield j, i, opening
+
+
+def compute_elo(scores: np.ndarray, games: np.ndarray, iterations: int = 10000) -> np.ndarray:
+    """Fits Elo ratings to the results with the Bradley-Terry model
+    Every pair that played also gets one virtual draw, which keeps the ratings
+    of players that won or lost every game finite
+
+    Args:
+        scores (np.ndarray): points of player i against player j, a draw counting half
+        games (np.ndarray): number of games between player i and player j
+        iterations (int): max number of iterations of the fit
+
+    Returns:
+        np.ndarray: the rating of every player, averaging 1500; players without games get 1500
+    """
+    played: np.ndarray = games.sum(axis=1) > 0
+    scores = scores[played][:, played] + 0.5 * (games[played][:, played] > 0)
+    games = games[played][:, played] + (games[played][:, played] > 0)
+
+    strength: np.ndarray = np.ones(len(scores))
+    for _ in range(iterations):
+        updated: np.ndarray = scores.sum(axis=1) / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        updated /= np.exp(np.log(updated).mean())
+        converged: bool = bool(np.allclose(updated, strength, rtol=1e-10))
+        strength = updated
+        if converged:
+            break
+
+    ratings: np.ndarray = np.full(len(played), 1500.0)
+    ratings[played] = 1500 + 400 * np.log10(strength)
+    return ratings
+
+
+def run(roster: List[Dict[str, Any]], mode: str, rounds: int, width: int, height: int, game_n: int, plies: int, workers: int,
+        output: str, seed: int = 0) -> Dict[str, Any]:
+    """Plays a tournament, appending every game to a file as soon as it finishes
+
+    Only the win/draw/loss counts are kept in memory, however many games are played.
+
+    Args:
+        roster (List[Dict[str, Any]]): the players, with unique names
+        mode (str): 'round-robin' or 'gauntlet'
+        rounds (int): number of openings per pairing, each played twice with the colors swapped
+        width (int): width of the board
+        height (int): height of the board
+        game_n (int): n in a row required to win
+        plies (int): number of random moves of every opening, at most 2 * game_n - 2 so nobody can have won
+        workers (int): number of worker processes
+        output (str): path of the JSON lines file the games are appended to
+        seed (int): seed of the openings
+
+    Returns:
+        Dict[str, Any]: per player the wins, draws, losses, score and Elo rating, and the win/draw/loss table
+    """
+    names: List[str] = [config['name'] for config in roster]
+    assert len(set(names)) == len(names), 'The players need unique names'
+    assert plies <= 2 * game_n - 2, 'The openings may not win the game'
+
+    index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+    wins: np.ndarray = np.zeros((len(roster), len(roster)), dtype=int) # wins of player i against player j
+    draws: np.ndarray = np.zeros((len(roster), len(roster)), dtype=int)
+    games: Iterator[Tuple[int, int, List[int]]] = schedule(roster, mode, rounds, plies, width, height, random.Random(seed))
+
+    def record(result: Dict[str, Any], file: TextIO) -> None:
+        file.write(json.dumps(result) + '\n')
+        file.flush()
+        first: int = index[result['first']]
+        second: int = index[result['second']]
+        if result['result'] == '1-0':
+            wins[first, second] += 1
+        elif result['result'] == '0-1':
+            wins[second, first] += 1
+        else:
+            draws[first, second] += 1
+            draws[second, first] += 1
+
+    with open(output, 'a') as file, ProcessPoolExecutor(workers) as pool:
+        pending: Set[Future] = set()
+        game: int = 0
+        for first, second, opening in games:
+            pending.add(pool.submit(play_match, game, (roster[first], roster[second]), opening, width, height, game_n))
+            game += 1
+            if len(pending) >= 2 * workers: # keeps the schedule from being submitted all at once
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future.result(), file)
+
+        for future in wait(pending).done:
+            record(future.result(), file)
+
+    played: np.ndarray = wins + wins.T + draws
+    ratings: np.ndarray = compute_elo(wins + 0.5 * draws, played)
+    return {
+        'players': {
+            name: {
+                'wins': int(wins[i].sum()),
+                'draws': int(draws[i].sum()),
+                'losses': int(wins[:, i].sum()),
+                'score': float((wins[i].sum() + 0.5 * draws[i].sum()) / played[i].sum()) if played[i].sum() > 0 else 0.0,
+                'elo': float(ratings[i]),
+            } for i, name in enumerate(names)
+        },
+        'table': {
+            name: {other: [int(wins[i, j]), int(draws[i, j]), int(wins[j, i])] for j, other in enumerate(names) if played[i, j] > 0}
+            for i, name in enumerate(names)
+        },
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    """Prints the standings and the win/draw/loss table of a tournament
+
+    Args:
+        summary (Dict[str, Any]): the summary returned by run
+    """
+    players: List[Tuple[str, Dict[str, Any]]] = sorted(summary['players'].items(), key=lambda item: -item[1]['elo'])
+    width: int = max(len(name) for name, _ in players)
+
+    print(f'{"player":<{width}}  {"elo":>6}  {"score":>6}  {"W":>5}  {"D":>5}  {"L":>5}')
+    for name, stats in players:
+        print(f'{name:<{width}}  {stats["elo"]:6.0f}  {stats["score"]:6.1%}  {stats["wins"]:5}  {stats["draws"]:5}  {stats["losses"]:5}')
+
+    print('\nWins-draws-losses of every player against the players in the columns')
+    print(' ' * width + ''.join(f'  {name:>{max(len(name), 11)}}' for name, _ in players))
+    for name, _ in players:
+        cells: List[str] = ['-'.join(map(str, summary['table'][name][other])) if other in summary['table'][name] else '' for other, _ in players]
+        print(f'{name:<{width}}' + ''.join(f'  {cell:>{max(len(other), 11)}}' for cell, (other, _) in zip(cells, players)))
+
+
+def main() -> None:
+    """Plays a tournament with the settings from the command line
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Headless tournament between computer players')
+    parser.add_argument('--roster', default=None, help='JSON file with the players, a small default roster if not given')
+    parser.add_argument('--mode', choices=['round-robin', 'gauntlet'], default='round-robin')
+    parser.add_argument('--rounds', type=int, default=2, help='openings per pairing, each played with both colors')
+    parser.add_argument('--size', default='7x6', help='board size as WIDTHxHEIGHT')
+    parser.add_argument('--game-n', type=int, default=4, help='n in a row required to win')
+    parser.add_argument('--random-plies', type=int, default=2, help='random moves at the start of every game')
+    parser.add_argument('--workers', type=int, default=2, help='number of worker processes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='games.jsonl', help='JSON lines file the games are appended to')
+    parser.add_argument('--summary', default=None, help='file to write the standings to as JSON')
+    args: argparse.Namespace = parser.parse_args()
+
+    roster: List[Dict[str, Any]] = DEFAULT_ROSTER
+    if args.roster is not None:
+        with open(args.roster) as file:
+            roster = json.load(file)
+
+    width, height = parse_size(args.size)
+    start: float = perf_counter()
+    summary: Dict[str, Any] = run(roster, args.mode, args.rounds, width, height, args.game_n, min(args.random_plies, 2 * args.game_n - 2),
+                                  args.workers, args.output, args.seed)
+    print_summary(summary)
+    print(f'\nPlayed in {perf_counter() - start:.1f} seconds, games written to {args.output}')
+
+    if args.summary is not None:
+        with open(args.summary, 'w') as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
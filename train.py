@@ -0,0 +1,131 @@
+"""Fits the weights of LinearHeuristic to the outcomes of recorded games
+
+The features of sampled positions of a dataset (see dataset.py) are computed in
+batches into one matrix, from the view of the player to move, and the weights
+are fitted to the outcomes of the games with ridge regularized least squares or
+logistic regression. The weights are stored per board size in a small JSON file
+that LinearHeuristic loads.
+
+    python dataset.py --self-play 1000 --depth 4 --output positions.bin
+    python train.py --dataset positions.bin --method logistic --weights linear_weights.json
+"""
+import argparse
+from typing import Tuple
+import numpy as np
+from dataset import PositionDataset
+from heuristics import LINEAR_WEIGHTS_PATH, LinearHeuristic, save_linear_weights
+
+
+def get_features(dataset: PositionDataset, records: np.ndarray, batch_size: int = 1 << 14) -> Tuple[np.ndarray, np.ndarray]:
+    """Computes the features and targets of positions
+    The board states are unpacked one batch at a time, as they take far more memory than the features
+
+    Args:
+        dataset (PositionDataset): the dataset the positions are from
+        records (np.ndarray): records of the positions
+        batch_size (int): number of positions unpacked at once
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the features, of shape (positions, features),
+            and the outcome of every position for the player to move, 1 for a win, 0 for a draw and -1 for a loss
+    """
+    heuristic: LinearHeuristic = LinearHeuristic(dataset.game_n, None)
+    batches: list = []
+    for start in range(0, len(records), batch_size):
+        batch: np.ndarray = records[start:start + batch_size]
+        batches.append(heuristic.get_features(batch['to_move'], dataset.to_states(batch)))
+
+    features: np.ndarray = np.concatenate(batches) if batches else np.zeros((0, 0))
+    return features, records['outcome'].astype(np.float64)
+
+
+def fit_least_squares(features: np.ndarray, targets: np.ndarray, l2: float = 1.0) -> np.ndarray:
+    """Fits weights whose weighted feature sums are closest to the targets, by solving the normal equations
+
+    Args:
+        features (np.ndarray): array of shape (positions, features)
+        targets (np.ndarray): the target of every position
+        l2 (float): strength of the regularization, keeping weights of rare features small
+
+    Returns:
+        np.ndarray: the weights
+    """
+    gram: np.ndarray = features.T @ features + l2 * np.eye(features.shape[1])
+    return np.linalg.solve(gram, features.T @ targets)
+
+
+def fit_logistic(features: np.ndarray, targets: np.ndarray, l2: float = 1.0, iterations: int = 20) -> np.ndarray:
+    """Fits weights whose weighted feature sums are the log odds of winning, with Newton's method
+    A draw counts as half a win, so the fitted sums stay symmetric for both players
+
+    Args:
+        features (np.ndarray): array of shape (positions, features)
+        targets (np.ndarray): the outcome of every position, 1 for a win, 0 for a draw and -1 for a loss
+        l2 (float): strength of the regularization, keeping weights of rare features small
+        iterations (int): maximum number of Newton steps
+
+    Returns:
+        np.ndarray: the weights
+    """
+    wins: np.ndarray = (targets + 1) / 2
+    weights: np.ndarray = np.zeros(features.shape[1])
+    for _ in range(iterations):
+        chances: np.ndarray = 1 / (1 + np.exp(-(features @ weights)))
+        gradient: np.ndarray = features.T @ (chances - wins) + l2 * weights
+        hessian: np.ndarray = (features * (chances * (1 - chances))[:, None]).T @ features + l2 * np.eye(features.shape[1])
+        step: np.ndarray = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-6:
+            break
+    return weights
+
+
+def get_accuracy(features: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> float:
+    """
+    Args:
+        features (np.ndarray): array of shape (positions, features)
+        targets (np.ndarray): the outcome of every position, 1 for a win, 0 for a draw and -1 for a loss
+        weights (np.ndarray): the weights
+
+    Returns:
+        float: fraction of the positions of won or lost games whose winner the sign of the weighted feature sum predicts
+    """
+    decided: np.ndarray = targets != 0
+    if not decided.any():
+        return 0.0
+    return float(np.mean(np.sign(features[decided] @ weights) == targets[decided]))
+
+
+def main() -> None:
+    """Fits and stores weights with the settings from the command line
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Fit the weights of LinearHeuristic to a position dataset')
+    parser.add_argument('--dataset', default='positions.bin')
+    parser.add_argument('--weights', default=LINEAR_WEIGHTS_PATH, help='weights file, weights of other board sizes are kept')
+    parser.add_argument('--method', choices=('least-squares', 'logistic'), default='logistic')
+    parser.add_argument('--positions', type=int, default=1 << 20, help='number of positions sampled from the dataset')
+    parser.add_argument('--validation', type=float, default=0.1, help='fraction of the sampled positions held out to measure the accuracy')
+    parser.add_argument('--l2', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+
+    dataset: PositionDataset = PositionDataset(args.dataset)
+    assert len(dataset) > 0, f'{args.dataset} holds no positions'
+    generator: np.random.Generator = np.random.default_rng(args.seed)
+    records: np.ndarray = dataset.sample(args.positions, generator)
+    features: np.ndarray
+    targets: np.ndarray
+    features, targets = get_features(dataset, records)
+
+    # Hold out whole games, positions of one game are too alike to measure with
+    held_out: np.ndarray = np.isin(records['game'], np.flatnonzero(generator.random(len(dataset.games)) < args.validation))
+    fit = fit_logistic if args.method == 'logistic' else fit_least_squares
+    weights: np.ndarray = fit(features[~held_out], targets[~held_out], args.l2)
+
+    save_linear_weights(args.weights, dataset.width, dataset.height, dataset.game_n, weights)
+    print(f'Fitted {len(weights)} weights to {np.count_nonzero(~held_out)} positions and stored them in {args.weights}')
+    print(f'Predicted the winner of {get_accuracy(features[held_out], targets[held_out], weights):.1%} of {np.count_nonzero(held_out)} held out positions')
+
+
+if __name__ == '__main__':
+    main()
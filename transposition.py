@@ -0,0 +1,198 @@
+import ctypes
+from array import array
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Dict, Optional, Tuple
+
+
+EXACT: int = 0 # the score is the exact value of the position
+LOWER: int = 1 # the score is a lower bound, the search failed high
+UPPER: int = 2 # the score is an upper bound, the search failed low
+
+_SCORE_OFFSET: int = 1 << 31 # scores are stored unsigned in the lowest 32 bits
+
+
+class TranspositionTable:
+    """Fixed size table of search results, indexed by Zobrist hash
+
+    Every bucket has two slots: the first keeps the entry searched to the
+    greatest depth, the second is always replaced. Keys and entries are packed
+    into two unsigned 64 bit arrays, so the memory used is fixed at 16 bytes
+    per entry no matter how many positions are stored. A key is stored xor'ed
+    with its entry, so a slot of which only one half was written reads as a miss.
+    Entries are kept between moves and tagged with the generation (move) they
+    were stored in; the first slot gives up an entry of an older generation even
+    to a shallower search, so entries of positions that can't occur anymore age out.
+    """
+    def __init__(self, size: int = 1 << 20) -> None:
+        """
+        Args:
+            size (int): max number of entries in the table
+        """
+        self.bucket_count: int = max(1, size // 2)
+        self.keys: Any # array or view of shared memory
+        self.entries: Any
+        self.clear()
+
+
+    def clear(self) -> None:
+        """Removes all entries and resets the statistics
+        """
+        self.keys, self.entries = self.allocate() # an entry of 0 marks an empty slot
+
+        self.generation: int = 0 # number of the current search, modulo 256
+        self.probes: int = 0
+        self.hits: int = 0
+        self.reused: int = 0 # hits on entries stored by an earlier search
+        self.collisions: int = 0 # probes that found other positions in the bucket
+        self.stores: int = 0
+        self.overwrites: int = 0 # stores that replaced another position
+
+
+    def allocate(self) -> Tuple[Any, Any]:
+        """
+        Returns:
+            Tuple[Any, Any]: the keys and entries, two zeroed unsigned 64 bit arrays with two slots per bucket
+        """
+        return array('Q', bytes(16 * self.bucket_count)), array('Q', bytes(16 * self.bucket_count))
+
+
+    def new_search(self) -> None:
+        """Starts a new generation, entries stored before it are replaced first
+        """
+        self.generation = (self.generation + 1) & 0xFF
+
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """Looks up a position
+
+        Args:
+            key (int): Zobrist hash of the position
+
+        Returns:
+            Optional[Tuple[int, int, int, int]]: depth, bound type, score and best move (-1 if unknown)
+                of the stored entry, None if the position is not in the table
+        """
+        self.probes += 1
+        index: int = 2 * (key % self.bucket_count)
+
+        for slot in (index, index + 1):
+            entry: int = self.entries[slot]
+            if entry == 0:
+                continue
+            if self.keys[slot] ^ entry == key:
+                self.hits += 1
+                if entry >> 50 != self.generation:
+                    self.reused += 1
+                return ((entry >> 32) & 0xFF) - 1, (entry >> 40) & 0x3, (entry & 0xFFFFFFFF) - _SCORE_OFFSET, ((entry >> 42) & 0xFF) - 1
+            self.collisions += 1
+
+        return None
+
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: int) -> None:
+        """Stores the result of a search
+
+        Args:
+            key (int): Zobrist hash of the position
+            depth (int): depth the position was searched to
+            flag (int): bound type of the score, EXACT, LOWER or UPPER
+            score (int): score of the position
+            move (int): best move in the position, -1 if unknown
+        """
+        self.stores += 1
+        index: int = 2 * (key % self.bucket_count)
+        entry: int = (score + _SCORE_OFFSET) | (min(depth + 1, 0xFF) << 32) | (flag << 40) | ((move + 1) << 42) | (self.generation << 50)
+
+        # The first slot keeps the deepest search of this generation, anything shallower goes in the second slot
+        stored: int = self.entries[index]
+        slot: int = index
+        if stored != 0 and self.keys[index] ^ stored != key and depth + 1 < (stored >> 32) & 0xFF and stored >> 50 == self.generation:
+            slot = index + 1
+
+        if self.entries[slot] != 0 and self.keys[slot] ^ self.entries[slot] != key:
+            self.overwrites += 1
+        self.keys[slot] = key ^ entry
+        self.entries[slot] = entry
+
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: number of probes, hits, hits on entries of earlier searches, misses, collisions,
+                stores, overwrites and used entries
+        """
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'reused': self.reused,
+            'misses': self.probes - self.hits,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'used': sum(1 for entry in self.entries if entry != 0),
+        }
+
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: max number of entries in the table
+        """
+        return 2 * self.bucket_count
+
+
+class ConcurrentTranspositionTable(TranspositionTable):
+    """Transposition table that can be shared by search processes
+    Inherits from TranspositionTable
+
+    The slots live in shared memory, which is handed to worker processes when
+    the table is passed to them as an argument at start-up. Processes read and
+    write without locks: a slot that another process wrote only half of reads
+    as a miss, as keys are stored xor'ed with their entry. The statistics are
+    counted by every process for itself.
+    """
+    def __init__(self, size: int = 1 << 20) -> None:
+        """
+        Args:
+            size (int): max number of entries in the table
+        """
+        self.shared_keys: Optional[ctypes.Array] = None
+        self.shared_entries: Optional[ctypes.Array] = None
+        super().__init__(size)
+
+
+    def allocate(self) -> Tuple[Any, Any]:
+        """Allocates the shared slots, or zeroes them if they exist, so processes that have them keep sharing them
+
+        Returns:
+            Tuple[Any, Any]: the keys and entries, views of the shared memory
+        """
+        if self.shared_keys is None:
+            self.shared_keys = RawArray(ctypes.c_uint64, 2 * self.bucket_count)
+            self.shared_entries = RawArray(ctypes.c_uint64, 2 * self.bucket_count)
+        else:
+            ctypes.memset(self.shared_keys, 0, ctypes.sizeof(self.shared_keys))
+            ctypes.memset(self.shared_entries, 0, ctypes.sizeof(self.shared_entries))
+        return memoryview(self.shared_keys).cast('B').cast('Q'), memoryview(self.shared_entries).cast('B').cast('Q')
+
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Leaves out the views, which can't be pickled; the shared memory itself can while starting processes
+
+        Returns:
+            Dict[str, Any]: the state to pickle
+        """
+        state: Dict[str, Any] = dict(self.__dict__)
+        del state['keys'], state['entries']
+        return state
+
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restores the views of the shared memory
+
+        Args:
+            state (Dict[str, Any]): the pickled state
+        """
+        self.__dict__.update(state)
+        self.keys = memoryview(self.shared_keys).cast('B').cast('Q')
+        self.entries = memoryview(self.shared_entries).cast('B').cast('Q')
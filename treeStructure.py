@@ -1,102 +1,433 @@
 from __future__ import annotations
+import sys
+from array import array
 import numpy as np
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from board import BitBoard
+from search import WIN_SCORE, WIN_THRESHOLD, MoveOrder, center_first, center_order, threat_moves
 
 if TYPE_CHECKING:
     from heuristics import Heuristic
     from board import Board
 
-#These classes are not in use, this whole tab is not in use atm
+
+def get_child_moves(board: Board, player_id: int, move_order: MoveOrder = center_order, game_n: int = 0) -> List[int]:
+    """
+    Args:
+        board (Board): the board to move on
+        player_id (int): the player to move
+        move_order (MoveOrder): policy ordering the moves
+        game_n (int): n in a row required to win, to prune the moves with threat_moves, 0 to keep every valid move
+
+    Returns:
+        List[int]: the valid columns in the order of the move ordering policy, pruned with threat_moves if game_n is given
+    """
+    moves: List[int] = [col for col in move_order(board) if board.is_valid(col)]
+    if game_n > 0:
+        moves = threat_moves(board, player_id, game_n, moves)
+    return moves
+
+
+def iter_children(board: Board, player_id: int, move_order: MoveOrder = center_order, game_n: int = 0,
+                  moves: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, Board]]:
+    """Generates the positions after every valid move, one at a time
+    A child board is only created when the generator gets to it, so a search
+    that stops early never allocates the remaining children
+
+    Args:
+        board (Board): the board to move on
+        player_id (int): the player to move
+        move_order (MoveOrder): policy ordering the moves
+        game_n (int): n in a row required to win, to prune the moves with threat_moves, 0 to generate every valid move
+        moves (Optional[Sequence[int]]): the moves from get_child_moves if they are known already, None to get them
+
+    Yields:
+        Tuple[int, Board]: the column and a *new* board with the move played
+    """
+    if moves is None:
+        moves = get_child_moves(board, player_id, move_order, game_n)
+    for col in moves:
+        yield col, board.get_new_board(col, player_id)
+
 
 class Node:
     """Class defining a node
     """
 
-    def __init__(self, player_id: int, board: Board, depth: int = 0) -> None:
+    def __init__(self, player_id: int, board: Board, depth: int = 0, move: int = -1) -> None:
         """
         Args:
             player_id (int): id of a player, can take values 1 or 2 (0 = empty)
             board: (fill in later)
+            depth (int): depth of the node in the tree
+            move (int): column played to reach the node, -1 for the root
         """
         self.player_id = player_id
         self.board = board
         self.depth = depth
+        self.move = move
 
-        self.children: List[Node] = []  # create an empty list for the children where each item is a Node object
-        self.parent: Optional[Node] = None #not sure about optional
-        self.value: Optional[float] = None #not sure about optional
+        self.children: List[Node] = []  # the children generated so far
+        self.parent: Optional[Node] = None
+        self.value: Optional[float] = None
 
 
     def add_child(self, child: Node):
-        self.parent: Node = None                      #the parents and the root are missing
+        child.parent = self
         self.children.append(child)             #add the child to the children list
-        #print("list", self.children)
+
+
+    def generate_children(self, move_order: MoveOrder = center_order, game_n: int = 0, moves: Optional[Sequence[int]] = None) -> Iterator[Node]:
+        """Generates the children of the node one at a time, adding each to the children list
+
+        Args:
+            move_order (MoveOrder): policy ordering the moves
+            game_n (int): n in a row required to win, to prune the moves with threat_moves, 0 to generate every valid move
+            moves (Optional[Sequence[int]]): the moves from get_child_moves if they are known already, None to get them
+
+        Yields:
+            Node: the next child
+        """
+        for col, board in iter_children(self.board, self.player_id, move_order, game_n, moves):
+            child: Node = Node(3 - self.player_id, board, self.depth + 1, col)
+            self.add_child(child)
+            yield child
+
 
 class TreeStructure:
     """Class defining the tree
+
+    Children are generated lazily while the tree is searched, so the subtrees
+    that alpha-beta pruning cuts off are never created.
     """
-    def __init__(self, player_id: int, board: Board, heuristic: Heuristic, depth: int = 0) -> None:
+    def __init__(self, player_id: int, board: Board, heuristic: Heuristic, depth: int = 0, move_order: MoveOrder = center_order,
+                 threat_pruning: bool = False) -> None:
         """
         Args:
             player_id (int): id of a player, can take values 1 or 2 (0 = empty)
             board: (fill in later)
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            depth (int): the max depth of the tree
+            move_order (MoveOrder): policy ordering the children of a node
+            threat_pruning (bool): whether to only generate the children threat_moves keeps
         """
         self.player_id = player_id
         self.board = board
         self.heuristic = heuristic
         self.depth = depth
+        self.move_order = move_order
+        self.threat_pruning: bool = threat_pruning
         self.root_node = Node(player_id, board, 0)
 
-        #print("depth:", self.depth)
-        #print("root_node:", self.root_node)
-        #print("player_id", self.player_id)
+        self.nodes_generated: int = 0 # moves generated, cutoffs keep some of them from becoming nodes
+        self.nodes_visited: int = 0 # nodes created and searched
 
 
-    def create_tree(self, node: Node, depth: int):
-        #print("the create_tree method is called")
+    def create_tree(self, node: Node, depth: int, alpha: float = -np.inf, beta: float = np.inf) -> Tuple[int, float]:
+        """Searches the tree below a node with alpha-beta pruning, generating children only when they are searched
 
-        max_value: float = -np.inf  # negative infinity
-        min_value: float = np.inf  # positive infinity
-        max_move: int = 0
-        min_move: int = 0
+        Args:
+            node (Node): the node to search
+            depth (int): the depth at which the tree ends
+            alpha (float): lower bound of the search window
+            beta (float): upper bound of the search window
 
-        current_player = node.player_id
+        Returns:
+            Tuple[int, float]: the best column in the node (-1 for a leaf) and the value of the node for the player of the tree
+        """
+        self.nodes_visited += 1
+        if node.depth == depth or node.board.get_winner(self.heuristic.game_n) != 0:
+            node.value = self.heuristic.evaluate_board(self.player_id, node.board)
+            return -1, node.value
 
-        if node.depth == depth:     #stop the recursion once the depth is reached
-            print("depth", depth, "is reached")
-        else:
-            for col in range(node.board.width):
-                if node.board.is_valid(col):
-                    new_board: Board = node.board.get_new_board(col, current_player)
+        maximizing: bool = node.player_id == self.player_id
+        best_move: int = -1
+        node.value = -np.inf if maximizing else np.inf
+
+        moves: List[int] = get_child_moves(node.board, node.player_id, self.move_order, self.heuristic.game_n if self.threat_pruning else 0)
+        self.nodes_generated += len(moves)
+        for child in node.generate_children(moves=moves):
+            _, value = self.create_tree(child, depth, alpha, beta)
+
+            if (value > node.value) if maximizing else (value < node.value):
+                node.value = value
+                best_move = child.move
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta: # the remaining moves never become nodes
+                break
+
+        return best_move, node.value
+
+
+class ArenaTree:
+    """Game tree stored as a struct of arrays instead of Node objects
+
+    Node i is described by entry i of every array: its parent, the move that
+    leads to it, its depth and value, its first child and its next sibling
+    (-1 for none), and the bitboards of both players after the move. The
+    children of a node are stored next to each other, always after their
+    parent, so values can be backed up in a single pass from the back.
+    After a move the tree can be rerooted at the position reached, keeping its
+    subtree and dropping the rest, and then be grown deeper.
+    A node takes about 40 bytes, where a Node object with its own Board takes
+    several hundred.
+    """
+    def __init__(self, player_id: int, board: Board, heuristic: Heuristic, game_n: int) -> None:
+        """
+        Args:
+            player_id (int): id of the player to move at the root, the values are from their perspective,
+                also after rerooting the tree
+            board (Board): the root board
+            heuristic (Heuristic): heuristic used to evaluate the leaves
+            game_n (int): n in a row required to win
+        """
+        self.player_id: int = player_id
+        self.heuristic: Heuristic = heuristic
+        self.game_n: int = game_n
+        self.board: BitBoard = BitBoard(board)
+        self.to_move: int = player_id # the player to move at the root
+
+        self.parent: array = array('i')
+        self.move: array = array('b') # column played to reach the node, -1 for the root
+        self.depth: array = array('B')
+        self.value: array = array('q')
+        self.first_child: array = array('i')
+        self.next_sibling: array = array('i')
+        self.winner: array = array('b') # 1 or 2 if the respective player won, -1 for a draw, 0 otherwise
+        # Bitboards of player 1 and 2, plain lists of integers for boards that don't fit in 64 bits
+        self.bitboards: List[Union[array, List[int]]] = [array('Q') if self.board.fits_64 else [] for _ in range(2)]
+
+        self.add_node(-1, -1, 0, self.board.get_winner(game_n) if self.board.moves else 0)
+
+
+    def add_node(self, parent: int, move: int, depth: int, winner: int) -> int:
+        """Adds a node for the position of the working board
+
+        Args:
+            parent (int): index of the parent node, -1 for the root
+            move (int): column played to reach the node
+            depth (int): depth of the node
+            winner (int): 1 or 2 if the respective player won, -1 for a draw, 0 otherwise
+
+        Returns:
+            int: index of the new node
+        """
+        self.parent.append(parent)
+        self.move.append(move)
+        self.depth.append(depth)
+        self.value.append(0)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.winner.append(winner)
+        self.bitboards[0].append(self.board.bitboards[0])
+        self.bitboards[1].append(self.board.bitboards[1])
+        return len(self.parent) - 1
+
+
+    def build(self, depth: int) -> None:
+        """Expands the tree from the root up to a depth and evaluates its new leaves
+        Nodes already in the tree are kept, so a rerooted tree only grows its frontier
+
+        Args:
+            depth (int): the max depth of the tree, at least 1
+        """
+        self.grow(0, self.to_move, depth)
 
-                    if current_player == 2: #one player plays then the other plays and so on
-                        next_player = 1
-                    else:
-                        next_player = 2
 
-                    child = Node(player_id=next_player, board=new_board, depth=node.depth+1)   #creating a child
-                    node.add_child(child)                                     #adding the child to the children list
+    def grow(self, node: int, player_id: int, depth: int) -> None:
+        """Expands the leaves below a node that are less deep than a depth, with the node's position on the working board
+
+        Args:
+            node (int): index of the node
+            player_id (int): the player to move in the node
+            depth (int): remaining depth below the node
+        """
+        if depth == 0 or self.winner[node] != 0:
+            return
+        if self.first_child[node] < 0:
+            self.expand(node, player_id, depth)
+            return
+
+        for child in self.get_children(node):
+            self.board.play(self.move[child], player_id)
+            self.grow(child, 3 - player_id, depth - 1)
+            self.board.undo()
+
+
+    def expand(self, node: int, player_id: int, depth: int) -> None:
+        """Adds the children of a node, and recursively theirs, with the node's position on the working board
+
+        Args:
+            node (int): index of the node
+            player_id (int): the player to move in the node
+            depth (int): remaining depth below the node
+        """
+        first: int = len(self.parent)
+        children: List[int] = []
+
+        for col in center_first(self.board.width):
+            if not self.board.play(col, player_id):
+                continue
+            winner: int = self.board.get_winner(self.game_n)
+            child: int = self.add_node(node, col, self.depth[node] + 1, winner)
+            if winner == self.player_id: # quicker wins score higher
+                self.value[child] = WIN_SCORE - self.depth[child]
+            elif winner > 0:
+                self.value[child] = -WIN_SCORE + self.depth[child]
+            elif winner == 0 and depth == 1:
+                self.value[child] = self.heuristic.evaluate_board(self.player_id, self.board)
+            self.board.undo()
+            children.append(child)
+
+        if not children:
+            return
+        self.first_child[node] = first
+        for child in children[:-1]:
+            self.next_sibling[child] = child + 1
+
+        if depth > 1:
+            for child in children:
+                if self.winner[child] == 0:
+                    self.board.play(self.move[child], player_id)
+                    self.expand(child, 3 - player_id, depth - 1)
+                    self.board.undo()
+
+
+    def get_children(self, node: int) -> List[int]:
+        """
+        Args:
+            node (int): index of a node
+
+        Returns:
+            List[int]: indices of the children of the node
+        """
+        children: List[int] = []
+        child: int = self.first_child[node]
+        while child >= 0:
+            children.append(child)
+            child = self.next_sibling[child]
+        return children
+
+
+    def backup(self) -> int:
+        """Backs up the minimax values from the leaves to the root
+        Children come after their parent, so going over the nodes from the back
+        sees every child before its parent
+
+        Returns:
+            int: value of the root
+        """
+        for node in range(len(self.parent) - 1, -1, -1):
+            if self.first_child[node] < 0:
+                continue
+            values: List[int] = [self.value[child] for child in self.get_children(node)]
+            # The player of the tree moves at even depths, or at odd depths after rerooting at the opponent's turn
+            self.value[node] = max(values) if (self.depth[node] % 2 == 0) == (self.to_move == self.player_id) else min(values)
+        return self.value[0]
 
 
-                    value: int = self.heuristic.evaluate_board(self.player_id, new_board)
+    def get_principal_variation(self) -> List[int]:
+        """Walks from the root along the children that have the value of their parent
 
-                    if self.player_id == 1:
-                        #print("human player")
-                        if value < min_value:
-                            min_move = value
-                            #print("min_move is:", min_move)
+        Returns:
+            List[int]: the moves of the principal variation
+        """
+        moves: List[int] = []
+        node: int = 0
+        while self.first_child[node] >= 0:
+            node = next(child for child in self.get_children(node) if self.value[child] == self.value[node])
+            moves.append(self.move[node])
+        return moves
+
+
+    def reroot(self, moves: List[int]) -> int:
+        """Makes the position after some moves the root, keeping its subtree and freeing the other nodes
+
+        Args:
+            moves (List[int]): the columns played since the root
+
+        Returns:
+            int: number of nodes kept, 0 if the position was not in the tree and a new root was made
+        """
+        node: int = 0
+        for col in moves:
+            node = next((child for child in self.get_children(node) if self.move[child] == col), -1)
+            if node < 0:
+                break
+
+        for col in moves:
+            self.board.play(col, self.to_move)
+            self.to_move = 3 - self.to_move
+        self.board.moves.clear() # the board is not undone past the new root
+
+        keep: List[int] = [node] if node >= 0 else []
+        for index in keep: # breadth first, so children stay next to each other and after their parent
+            keep.extend(self.get_children(index))
+
+        remap: Dict[int, int] = {old: new for new, old in enumerate(keep)} # dropped nodes map to -1
+        shift: int = self.depth[node] if node >= 0 else 0
+        columns: List[array] = [self.parent, self.move, self.depth, self.value, self.first_child, self.next_sibling, self.winner]
+        old: List[Union[array, List[int]]] = columns + self.bitboards
+        new: List[Union[array, List[int]]] = [type(values)(values.typecode) if isinstance(values, array) else [] for values in old]
+        for index in keep:
+            for values, old_values in zip(new, old):
+                values.append(old_values[index])
+
+        for index in range(len(keep)):
+            new[0][index] = remap.get(new[0][index], -1)
+            new[2][index] -= shift
+            if abs(new[3][index]) > WIN_THRESHOLD: # wins and losses are scored by their distance to the root
+                new[3][index] += shift if new[3][index] > 0 else -shift
+            new[4][index] = remap.get(new[4][index], -1)
+            new[5][index] = remap.get(new[5][index], -1)
+        (self.parent, self.move, self.depth, self.value, self.first_child, self.next_sibling, self.winner), self.bitboards = new[:7], new[7:]
+
+        if not keep:
+            self.add_node(-1, -1, 0, self.board.get_winner(self.game_n) if moves else 0)
+        else:
+            self.move[0] = -1
+        return len(keep)
 
-                    elif self.player_id == 2:
-                        #print("computer player")
-                        if value > max_value:
-                            max_move = value
-                            #print("max_move is:", max_move)
 
-                    #print("value is", value)
+    def get_board(self, node: int) -> BitBoard:
+        """Unpacks the position of a node
 
+        Args:
+            node (int): index of a node
 
-                    #print(new_board)
+        Returns:
+            BitBoard: a *new* board with the position of the node
+        """
+        state: np.ndarray = np.zeros((self.board.width, self.board.height), dtype=int)
+        for player_id in (1, 2):
+            pieces: int = self.bitboards[player_id - 1][node]
+            for col in range(self.board.width):
+                for height in range(self.board.height):
+                    if pieces >> (col * self.board.stride + height) & 1:
+                        state[col, self.board.height - 1 - height] = player_id
+        return BitBoard(state)
 
-                    self.create_tree(child, depth)              #recursion is happening
 
-        return min_move, max_move
\ No newline at end of file
+    def get_memory(self) -> int:
+        """
+        Returns:
+            int: bytes used by the arrays of the tree, not counting over-allocation
+        """
+        arrays: List[array] = [self.parent, self.move, self.depth, self.value, self.first_child, self.next_sibling, self.winner]
+        size: int = sum(len(values) * values.itemsize for values in arrays)
+        if self.board.fits_64:
+            size += 2 * 8 * len(self.parent)
+        else:
+            size += sum(sys.getsizeof(pieces) for bitboards in self.bitboards for pieces in bitboards)
+        return size
+
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: number of nodes in the tree
+        """
+        return len(self.parent)